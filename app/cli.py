@@ -0,0 +1,104 @@
+import argparse
+from datetime import date, datetime, timedelta
+
+from app.db import get_connection, init_db
+
+
+def _digest_agenda(args: argparse.Namespace) -> None:
+    from app.services.digest import AgendaDigestJob
+    from app.services.email_client import EmailClient
+
+    target = date.fromisoformat(args.fecha) if args.fecha else date.today() + timedelta(days=1)
+    job = AgendaDigestJob(EmailClient(), get_connection, include_patients=args.pacientes)
+    sent = job.run(target)
+    print(f"Agenda del {target.isoformat()}: {sent} mails enviados.")
+
+
+def _close_stale(args: argparse.Namespace) -> None:
+    from app.services.stale_appointments import StaleAppointmentsJob
+
+    hasta = datetime.fromisoformat(args.hasta) if args.hasta else None
+    updated = StaleAppointmentsJob(get_connection, estado=args.estado).run(hasta)
+    print(f"{len(updated)} turnos pasados a '{args.estado}'.")
+
+
+def _rebuild_search(args: argparse.Namespace) -> None:
+    from app.repositories import fts
+
+    tables = fts.FTS_TABLES if args.tabla == "todas" else (f"{args.tabla}_fts",)
+    conn = get_connection()
+    for table in tables:
+        fts.rebuild(conn, table)
+        print(f"Indice {table} reconstruido.")
+
+
+def _import_csv(args: argparse.Namespace) -> None:
+    from app.services import csv_import
+
+    conn = get_connection()
+    with open(args.archivo, encoding="utf-8-sig", newline="") as handle:
+        try:
+            reader = csv_import.open_reader(args.tipo, handle)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        progress = None
+        for progress in csv_import.import_rows(conn, args.tipo, reader, args.lote):
+            for error in progress["errores"]:
+                print(f"  linea {error['indice']}: {error['error']}")
+            print(
+                f"{progress['filas']} filas: {progress['insertadas']} insertadas, "
+                f"{progress['actualizadas']} actualizadas, {progress['rechazadas']} rechazadas."
+            )
+    if progress is None:
+        print("El archivo no tiene filas.")
+
+
+def _prune_changes(args: argparse.Namespace) -> None:
+    from app.repositories import changes
+
+    deleted = changes.prune(get_connection(), datetime.utcnow() - timedelta(days=args.dias))
+    print(f"{deleted} cambios anteriores a {args.dias} dias eliminados.")
+
+
+def main() -> None:
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Tareas batch de MediFlow.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    digest = sub.add_parser("digest-agenda", help="Envia la agenda del dia a cada medico.")
+    digest.add_argument("--fecha", help="YYYY-MM-DD (por defecto, manana)")
+    digest.add_argument("--pacientes", action="store_true", help="Incluir un mail consolidado por paciente")
+    digest.set_defaults(func=_digest_agenda)
+
+    stale = sub.add_parser("cerrar-turnos", help="Marca los turnos programados ya vencidos.")
+    stale.add_argument("--estado", default="ausente", choices=["ausente", "completado", "cancelado"])
+    stale.add_argument("--hasta", help="YYYY-MM-DDTHH:MM (por defecto, ahora)")
+    stale.set_defaults(func=_close_stale)
+
+    reindex = sub.add_parser("reindexar-busqueda", help="Reconstruye los indices de busqueda FTS5.")
+    reindex.add_argument("--tabla", default="todas", choices=["todas", "pacientes", "historial"])
+    reindex.set_defaults(func=_rebuild_search)
+
+    importer = sub.add_parser("importar-csv", help="Importa pacientes o disponibilidad desde un CSV.")
+    importer.add_argument("tipo", choices=["pacientes", "disponibilidad"])
+    importer.add_argument("archivo")
+    importer.add_argument("--lote", type=int, default=1000, help="Filas por transaccion")
+    importer.set_defaults(func=_import_csv)
+
+    prune = sub.add_parser("podar-cambios", help="Borra los cambios viejos del registro de sincronizacion.")
+    prune.add_argument("--dias", type=int, default=90)
+    prune.set_defaults(func=_prune_changes)
+
+    args = parser.parse_args()
+    init_db()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
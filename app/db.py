@@ -1,12 +1,109 @@
+import asyncio
 import os
 import sqlite3
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, TypeVar
 
 from app.security import hash_password
 
+T = TypeVar("T")
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class DatabaseExecutor:
+    """Pool de hilos dedicado a la BD: cada hilo abre su propia conexion y la usa siempre.
+
+    Los endpoints ``async`` le delegan el acceso a datos. La cantidad de hilos es fija
+    (``DB_POOL_SIZE``) y no depende de las conexiones HTTP abiertas: las consultas que no
+    encuentran hilo libre esperan en la cola sin bloquear el event loop.
+    """
+
+    def __init__(self, db_path: str, size: int) -> None:
+        self.db_path = db_path
+        self.size = size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(size, thread_name_prefix="db", initializer=self._open)
+
+    def _open(self) -> None:
+        conn = _connect(self.db_path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        self._local.conn = conn
+        with self._connections_lock:
+            self._connections.append(conn)
+
+    def _call(self, fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        conn = self._local.conn
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            # Un INSERT fallido sin commit (IntegrityError atrapado) deja abierta la transaccion
+            # implicita: no debe pasar al siguiente uso del hilo ni retener el lock de escritura.
+            if conn.in_transaction:
+                conn.rollback()
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Ejecuta ``fn(conn, *args, **kwargs)`` en un hilo de la BD y espera el resultado."""
+        return await asyncio.wrap_future(self._executor.submit(self._call, fn, args, kwargs))
+
+    async def stream(self, fn: Callable[..., Iterator[T]], *args: Any) -> AsyncIterator[T]:
+        """Recorre el generador ``fn(conn, *args)`` entero en un mismo hilo (y conexion) de la BD.
+
+        Cada elemento se entrega al loop apenas se produce; si el consumidor abandona, el
+        generador se cierra antes del siguiente elemento.
+        """
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce(conn: sqlite3.Connection) -> None:
+            try:
+                for item in fn(conn, *args):
+                    if stop.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, (False, item))
+            except Exception as exc:
+                loop.call_soon_threadsafe(queue.put_nowait, (True, exc))
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, (True, None))
+
+        self._executor.submit(self._call, produce, (), {})
+        try:
+            while True:
+                finished, value = await queue.get()
+                if finished:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            stop.set()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            while self._connections:
+                self._connections.pop().close()
+
+
+# Pools separados: los reportes (recorren tablas enteras) y las importaciones CSV (ocupan un
+# hilo de principio a fin) no le quitan hilos a las consultas cortas.
+EXECUTOR_SIZES = {
+    "general": ("DB_POOL_SIZE", "4"),
+    "reportes": ("DB_REPORTS_POOL_SIZE", "2"),
+    "importaciones": ("DB_IMPORT_POOL_SIZE", "1"),
+}
+
 
 class Database:
     """Singleton para manejar una unica conexion a la BD."""
@@ -21,20 +118,32 @@ class Database:
                     "DATABASE_URL", str(Path("data") / "clinic.db")
                 )
                 Path(cls._instance.db_path).parent.mkdir(parents=True, exist_ok=True)
-                cls._instance.conn = sqlite3.connect(
-                    cls._instance.db_path,
-                    check_same_thread=False,
-                    detect_types=sqlite3.PARSE_DECLTYPES,
-                )
-                cls._instance.conn.row_factory = sqlite3.Row
+                cls._instance.conn = _connect(cls._instance.db_path)
+                cls._instance._executors = {}
             return cls._instance
 
     @property
     def connection(self) -> sqlite3.Connection:
         return self.conn
 
+    def executor(self, name: str = "general") -> DatabaseExecutor:
+        """Pool de conexiones de los endpoints; se crea con el primer uso."""
+        with type(self)._lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                variable, default = EXECUTOR_SIZES[name]
+                executor = self._executors[name] = DatabaseExecutor(self.db_path, int(os.getenv(variable, default)))
+            return executor
+
+    def shutdown_executors(self) -> None:
+        with type(self)._lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown()
+
     def close(self) -> None:
         try:
+            self.shutdown_executors()
             self.conn.close()
         finally:
             type(self)._instance = None
@@ -43,6 +152,7 @@ class Database:
     def reset_instance(cls, db_path: Optional[str] = None) -> "Database":
         if cls._instance:
             try:
+                cls._instance.shutdown_executors()
                 cls._instance.conn.close()
             except Exception:
                 pass
@@ -50,15 +160,166 @@ class Database:
         return cls(db_path)
 
 
+_connection_locks: Dict[int, threading.RLock] = {}
+_connection_locks_guard = threading.Lock()
+
+
+def _lock_for(conn: sqlite3.Connection) -> threading.RLock:
+    with _connection_locks_guard:
+        lock = _connection_locks.get(id(conn))
+        if lock is None:
+            lock = _connection_locks[id(conn)] = threading.RLock()
+        return lock
+
+
+# Callbacks pendientes por conexion: una lista por nivel de transaccion/savepoint abierto.
+_after_commit: Dict[int, List[List[Callable[[], None]]]] = {}
+
+
+def after_commit(conn: sqlite3.Connection, callback: Callable[[], None]) -> None:
+    """Ejecuta ``callback`` cuando confirme la transaccion mas externa; se descarta si hay rollback.
+
+    Fuera de ``transaction`` se ejecuta en el momento.
+    """
+    stack = _after_commit.get(id(conn))
+    if stack:
+        stack[-1].append(callback)
+    else:
+        callback()
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Transaccion de escritura (BEGIN IMMEDIATE) con commit/rollback automatico.
+
+    Dentro de otro ``transaction`` de la misma conexion se anida con un SAVEPOINT. Una
+    transaccion implicita que nadie cerro (una escritura fallida sin commit) se descarta antes
+    del BEGIN. El lock por conexion evita que otro hilo intercale sentencias en la conexion compartida.
+    """
+    with _lock_for(conn):
+        stack = _after_commit.setdefault(id(conn), [])
+        if not stack and conn.in_transaction:
+            conn.rollback()
+        stack.append([])
+        if len(stack) > 1:
+            name = f"sp_{threading.get_ident()}"
+            conn.execute(f"SAVEPOINT {name}")
+            try:
+                yield conn
+            except BaseException:
+                stack.pop()
+                conn.execute(f"ROLLBACK TO {name}")
+                conn.execute(f"RELEASE {name}")
+                raise
+            conn.execute(f"RELEASE {name}")
+            callbacks = stack.pop()
+            if stack:
+                stack[-1].extend(callbacks)
+                return
+        else:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                stack.pop()
+                conn.rollback()
+                raise
+            conn.commit()
+            callbacks = stack.pop()
+        for callback in callbacks:
+            callback()
+
+
+@contextmanager
+def read_snapshot(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Transaccion de solo lectura: las consultas del bloque ven la misma foto de la BD.
+
+    BEGIN diferido fija la foto con la primera consulta y la suelta al cerrar. En modo WAL las
+    escrituras de otras conexiones siguen confirmandose mientras tanto, pero el bloque debe ser
+    corto para que el WAL pueda volcarse. Dentro de una transaccion abierta no hace nada.
+    """
+    with _lock_for(conn):
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+
+
 def _next_weekday(start: date, weekday: int) -> date:
     days_ahead = (weekday - start.weekday()) % 7
     return start + timedelta(days=days_ahead)
 
 
+# Tablas cuyas altas, cambios y bajas quedan en el registro de cambios (GET /cambios).
+CHANGE_LOG_TABLES = (
+    "especialidades",
+    "pacientes",
+    "medicos",
+    "disponibilidad_medicos",
+    "turnos",
+    "historial_clinico",
+    "recetas",
+    "lista_espera",
+)
+
+
+def _ensure_change_log(cursor: sqlite3.Cursor) -> None:
+    """Tabla ``cambios`` (solo se agregan filas) y los triggers que la alimentan.
+
+    ``seq`` es AUTOINCREMENT: nunca se reutiliza, ni siquiera despues de podar el registro.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cambios (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            fila_id INTEGER NOT NULL,
+            operacion TEXT NOT NULL CHECK (operacion IN ('alta', 'modificacion', 'baja')),
+            fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    triggers = (("INSERT", "alta", "NEW"), ("UPDATE", "modificacion", "NEW"), ("DELETE", "baja", "OLD"))
+    for table in CHANGE_LOG_TABLES:
+        for event, operacion, row in triggers:
+            cursor.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS trg_cambios_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                    INSERT INTO cambios (tabla, fila_id, operacion) VALUES ('{table}', {row}.id, '{operacion}');
+                END
+                """
+            )
+
+
+def _ensure_fts(cursor: sqlite3.Cursor, table: str, script: str) -> bool:
+    """Crea una tabla FTS5 de contenido externo con sus triggers y la llena la primera vez.
+
+    Devuelve False si SQLite no trae FTS5; las busquedas caen entonces a LIKE.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,))
+    if cursor.fetchone():
+        return True
+    try:
+        cursor.executescript(script)
+    except sqlite3.OperationalError as exc:
+        print(f"[DB] No se pudo crear {table} ({exc}); la busqueda usara LIKE.")
+        return False
+    cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    return True
+
+
 def init_db() -> None:
+    from app.repositories import availability, fts, fuzzy
+
     db = Database()
     conn = db.connection
     cursor = conn.cursor()
+    # WAL queda grabado en el archivo: las lecturas del pool no esperan a las escrituras.
+    conn.execute("PRAGMA journal_mode = WAL")
     cursor.executescript(
         """
         PRAGMA foreign_keys = ON;
@@ -93,6 +354,10 @@ def init_db() -> None:
             hora_inicio TEXT NOT NULL,
             hora_fin TEXT NOT NULL,
             activa INTEGER NOT NULL DEFAULT 1,
+            inicio_min INTEGER,
+            fin_min INTEGER,
+            duracion_turno INTEGER,
+            ocupacion INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (medico_id) REFERENCES medicos(id) ON DELETE CASCADE
         );
         CREATE TABLE IF NOT EXISTS turnos (
@@ -105,6 +370,7 @@ def init_db() -> None:
             motivo_consulta TEXT,
             duracion INTEGER NOT NULL,
             recordatorio TEXT,
+            sub_turno INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
             FOREIGN KEY (medico_id) REFERENCES medicos(id) ON DELETE CASCADE,
             FOREIGN KEY (disponibilidad_id) REFERENCES disponibilidad_medicos(id) ON DELETE SET NULL
@@ -116,6 +382,10 @@ def init_db() -> None:
             descripcion TEXT NOT NULL,
             estado TEXT NOT NULL DEFAULT 'programado',
             fecha_turno TEXT,
+            medico_id INTEGER,
+            medico_nombre TEXT,
+            medico_apellido TEXT,
+            especialidad TEXT,
             FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
             FOREIGN KEY (turno_id) REFERENCES turnos(id) ON DELETE SET NULL
         );
@@ -127,9 +397,34 @@ def init_db() -> None:
             FOREIGN KEY (medico_id) REFERENCES medicos(id) ON DELETE CASCADE,
             FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE
         );
+        CREATE TABLE IF NOT EXISTS lista_espera (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            paciente_id INTEGER NOT NULL,
+            medico_id INTEGER,
+            especialidad_id INTEGER,
+            fecha_desde TEXT NOT NULL,
+            fecha_hasta TEXT NOT NULL,
+            prioridad INTEGER NOT NULL DEFAULT 0,
+            estado TEXT NOT NULL DEFAULT 'esperando',
+            turno_id INTEGER,
+            creado_en TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CHECK (medico_id IS NOT NULL OR especialidad_id IS NOT NULL),
+            FOREIGN KEY (paciente_id) REFERENCES pacientes(id) ON DELETE CASCADE,
+            FOREIGN KEY (medico_id) REFERENCES medicos(id) ON DELETE CASCADE,
+            FOREIGN KEY (especialidad_id) REFERENCES especialidades(id) ON DELETE CASCADE,
+            FOREIGN KEY (turno_id) REFERENCES turnos(id) ON DELETE SET NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_lista_espera_medico
+            ON lista_espera(medico_id, prioridad DESC, id) WHERE estado = 'esperando' AND medico_id IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_lista_espera_especialidad
+            ON lista_espera(especialidad_id, prioridad DESC, id) WHERE estado = 'esperando' AND medico_id IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_lista_espera_vencimiento
+            ON lista_espera(fecha_hasta) WHERE estado = 'esperando';
         CREATE INDEX IF NOT EXISTS idx_turnos_medico_fecha ON turnos(medico_id, fecha);
-        CREATE INDEX IF NOT EXISTS idx_historial_paciente ON historial_clinico(paciente_id);
-        CREATE INDEX IF NOT EXISTS idx_historial_turno ON historial_clinico(turno_id);
+        CREATE INDEX IF NOT EXISTS idx_turnos_fecha ON turnos(fecha);
+        CREATE INDEX IF NOT EXISTS idx_turnos_paciente_fecha ON turnos(paciente_id, fecha);
+        CREATE INDEX IF NOT EXISTS idx_recetas_paciente ON recetas(paciente_id, id);
+        CREATE INDEX IF NOT EXISTS idx_lista_espera_paciente ON lista_espera(paciente_id);
         """
     )
 
@@ -157,11 +452,164 @@ def init_db() -> None:
                 "UPDATE disponibilidad_medicos SET fecha = ? WHERE id = ?",
                 (target.isoformat(), row["id"]),
             )
+    if not _column_exists("disponibilidad_medicos", "inicio_min"):
+        cursor.execute("ALTER TABLE disponibilidad_medicos ADD COLUMN inicio_min INTEGER")
+        cursor.execute("ALTER TABLE disponibilidad_medicos ADD COLUMN fin_min INTEGER")
+    # Horarios como minutos desde 00:00 para comparar rangos sin parsear texto.
+    cursor.execute(
+        """
+        UPDATE disponibilidad_medicos
+        SET inicio_min = CAST(substr(hora_inicio, 1, 2) AS INTEGER) * 60 + CAST(substr(hora_inicio, 4, 2) AS INTEGER),
+            fin_min = CAST(substr(hora_fin, 1, 2) AS INTEGER) * 60 + CAST(substr(hora_fin, 4, 2) AS INTEGER)
+        WHERE (inicio_min IS NULL OR fin_min IS NULL)
+          AND hora_inicio GLOB '[0-9][0-9]:[0-9][0-9]' AND hora_fin GLOB '[0-9][0-9]:[0-9][0-9]'
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_disponibilidad_medico_fecha ON disponibilidad_medicos(medico_id, fecha, inicio_min)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_disponibilidad_activa_fecha ON disponibilidad_medicos(activa, fecha, hora_inicio)"
+    )
+    if not _column_exists("disponibilidad_medicos", "ocupacion"):
+        cursor.execute("ALTER TABLE disponibilidad_medicos ADD COLUMN duracion_turno INTEGER")
+        cursor.execute("ALTER TABLE disponibilidad_medicos ADD COLUMN ocupacion INTEGER NOT NULL DEFAULT 0")
+        # Sin duracion_turno la franja es un unico sub-turno (bit 0).
+        cursor.execute("UPDATE disponibilidad_medicos SET ocupacion = 1 WHERE activa = 0")
+    if not _column_exists("turnos", "sub_turno"):
+        cursor.execute("ALTER TABLE turnos ADD COLUMN sub_turno INTEGER NOT NULL DEFAULT 0")
     if not _column_exists("historial_clinico", "estado"):
         cursor.execute("ALTER TABLE historial_clinico ADD COLUMN estado TEXT DEFAULT 'programado'")
         cursor.execute("UPDATE historial_clinico SET estado = 'programado' WHERE estado IS NULL")
     if not _column_exists("historial_clinico", "fecha_turno"):
         cursor.execute("ALTER TABLE historial_clinico ADD COLUMN fecha_turno TEXT")
+    if not _column_exists("historial_clinico", "medico_id"):
+        # Medico y especialidad copiados en el historial: la linea de tiempo se lee sin JOINs.
+        for column in ("medico_id INTEGER", "medico_nombre TEXT", "medico_apellido TEXT", "especialidad TEXT"):
+            cursor.execute(f"ALTER TABLE historial_clinico ADD COLUMN {column}")
+        cursor.execute(
+            """
+            UPDATE historial_clinico SET (medico_id, medico_nombre, medico_apellido, especialidad) = (
+                SELECT m.id, m.nombre, m.apellido, e.nombre
+                FROM turnos t
+                JOIN medicos m ON t.medico_id = m.id
+                JOIN especialidades e ON m.especialidad_id = e.id
+                WHERE t.id = historial_clinico.turno_id
+            )
+            WHERE turno_id IS NOT NULL
+            """
+        )
+        # Orden por el texto crudo: todas las fechas en formato 'YYYY-MM-DD HH:MM:SS'.
+        cursor.execute(
+            """
+            UPDATE historial_clinico SET fecha_turno = datetime(fecha_turno)
+            WHERE datetime(fecha_turno) IS NOT NULL AND fecha_turno != datetime(fecha_turno)
+            """
+        )
+    cursor.executescript(
+        """
+        DROP INDEX IF EXISTS idx_historial_paciente;
+        CREATE INDEX IF NOT EXISTS idx_historial_paciente_fecha
+            ON historial_clinico(paciente_id, fecha_turno DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_historial_medico ON historial_clinico(medico_id);
+        CREATE TRIGGER IF NOT EXISTS trg_medicos_historial
+        AFTER UPDATE OF nombre, apellido, especialidad_id ON medicos
+        BEGIN
+            UPDATE historial_clinico
+            SET medico_nombre = NEW.nombre,
+                medico_apellido = NEW.apellido,
+                especialidad = (SELECT nombre FROM especialidades WHERE id = NEW.especialidad_id)
+            WHERE medico_id = NEW.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_especialidades_historial
+        AFTER UPDATE OF nombre ON especialidades
+        BEGIN
+            UPDATE historial_clinico SET especialidad = NEW.nombre
+            WHERE medico_id IN (SELECT id FROM medicos WHERE especialidad_id = NEW.id);
+        END;
+        """
+    )
+    fts_pacientes = _ensure_fts(
+        cursor,
+        "pacientes_fts",
+        """
+        CREATE VIRTUAL TABLE pacientes_fts USING fts5(
+            nombre, apellido, dni, mail,
+            content='pacientes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_fts_insert AFTER INSERT ON pacientes BEGIN
+            INSERT INTO pacientes_fts(rowid, nombre, apellido, dni, mail)
+            VALUES (NEW.id, NEW.nombre, NEW.apellido, NEW.dni, NEW.mail);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_fts_delete AFTER DELETE ON pacientes BEGIN
+            INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre, apellido, dni, mail)
+            VALUES ('delete', OLD.id, OLD.nombre, OLD.apellido, OLD.dni, OLD.mail);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pacientes_fts_update AFTER UPDATE ON pacientes BEGIN
+            INSERT INTO pacientes_fts(pacientes_fts, rowid, nombre, apellido, dni, mail)
+            VALUES ('delete', OLD.id, OLD.nombre, OLD.apellido, OLD.dni, OLD.mail);
+            INSERT INTO pacientes_fts(rowid, nombre, apellido, dni, mail)
+            VALUES (NEW.id, NEW.nombre, NEW.apellido, NEW.dni, NEW.mail);
+        END;
+        """,
+    )
+    fts_historial = _ensure_fts(
+        cursor,
+        "historial_fts",
+        """
+        CREATE VIRTUAL TABLE historial_fts USING fts5(
+            descripcion, paciente_id UNINDEXED,
+            content='historial_clinico', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='3'
+        );
+        CREATE TRIGGER IF NOT EXISTS trg_historial_fts_insert AFTER INSERT ON historial_clinico BEGIN
+            INSERT INTO historial_fts(rowid, descripcion, paciente_id)
+            VALUES (NEW.id, NEW.descripcion, NEW.paciente_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_historial_fts_delete AFTER DELETE ON historial_clinico BEGIN
+            INSERT INTO historial_fts(historial_fts, rowid, descripcion, paciente_id)
+            VALUES ('delete', OLD.id, OLD.descripcion, OLD.paciente_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_historial_fts_update
+        AFTER UPDATE OF descripcion, paciente_id ON historial_clinico BEGIN
+            INSERT INTO historial_fts(historial_fts, rowid, descripcion, paciente_id)
+            VALUES ('delete', OLD.id, OLD.descripcion, OLD.paciente_id);
+            INSERT INTO historial_fts(rowid, descripcion, paciente_id)
+            VALUES (NEW.id, NEW.descripcion, NEW.paciente_id);
+        END;
+        """,
+    )
+    fts.set_available(conn, "pacientes_fts", fts_pacientes)
+    fts.set_available(conn, "historial_fts", fts_historial)
+    cursor.execute("DROP INDEX IF EXISTS ux_turnos_disponibilidad_activa")
+    try:
+        # Un solo turno no cancelado por sub-turno de disponibilidad: garantiza que no haya doble reserva.
+        cursor.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_turnos_subturno_activo
+            ON turnos(disponibilidad_id, sub_turno)
+            WHERE disponibilidad_id IS NOT NULL AND estado != 'cancelado'
+            """
+        )
+    except sqlite3.IntegrityError:
+        print("[DB] No se pudo crear ux_turnos_subturno_activo: hay sub-turnos con mas de un turno activo.")
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_historial_turno'"
+    )
+    if not cursor.fetchone():
+        # Registros duplicados por turno: el mas antiguo queda vinculado, el resto se conserva sin turno_id.
+        cursor.execute(
+            """
+            UPDATE historial_clinico SET turno_id = NULL
+            WHERE turno_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM historial_clinico WHERE turno_id IS NOT NULL GROUP BY turno_id
+            )
+            """
+        )
+        cursor.execute("DROP INDEX IF EXISTS idx_historial_turno")
+        cursor.execute("CREATE UNIQUE INDEX ux_historial_turno ON historial_clinico(turno_id)")
+    _ensure_change_log(cursor)
     conn.commit()
 
     cursor.execute("SELECT COUNT(*) as total FROM especialidades")
@@ -242,10 +690,17 @@ def init_db() -> None:
                 continue
             cursor.execute(
                 """
-                INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin, inicio_min, fin_min)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (medico_id, slot["fecha"].isoformat(), slot["inicio"], slot["fin"]),
+                (
+                    medico_id,
+                    slot["fecha"].isoformat(),
+                    slot["inicio"],
+                    slot["fin"],
+                    availability.to_minutes(slot["inicio"]),
+                    availability.to_minutes(slot["fin"]),
+                ),
             )
             availability_rows.append(
                 {
@@ -410,7 +865,7 @@ def init_db() -> None:
             turno_id = cursor.lastrowid
             if availability_id:
                 cursor.execute(
-                    "UPDATE disponibilidad_medicos SET activa = 0 WHERE id = ?",
+                    "UPDATE disponibilidad_medicos SET activa = 0, ocupacion = 1 WHERE id = ?",
                     (availability_id,),
                 )
             clinical_history.upsert_from_appointment(
@@ -424,6 +879,9 @@ def init_db() -> None:
             )
         conn.commit()
 
+    availability.reset_index(conn)
+    fuzzy.reset_indexes(conn)
+
     cursor.execute("SELECT COUNT(*) as total FROM admins")
     if cursor.fetchone()["total"] == 0:
         default_password = os.getenv("ADMIN_DEFAULT_PASSWORD", "admin123")
@@ -437,3 +895,16 @@ def init_db() -> None:
 
 def get_connection() -> sqlite3.Connection:
     return Database().connection
+
+
+# Dependencias async: FastAPI las resuelve en el loop, sin pasar por su threadpool.
+async def get_executor() -> DatabaseExecutor:
+    return Database().executor()
+
+
+async def get_report_executor() -> DatabaseExecutor:
+    return Database().executor("reportes")
+
+
+async def get_import_executor() -> DatabaseExecutor:
+    return Database().executor("importaciones")
@@ -1,15 +1,33 @@
+import asyncio
+import csv
+import hashlib
+import io
+import json
 import os
 import sqlite3
-from datetime import datetime
+import tempfile
+from datetime import date, datetime
 from typing import List, Optional
-from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app import schemas
-from app.db import get_connection, init_db
+from app.db import (
+    CHANGE_LOG_TABLES,
+    Database,
+    DatabaseExecutor,
+    get_connection,
+    get_executor,
+    get_import_executor,
+    get_report_executor,
+    init_db,
+)
+from app.middleware import AuthMiddleware
+from app.observers import events
+from app.observers.bus import EventBus
 from app.repositories import (
     appointments,
     availability,
@@ -19,13 +37,19 @@ from app.repositories import (
     prescriptions,
     specialties,
     admins,
+    changes,
+    waitlist,
 )
-from app.routes import history
+from app.routes import events as event_stream, history
+from app.services.digest import AgendaDigestJob
 from app.services.email_client import EmailClient
 from app.services.prescription_notifier import PrescriptionNotifier
 from app.services.reminder import ReminderService
-from app.services import reports
-from app.security import create_access_token, decode_token, verify_password
+from app.services.scheduler import DailyScheduler
+from app.services.stale_appointments import StaleAppointmentsJob
+from app.services.waitlist import WaitlistMatcher
+from app.services import batch, bulk, csv_import, reports
+from app.security import create_access_token, verify_password
 
 try:
     from dotenv import load_dotenv
@@ -74,8 +98,19 @@ app.add_middleware(
 email_client = EmailClient()
 reminder_service = ReminderService(email_client)
 prescription_notifier = PrescriptionNotifier(email_client)
-bearer_scheme = HTTPBearer(auto_error=False)
+agenda_digest_job = AgendaDigestJob(
+    email_client,
+    get_connection,
+    include_patients=os.getenv("AGENDA_DIGEST_PACIENTES", "false").lower() == "true",
+)
+schedulers: List[DailyScheduler] = []
+event_bus = EventBus(workers=int(os.getenv("EVENT_BUS_WORKERS", "4")))
+waitlist_matcher = WaitlistMatcher(event_bus, get_connection)
+stale_appointments_job = StaleAppointmentsJob(
+    get_connection, event_bus, estado=os.getenv("TURNOS_VENCIDOS_ESTADO", "ausente")
+)
 app.include_router(history.router)
+app.include_router(event_stream.router)
 
 OPEN_PATHS = {
     "/health",
@@ -85,45 +120,50 @@ OPEN_PATHS = {
     "/redoc",
 }
 
+app.add_middleware(AuthMiddleware, open_paths=OPEN_PATHS, query_token_paths={"/eventos"})
 
-@app.middleware("http")
-async def enforce_auth(request: Request, call_next):
-    path = request.url.path
-    if path in OPEN_PATHS or path.startswith("/docs") or path.startswith("/static"):
-        return await call_next(request)
-
-    credentials: HTTPAuthorizationCredentials = await bearer_scheme(request)
-    if not credentials or credentials.scheme.lower() != "bearer":
-        return JSONResponse({"detail": "No autorizado"}, status_code=401)
-
-    token = credentials.credentials
-    try:
-        username = decode_token(token)
-        if not username:
-            raise ValueError("invalid subject")
-    except Exception:
-        return JSONResponse({"detail": "Token invalido o expirado"}, status_code=401)
 
-    request.state.user = username
-    return await call_next(request)
+def register_subscribers() -> None:
+    event_bus.subscribe(events.AppointmentCreated, reminder_service)
+    event_bus.subscribe(events.PrescriptionIssued, prescription_notifier)
+    event_bus.subscribe(events.AppointmentStatusChanged, waitlist_matcher)
 
 
 @app.on_event("startup")
 def startup() -> None:
     init_db()
+    register_subscribers()
+    digest_hour = os.getenv("AGENDA_DIGEST_HORA")
+    if digest_hour:
+        scheduler = DailyScheduler.from_env_value(digest_hour, agenda_digest_job.run, "agenda-digest")
+        scheduler.start()
+        schedulers.append(scheduler)
+    stale_hour = os.getenv("TURNOS_VENCIDOS_HORA")
+    if stale_hour:
+        scheduler = DailyScheduler.from_env_value(stale_hour, stale_appointments_job.run, "turnos-vencidos")
+        scheduler.start()
+        schedulers.append(scheduler)
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    while schedulers:
+        schedulers.pop().stop()
+    event_bus.shutdown()
+    Database().shutdown_executors()
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 # --- Autenticacion ---
 @app.post("/auth/login", response_model=schemas.TokenResponse)
-def login(
-    payload: schemas.LoginRequest, conn: sqlite3.Connection = Depends(get_connection)
+async def login(
+    payload: schemas.LoginRequest, db: DatabaseExecutor = Depends(get_executor)
 ):
-    admin = admins.get_admin_by_username(conn, payload.username)
+    admin = await db.run(admins.get_admin_by_username, payload.username)
     if not admin or not verify_password(payload.password, admin["password_hash"]):
         raise HTTPException(status_code=401, detail="Credenciales invalidas")
     token = create_access_token(payload.username)
@@ -132,44 +172,64 @@ def login(
 
 # --- Pacientes ---
 @app.post("/pacientes", response_model=schemas.Patient)
-def create_patient(
-    payload: schemas.PatientCreate, conn: sqlite3.Connection = Depends(get_connection)
+async def create_patient(
+    payload: schemas.PatientCreate, db: DatabaseExecutor = Depends(get_executor)
 ):
     try:
-        new_id = patients.create_patient(conn, payload.dict())
+        new_id = await db.run(patients.create_patient, payload.dict())
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="DNI o mail ya registrado.")
     return {"id": new_id, **payload.dict()}
 
 
+@app.post("/pacientes/lote", response_model=schemas.BulkCreateResult)
+async def bulk_create_patients(
+    payload: schemas.BulkCreateRequest, db: DatabaseExecutor = Depends(get_executor)
+):
+    return await db.run(bulk.bulk_create, schemas.PatientCreate, payload.filas, patients.bulk_create_patients)
+
+
 @app.get("/pacientes", response_model=List[schemas.Patient])
-def list_all_patients(conn: sqlite3.Connection = Depends(get_connection)):
-    return patients.list_patients(conn)
+async def list_all_patients(db: DatabaseExecutor = Depends(get_executor)):
+    return await db.run(patients.list_patients)
+
+
+@app.get("/pacientes/buscar", response_model=List[schemas.PatientSearchHit])
+async def search_patients(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = False,
+    umbral: float = Query(0.3, ge=0.05, le=1.0),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    if fuzzy:
+        return await db.run(patients.fuzzy_search_patients, q, umbral, limit)
+    return await db.run(patients.search_patients, q, limit)
 
 
 @app.get("/pacientes/{patient_id}", response_model=schemas.Patient)
-def get_patient(patient_id: int, conn: sqlite3.Connection = Depends(get_connection)):
-    patient = patients.get_patient(conn, patient_id)
+async def get_patient(patient_id: int, db: DatabaseExecutor = Depends(get_executor)):
+    patient = await db.run(patients.get_patient, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado.")
     return patient
 
 
 @app.put("/pacientes/{patient_id}", response_model=schemas.Patient)
-def update_patient(
+async def update_patient(
     patient_id: int,
     payload: schemas.PatientCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    ok = patients.update_patient(conn, patient_id, payload.dict())
+    ok = await db.run(patients.update_patient, patient_id, payload.dict())
     if not ok:
         raise HTTPException(status_code=404, detail="Paciente no encontrado.")
     return {"id": patient_id, **payload.dict()}
 
 
 @app.delete("/pacientes/{patient_id}")
-def delete_patient(patient_id: int, conn: sqlite3.Connection = Depends(get_connection)):
-    ok = patients.delete_patient(conn, patient_id)
+async def delete_patient(patient_id: int, db: DatabaseExecutor = Depends(get_executor)):
+    ok = await db.run(patients.delete_patient, patient_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Paciente no encontrado.")
     return {"deleted": True}
@@ -177,35 +237,35 @@ def delete_patient(patient_id: int, conn: sqlite3.Connection = Depends(get_conne
 
 # --- Especialidades ---
 @app.post("/especialidades", response_model=schemas.Specialty)
-def create_specialty(
-    payload: schemas.SpecialtyCreate, conn: sqlite3.Connection = Depends(get_connection)
+async def create_specialty(
+    payload: schemas.SpecialtyCreate, db: DatabaseExecutor = Depends(get_executor)
 ):
-    new_id = specialties.create_specialty(conn, payload.dict())
+    new_id = await db.run(specialties.create_specialty, payload.dict())
     return {"id": new_id, **payload.dict()}
 
 
 @app.get("/especialidades", response_model=List[schemas.Specialty])
-def list_specialties(conn: sqlite3.Connection = Depends(get_connection)):
-    return specialties.list_specialties(conn)
+async def list_specialties(db: DatabaseExecutor = Depends(get_executor)):
+    return await db.run(specialties.list_specialties)
 
 
 @app.put("/especialidades/{specialty_id}", response_model=schemas.Specialty)
-def update_specialty(
+async def update_specialty(
     specialty_id: int,
     payload: schemas.SpecialtyCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    ok = specialties.update_specialty(conn, specialty_id, payload.dict())
+    ok = await db.run(specialties.update_specialty, specialty_id, payload.dict())
     if not ok:
         raise HTTPException(status_code=404, detail="Especialidad no encontrada.")
     return {"id": specialty_id, **payload.dict()}
 
 
 @app.delete("/especialidades/{specialty_id}")
-def delete_specialty(
-    specialty_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def delete_specialty(
+    specialty_id: int, db: DatabaseExecutor = Depends(get_executor)
 ):
-    ok = specialties.delete_specialty(conn, specialty_id)
+    ok = await db.run(specialties.delete_specialty, specialty_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Especialidad no encontrada.")
     return {"deleted": True}
@@ -213,41 +273,82 @@ def delete_specialty(
 
 # --- Médicos ---
 @app.post("/medicos", response_model=schemas.Doctor)
-def create_doctor(
-    payload: schemas.DoctorCreate, conn: sqlite3.Connection = Depends(get_connection)
+async def create_doctor(
+    payload: schemas.DoctorCreate, db: DatabaseExecutor = Depends(get_executor)
 ):
-    new_id = doctors.create_doctor(conn, payload.dict())
+    new_id = await db.run(doctors.create_doctor, payload.dict())
     return {"id": new_id, **payload.dict()}
 
 
+@app.post("/medicos/lote", response_model=schemas.BulkCreateResult)
+async def bulk_create_doctors(
+    payload: schemas.BulkCreateRequest, db: DatabaseExecutor = Depends(get_executor)
+):
+    return await db.run(bulk.bulk_create, schemas.DoctorCreate, payload.filas, doctors.bulk_create_doctors)
+
+
 @app.get("/medicos", response_model=List[schemas.Doctor])
-def list_doctors(conn: sqlite3.Connection = Depends(get_connection)):
-    return doctors.list_doctors(conn)
+async def list_doctors(db: DatabaseExecutor = Depends(get_executor)):
+    return await db.run(doctors.list_doctors)
+
+
+@app.get("/medicos/buscar", response_model=List[schemas.DoctorSearchHit])
+async def search_doctors(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = False,
+    umbral: float = Query(0.3, ge=0.05, le=1.0),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    return await db.run(doctors.search_doctors, q, fuzzy, umbral, limit)
 
 
 @app.get("/medicos/{doctor_id}", response_model=schemas.Doctor)
-def get_doctor(doctor_id: int, conn: sqlite3.Connection = Depends(get_connection)):
-    doctor = doctors.get_doctor(conn, doctor_id)
+async def get_doctor(doctor_id: int, db: DatabaseExecutor = Depends(get_executor)):
+    doctor = await db.run(doctors.get_doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Médico no encontrado.")
     return doctor
 
 
+@app.get("/medicos/{doctor_id}/agenda", response_model=schemas.DoctorAgenda)
+async def get_doctor_agenda(
+    doctor_id: int,
+    response: Response,
+    fecha: Optional[date] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    if not await db.run(doctors.get_doctor, doctor_id):
+        raise HTTPException(status_code=404, detail="Médico no encontrado.")
+    fecha = fecha or date.today()
+    bloques = await db.run(doctors.get_agenda, doctor_id, fecha.isoformat())
+    agenda = {"medico_id": doctor_id, "fecha": fecha, "bloques": bloques}
+    # ETag derivado del contenido: cualquier reserva o cambio de estado lo modifica.
+    body = json.dumps(jsonable_encoder(agenda), sort_keys=True).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return agenda
+
+
 @app.put("/medicos/{doctor_id}", response_model=schemas.Doctor)
-def update_doctor(
+async def update_doctor(
     doctor_id: int,
     payload: schemas.DoctorCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    ok = doctors.update_doctor(conn, doctor_id, payload.dict())
+    ok = await db.run(doctors.update_doctor, doctor_id, payload.dict())
     if not ok:
         raise HTTPException(status_code=404, detail="Médico no encontrado.")
     return {"id": doctor_id, **payload.dict()}
 
 
 @app.delete("/medicos/{doctor_id}")
-def delete_doctor(doctor_id: int, conn: sqlite3.Connection = Depends(get_connection)):
-    ok = doctors.delete_doctor(conn, doctor_id)
+async def delete_doctor(doctor_id: int, db: DatabaseExecutor = Depends(get_executor)):
+    ok = await db.run(doctors.delete_doctor, doctor_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Médico no encontrado.")
     return {"deleted": True}
@@ -255,28 +356,72 @@ def delete_doctor(doctor_id: int, conn: sqlite3.Connection = Depends(get_connect
 
 # --- Disponibilidad horaria ---
 @app.post("/disponibilidad", response_model=schemas.Availability)
-def create_availability(
-    payload: schemas.AvailabilityCreate, conn: sqlite3.Connection = Depends(get_connection)
+async def create_availability(
+    payload: schemas.AvailabilityCreate, db: DatabaseExecutor = Depends(get_executor)
 ):
     try:
-        new_id = availability.create_availability(conn, payload.dict())
+        new_id = await db.run(availability.create_availability, payload.dict())
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"id": new_id, **payload.dict()}
 
 
+@app.post("/disponibilidad/recurrente", response_model=schemas.RecurringAvailabilityResult)
+async def create_recurring_availability(
+    payload: schemas.RecurringAvailabilityCreate,
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    try:
+        return await db.run(
+            availability.create_recurring_availability,
+            payload.medico_id,
+            payload.fecha_desde,
+            payload.fecha_hasta,
+            [bloque.dict() for bloque in payload.bloques],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=400, detail="Médico inexistente.")
+
+
 @app.get("/disponibilidad", response_model=List[schemas.Availability])
-def list_availability(
-    medico_id: Optional[int] = None, conn: sqlite3.Connection = Depends(get_connection)
+async def list_availability(
+    medico_id: Optional[int] = None, db: DatabaseExecutor = Depends(get_executor)
 ):
-    return availability.list_availability(conn, medico_id)
+    return await db.run(availability.list_availability, medico_id)
+
+
+@app.get("/disponibilidad/proximos", response_model=List[schemas.NextSlot])
+async def list_next_free_slots(
+    especialidad_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    now = datetime.now()
+    if desde and desde.tzinfo:
+        # Los turnos se guardan en hora local sin zona.
+        desde = desde.astimezone().replace(tzinfo=None)
+    desde = max(desde, now) if desde else now
+    return await db.run(availability.find_next_free_slots, especialidad_id, desde, limit)
+
+
+@app.get("/disponibilidad/{availability_id}/subturnos", response_model=List[schemas.SubSlot])
+async def list_sub_slots(
+    availability_id: int, db: DatabaseExecutor = Depends(get_executor)
+):
+    slots = await db.run(availability.list_sub_slots, availability_id)
+    if slots is None:
+        raise HTTPException(status_code=404, detail="Disponibilidad no encontrada.")
+    return slots
 
 
 @app.delete("/disponibilidad/{availability_id}")
-def delete_availability(
-    availability_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def delete_availability(
+    availability_id: int, db: DatabaseExecutor = Depends(get_executor)
 ):
-    ok = availability.delete_availability(conn, availability_id)
+    ok = await db.run(availability.delete_availability, availability_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Disponibilidad no encontrada.")
     return {"deleted": True}
@@ -284,165 +429,306 @@ def delete_availability(
 
 # --- Turnos ---
 @app.post("/turnos", response_model=schemas.Appointment)
-def create_appointment(
+async def create_appointment(
     payload: schemas.AppointmentCreate,
-    background_tasks: BackgroundTasks,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
     try:
-        new_id = appointments.create_appointment(conn, payload.dict())
+        new_id = await db.run(appointments.create_appointment, payload.dict())
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Paciente o médico inexistente.")
 
-    turno = appointments.get_appointment(conn, new_id)
-    appointment_dt = datetime.fromisoformat(turno["fecha"])
-    patient_full_name = f"{turno['paciente_nombre']} {turno['paciente_apellido']}"
-    doctor_full_name = f"{turno['medico_nombre']} {turno['medico_apellido']}"
-    specialty_name = turno["especialidad_nombre"]
-    # Desacoplar envío usando BackgroundTasks.
-    background_tasks.add_task(
-        reminder_service.schedule_reminders,
-        appointment_dt,
-        patient_full_name,
-        turno["paciente_mail"],
-        doctor_full_name,
-        specialty_name,
-    )
+    turno = await db.run(appointments.get_appointment, new_id)
+    event_bus.publish(events.appointment_created_event(turno))
     return {**turno}
 
 
 @app.get("/turnos", response_model=List[schemas.Appointment])
-def list_all_appointments(
-    medico_id: Optional[int] = None, conn: sqlite3.Connection = Depends(get_connection)
+async def list_all_appointments(
+    medico_id: Optional[int] = None, db: DatabaseExecutor = Depends(get_executor)
 ):
-    return appointments.list_appointments(conn, medico_id)
+    return await db.run(appointments.list_appointments, medico_id)
 
 
 @app.put("/turnos/{appointment_id}/estado")
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     payload: schemas.AppointmentUpdateStatus,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    ok = appointments.update_status(conn, appointment_id, payload.estado)
-    if not ok:
+    try:
+        previous = await db.run(appointments.update_status, appointment_id, payload.estado)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not previous:
         raise HTTPException(status_code=404, detail="Turno no encontrado.")
+    event_bus.publish(events.appointment_status_changed_event(previous, payload.estado))
     return {"id": appointment_id, "estado": payload.estado}
 
 
+@app.post("/turnos/estado/lote", response_model=schemas.AppointmentBulkStatusResult)
+async def bulk_update_appointment_status(
+    payload: schemas.AppointmentBulkStatusUpdate,
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    hasta = payload.hasta
+    if hasta and hasta.tzinfo:
+        # Los turnos se guardan en hora local sin zona.
+        hasta = hasta.astimezone().replace(tzinfo=None)
+    if hasta and hasta > datetime.now():
+        raise HTTPException(status_code=400, detail="hasta no puede ser posterior al momento actual.")
+    try:
+        affected = await db.run(appointments.bulk_update_status, payload.estado, payload.ids, hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for previous in affected:
+        event_bus.publish(events.appointment_status_changed_event(previous, payload.estado))
+    return {"estado": payload.estado, "actualizados": [row["id"] for row in affected]}
+
+
+# --- Lista de espera ---
+@app.post("/lista-espera", response_model=schemas.WaitlistEntry)
+async def create_waitlist_entry(
+    payload: schemas.WaitlistEntryCreate,
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    try:
+        new_id = await db.run(waitlist.add_entry, payload.dict())
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=400, detail="Paciente, médico o especialidad inexistente.")
+    return await db.run(waitlist.get_entry, new_id)
+
+
+@app.get("/lista-espera", response_model=List[schemas.WaitlistEntry])
+async def list_waitlist(
+    paciente_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    return await db.run(waitlist.list_entries, paciente_id, estado)
+
+
+@app.delete("/lista-espera/{entry_id}")
+async def delete_waitlist_entry(entry_id: int, db: DatabaseExecutor = Depends(get_executor)):
+    if not await db.run(waitlist.cancel_entry, entry_id):
+        raise HTTPException(status_code=404, detail="Entrada de lista de espera no encontrada.")
+    return {"deleted": True}
+
+
 # --- Historial clínico ---
 @app.post("/historial", response_model=schemas.ClinicalRecord)
-def create_record(
+async def create_record(
     payload: schemas.ClinicalRecordCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    new_id = clinical_history.add_record(conn, payload.dict())
+    try:
+        new_id = await db.run(clinical_history.add_record, payload.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=400, detail="Paciente o turno inexistente.")
     return {"id": new_id, **payload.dict()}
 
 
 @app.get("/pacientes/{patient_id}/historial", response_model=List[schemas.ClinicalRecord])
-def list_history(
-    patient_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def list_history(
+    patient_id: int, db: DatabaseExecutor = Depends(get_executor)
 ):
-    return clinical_history.list_records(conn, patient_id)
+    return await db.run(clinical_history.list_records, patient_id)
 
 
 # --- Recetas ---
 @app.get("/recetas", response_model=List[schemas.Prescription])
-def list_all_prescriptions(conn: sqlite3.Connection = Depends(get_connection)):
-    return prescriptions.list_all_prescriptions(conn)
+async def list_all_prescriptions(db: DatabaseExecutor = Depends(get_executor)):
+    return await db.run(prescriptions.list_all_prescriptions)
 
 
 @app.get("/recetas/{prescription_id}", response_model=schemas.Prescription)
-def get_prescription(
-    prescription_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def get_prescription(
+    prescription_id: int, db: DatabaseExecutor = Depends(get_executor)
 ):
-    prescription = prescriptions.get_prescription(conn, prescription_id)
+    prescription = await db.run(prescriptions.get_prescription, prescription_id)
     if not prescription:
         raise HTTPException(status_code=404, detail="Receta no encontrada.")
     return prescription
 
 
 @app.post("/recetas", response_model=schemas.Prescription)
-def create_prescription(
+async def create_prescription(
     payload: schemas.PrescriptionCreate,
-    background_tasks: BackgroundTasks,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    patient = patients.get_patient(conn, payload.paciente_id)
-    doctor = doctors.get_doctor(conn, payload.medico_id)
+    patient = await db.run(patients.get_patient, payload.paciente_id)
+    doctor = await db.run(doctors.get_doctor, payload.medico_id)
     if not patient or not doctor:
         raise HTTPException(status_code=404, detail="Paciente o medico no encontrado.")
 
-    new_id = prescriptions.create_prescription(conn, payload.dict())
-    patient_name = f"{patient['nombre']} {patient['apellido']}"
-    doctor_name = f"{doctor['nombre']} {doctor['apellido']}"
-    background_tasks.add_task(
-        prescription_notifier.notify_prescription,
-        patient_name,
-        patient["mail"],
-        doctor_name,
-        payload.descripcion,
-    )
+    new_id = await db.run(prescriptions.create_prescription, payload.dict())
+    event_bus.publish(events.prescription_issued_event(new_id, patient, doctor, payload.descripcion))
     return {"id": new_id, **payload.dict()}
 
 
+@app.post("/recetas/lote", response_model=schemas.BulkCreateResult)
+async def bulk_create_prescriptions(
+    payload: schemas.BulkCreateRequest, db: DatabaseExecutor = Depends(get_executor)
+):
+    # Carga de datos migrados: no se notifica al paciente por cada receta.
+    return await db.run(
+        bulk.bulk_create, schemas.PrescriptionCreate, payload.filas, prescriptions.bulk_create_prescriptions
+    )
+
+
 @app.delete("/recetas/{prescription_id}")
-def delete_prescription(
-    prescription_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def delete_prescription(
+    prescription_id: int, db: DatabaseExecutor = Depends(get_executor)
 ):
-    deleted = prescriptions.delete_prescription(conn, prescription_id)
+    deleted = await db.run(prescriptions.delete_prescription, prescription_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Receta no encontrada.")
     return {"deleted": True}
 
 
+@app.get("/pacientes/{patient_id}/resumen", response_model=schemas.PatientSummary)
+async def get_patient_summary(
+    patient_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    summary = await db.run(patients.get_summary, patient_id, limit)
+    if not summary:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado.")
+    return summary
+
+
+@app.get("/pacientes/{patient_id}/turnos", response_model=List[schemas.PatientAppointment])
+async def list_patient_appointments(
+    patient_id: int,
+    cuando: str = Query("proximos", regex="^(proximos|pasados)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    if not await db.run(patients.get_patient, patient_id):
+        raise HTTPException(status_code=404, detail="Paciente no encontrado.")
+    return await db.run(appointments.list_patient_appointments, patient_id, cuando == "proximos", limit, offset)
+
+
 @app.get("/pacientes/{patient_id}/recetas", response_model=List[schemas.Prescription])
-def list_prescriptions(
-    patient_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def list_prescriptions(
+    patient_id: int, db: DatabaseExecutor = Depends(get_executor)
+):
+    return await db.run(prescriptions.list_prescriptions, patient_id)
+
+
+# --- Operaciones en lote ---
+@app.post("/batch", response_model=schemas.BatchResult)
+async def run_batch(payload: schemas.BatchRequest, db: DatabaseExecutor = Depends(get_executor)):
+    try:
+        results, pending = await db.run(batch.run_batch, [operation.dict() for operation in payload.operaciones])
+    except batch.BatchError as exc:
+        raise HTTPException(status_code=400, detail={"operacion": exc.index, "error": exc.detail})
+    for event in pending:
+        event_bus.publish(event)
+    return {"resultados": results}
+
+
+@app.post("/importar/{tipo}")
+async def import_csv(
+    tipo: str,
+    request: Request,
+    lote: int = Query(csv_import.CHUNK_SIZE, ge=1, le=10000),
+    db: DatabaseExecutor = Depends(get_import_executor),
+):
+    """Importa un CSV enviado como cuerpo crudo (``text/csv``) y responde el avance como NDJSON."""
+    if tipo not in csv_import.IMPORTERS:
+        raise HTTPException(status_code=404, detail="Tipo de importacion inexistente.")
+    # El cuerpo se vuelca a un archivo temporal a medida que llega (a disco pasados 8 MB).
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    async for chunk in request.stream():
+        # Pasados los 8 MB escribir es I/O de disco: fuera del event loop.
+        await asyncio.to_thread(spool.write, chunk)
+    spool.seek(0)
+    lines = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv_import.open_reader(tipo, lines)
+    except (ValueError, csv.Error) as exc:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def progress():
+        try:
+            # Todos los bloques corren en el mismo hilo (y conexion) del pool de importaciones.
+            async for step in db.stream(csv_import.import_rows, tipo, reader, lote):
+                yield json.dumps(step, ensure_ascii=False) + "\n"
+        except (ValueError, csv.Error) as exc:
+            # Los bloques ya confirmados quedan cargados; se informa donde se corto.
+            yield json.dumps({"error": str(exc)}, ensure_ascii=False) + "\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
+# --- Sincronizacion incremental ---
+@app.get("/cambios", response_model=schemas.ChangeFeed)
+async def list_changes(
+    desde: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    tabla: Optional[List[str]] = Query(None),
+    db: DatabaseExecutor = Depends(get_executor),
 ):
-    return prescriptions.list_prescriptions(conn, patient_id)
+    unknown = set(tabla or ()) - set(CHANGE_LOG_TABLES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tablas sin registro de cambios: {', '.join(sorted(unknown))}")
+    first, last, rows = await db.run(changes.read_feed, desde, limit, tabla)
+    if desde < first - 1:
+        raise HTTPException(
+            status_code=410, detail="El registro ya no cubre ese punto; hay que resincronizar con los listados."
+        )
+    hay_mas = len(rows) == limit
+    # Sin mas resultados el cliente puede avanzar hasta el ultimo seq aunque el filtro de tablas no lo incluya.
+    return {"cambios": rows, "hasta": rows[-1]["seq"] if hay_mas else max(desde, last), "hay_mas": hay_mas}
 
 
 # --- Reportes ---
 @app.get("/reportes/turnos-medico")
-def report_appointments_by_doctor(
+async def report_appointments_by_doctor(
     medico_id: int,
     fecha_inicio: datetime,
     fecha_fin: datetime,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_report_executor),
 ):
-    data = reports.appointments_by_doctor(conn, medico_id, fecha_inicio, fecha_fin)
+    data = await db.run(reports.appointments_by_doctor, medico_id, fecha_inicio, fecha_fin)
     return {"items": data, "total": len(data)}
 
 
 @app.get("/reportes/turnos-por-especialidad")
-def report_count_by_specialty(
-    conn: sqlite3.Connection = Depends(get_connection),
+async def report_count_by_specialty(
+    db: DatabaseExecutor = Depends(get_report_executor),
 ):
-    data = reports.count_by_specialty(conn)
+    data = await db.run(reports.count_by_specialty)
     return {"items": data}
 
 
 @app.get("/reportes/pacientes-atendidos")
-def report_patients_attended(
+async def report_patients_attended(
     fecha_inicio: datetime,
     fecha_fin: datetime,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_report_executor),
 ):
-    data = reports.patients_attended(conn, fecha_inicio, fecha_fin)
+    data = await db.run(reports.patients_attended, fecha_inicio, fecha_fin)
     return {"items": data, "total": len(data)}
 
 
 @app.get("/reportes/asistencias")
-def report_attendance_stats(
+async def report_attendance_stats(
     fecha_inicio: datetime,
     fecha_fin: datetime,
-    conn: sqlite3.Connection = Depends(get_connection),
+    db: DatabaseExecutor = Depends(get_report_executor),
 ):
-    return reports.attendance_stats(conn, fecha_inicio, fecha_fin)
+    return await db.run(reports.attendance_stats, fecha_inicio, fecha_fin)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+from typing import Iterable, Tuple
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.security import verify_token
+
+
+class AuthMiddleware:
+    """Middleware ASGI puro que exige un Bearer JWT valido fuera de las rutas abiertas.
+
+    En ``query_token_paths`` el token tambien se acepta como ``?token=``: ``EventSource`` del
+    navegador no puede enviar el header ``Authorization``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        open_paths: Iterable[str] = (),
+        open_prefixes: Tuple[str, ...] = ("/docs", "/static"),
+        query_token_paths: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.open_paths = frozenset(open_paths)
+        self.open_prefixes = open_prefixes
+        self.query_token_paths = frozenset(query_token_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self.open_paths or path.startswith(self.open_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+                break
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if not authorization and path in self.query_token_paths:
+            scheme, token = "bearer", parse_qs(scope["query_string"].decode("latin-1")).get("token", [""])[0]
+        if scheme.lower() != "bearer" or not token:
+            await JSONResponse({"detail": "No autorizado"}, status_code=401)(scope, receive, send)
+            return
+
+        try:
+            username = verify_token(token.strip())
+            if not username:
+                raise ValueError("invalid subject")
+        except Exception:
+            await JSONResponse({"detail": "Token invalido o expirado"}, status_code=401)(scope, receive, send)
+            return
+
+        scope.setdefault("state", {})["user"] = username
+        await self.app(scope, receive, send)
@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class AvailabilityChanged:
+    """Cambio en una franja: ``creada``, ``modificada``, ``reservada``, ``liberada`` o ``eliminada``."""
+
+    tipo: str
+    medico_id: int
+    especialidad_id: Optional[int]
+    fecha: str
+    disponibilidad_id: Optional[int] = None
+    sub_turno: Optional[int] = None
+
+
+class Subscription:
+    """Cola asyncio de un cliente, con filtro opcional por medico o especialidad.
+
+    Si el cliente no consume y la cola se llena, los eventos siguientes se descartan y se
+    marca ``overflowed``: el cliente debe recargar la disponibilidad completa.
+    """
+
+    def __init__(
+        self, loop: asyncio.AbstractEventLoop, medico_id: Optional[int], especialidad_id: Optional[int], size: int
+    ) -> None:
+        self.loop = loop
+        self.medico_id = medico_id
+        self.especialidad_id = especialidad_id
+        self.queue: "asyncio.Queue[Tuple[int, AvailabilityChanged]]" = asyncio.Queue(size)
+        self.overflowed = False
+
+    def matches(self, event: AvailabilityChanged) -> bool:
+        return (self.medico_id is None or event.medico_id == self.medico_id) and (
+            self.especialidad_id is None or event.especialidad_id == self.especialidad_id
+        )
+
+    def _offer(self, item: Tuple[int, AvailabilityChanged]) -> None:
+        if self.queue.full():
+            self.overflowed = True
+            return
+        self.queue.put_nowait(item)
+
+
+class Broadcaster:
+    """Reparte eventos publicados desde cualquier hilo a suscriptores asyncio (``GET /eventos``).
+
+    Cada suscriptor es una cola en el event loop, sin hilo propio. Publicar sin suscriptores
+    no cuesta mas que tomar un lock.
+    """
+
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._subscriptions: List[Subscription] = []
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self, medico_id: Optional[int] = None, especialidad_id: Optional[int] = None) -> Subscription:
+        """Debe llamarse desde el event loop que va a consumir la suscripcion."""
+        subscription = Subscription(asyncio.get_running_loop(), medico_id, especialidad_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, event: AvailabilityChanged) -> None:
+        with self._lock:
+            targets = [subscription for subscription in self._subscriptions if subscription.matches(event)]
+            item = (next(self._sequence), event)
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, item)
+            except RuntimeError:
+                # Loop cerrado: el cliente ya se fue.
+                self.unsubscribe(subscription)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Type, Union
+
+from app.observers.base import Observer
+
+Handler = Union[Observer, Callable[[Any], None]]
+
+
+class EventBus:
+    """Bus de eventos en proceso con suscriptores registrados una sola vez.
+
+    Con ``workers=0`` despacha en el hilo de quien publica; con ``workers>0`` usa
+    un pool de hilos y ``publish`` retorna sin esperar a los suscriptores.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        self.workers = workers
+        self._subscribers: Dict[type, List[Handler]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_type: Type, handler: Handler) -> None:
+        with self._lock:
+            handlers = self._subscribers.setdefault(event_type, [])
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def unsubscribe(self, event_type: Type, handler: Handler) -> None:
+        with self._lock:
+            handlers = self._subscribers.get(event_type, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def publish(self, event: Any) -> None:
+        with self._lock:
+            handlers = list(self._subscribers.get(type(event), ()))
+        if not handlers:
+            return
+        if not self.workers:
+            for handler in handlers:
+                self._dispatch(handler, event)
+            return
+        executor = self._get_executor()
+        for handler in handlers:
+            executor.submit(self._dispatch, handler, event)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Espera los eventos pendientes; el pool se recrea si se vuelve a publicar."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="event-bus")
+            return self._executor
+
+    @staticmethod
+    def _dispatch(handler: Handler, event: Any) -> None:
+        try:
+            if isinstance(handler, Observer):
+                handler.update(event)
+            else:
+                handler(event)
+        except Exception as exc:
+            print(f"[EVENT BUS] error en suscriptor de {type(event).__name__}: {exc!r}")
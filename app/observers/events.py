@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Mapping, Optional
+
+
+@dataclass(frozen=True)
+class AppointmentCreated:
+    turno_id: int
+    paciente_id: int
+    medico_id: int
+    disponibilidad_id: Optional[int]
+    fecha: datetime
+    paciente_nombre: str
+    paciente_mail: str
+    medico_nombre: str
+    especialidad_nombre: str
+
+
+def appointment_created_event(turno: Mapping) -> AppointmentCreated:
+    """Arma el evento a partir de la fila de ``appointments.get_appointment``."""
+    return AppointmentCreated(
+        turno_id=turno["id"],
+        paciente_id=turno["paciente_id"],
+        medico_id=turno["medico_id"],
+        disponibilidad_id=turno["disponibilidad_id"],
+        fecha=datetime.fromisoformat(turno["fecha"]),
+        paciente_nombre=f"{turno['paciente_nombre']} {turno['paciente_apellido']}",
+        paciente_mail=turno["paciente_mail"],
+        medico_nombre=f"{turno['medico_nombre']} {turno['medico_apellido']}",
+        especialidad_nombre=turno["especialidad_nombre"],
+    )
+
+
+@dataclass(frozen=True)
+class AppointmentStatusChanged:
+    turno_id: int
+    paciente_id: int
+    medico_id: int
+    disponibilidad_id: Optional[int]
+    estado_anterior: str
+    estado: str
+
+
+def appointment_status_changed_event(previous: Mapping, estado: str) -> AppointmentStatusChanged:
+    """Arma el evento a partir del turno tal como estaba antes del cambio de estado."""
+    return AppointmentStatusChanged(
+        turno_id=previous["id"],
+        paciente_id=previous["paciente_id"],
+        medico_id=previous["medico_id"],
+        disponibilidad_id=previous["disponibilidad_id"],
+        estado_anterior=previous["estado"],
+        estado=estado,
+    )
+
+
+@dataclass(frozen=True)
+class PrescriptionIssued:
+    receta_id: int
+    paciente_id: int
+    medico_id: int
+    paciente_nombre: str
+    paciente_mail: str
+    medico_nombre: str
+    descripcion: str
+
+
+def prescription_issued_event(
+    receta_id: int, patient: Mapping, doctor: Mapping, descripcion: str
+) -> PrescriptionIssued:
+    """Arma el evento a partir de las filas de paciente y medico."""
+    return PrescriptionIssued(
+        receta_id=receta_id,
+        paciente_id=patient["id"],
+        medico_id=doctor["id"],
+        paciente_nombre=f"{patient['nombre']} {patient['apellido']}",
+        paciente_mail=patient["mail"],
+        medico_nombre=f"{doctor['nombre']} {doctor['apellido']}",
+        descripcion=descripcion,
+    )
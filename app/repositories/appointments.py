@@ -1,119 +1,177 @@
+import json
 import sqlite3
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from typing import Dict, List, Optional, Tuple
 
+from app.db import transaction
+from app.repositories import availability as availability_repo
 from app.repositories import clinical_history
 
 
+SLOT_TAKEN = "La disponibilidad ya fue asignada a otro turno."
+SUB_SLOT_TAKEN = "El sub-turno ya fue asignado a otro turno."
+
+
+def _slot_window(
+    availability: sqlite3.Row, target_date: datetime
+) -> Tuple[Optional[int], Optional[datetime], Optional[int], str]:
+    """Elige el sub-turno y calcula inicio y duracion del turno a partir de la disponibilidad.
+
+    En franjas sin ``duracion_turno`` el turno ocupa la franja completa. Con sub-turnos,
+    la hora de ``target_date`` elige el sub-turno; si es 00:00 se toma el primero libre.
+    """
+    if not availability["fecha"]:
+        return None, None, None, "La disponibilidad no tiene fecha asignada."
+    try:
+        availability_date = datetime.strptime(availability["fecha"], "%Y-%m-%d").date()
+    except ValueError:
+        return None, None, None, "Formato de fecha de disponibilidad invalido."
+
+    if target_date.date() != availability_date:
+        return None, None, None, "La fecha no coincide con la disponibilidad."
+
+    try:
+        start_time = datetime.strptime(availability["hora_inicio"], "%H:%M").time()
+        end_time = datetime.strptime(availability["hora_fin"], "%H:%M").time()
+    except ValueError:
+        return None, None, None, "Formato de hora de disponibilidad invalido."
+    start_dt = datetime.combine(availability_date, start_time)
+    end_dt = datetime.combine(availability_date, end_time)
+    if end_dt <= start_dt:
+        return None, None, None, "Rango horario invalido en la disponibilidad."
+
+    now = datetime.now()
+    block_minutes = int((end_dt - start_dt).total_seconds() // 60)
+    step = availability["duracion_turno"]
+    if not step:
+        if start_dt <= now:
+            return None, None, None, "No se pueden asignar turnos en el pasado."
+        return 0, start_dt, block_minutes, ""
+
+    count = availability_repo.sub_slot_count(0, block_minutes, step)
+    requested = target_date.time()
+    if requested == time(0, 0):
+        elapsed = int((now - start_dt).total_seconds() // 60)
+        skip = min(count, elapsed // step + 1) if elapsed >= 0 else 0
+        index = availability_repo.first_free_sub_slot(availability["ocupacion"], count, skip)
+        if index is None:
+            if skip >= count:
+                return None, None, None, "No se pueden asignar turnos en el pasado."
+            return None, None, None, SLOT_TAKEN
+    else:
+        offset = int((datetime.combine(availability_date, requested) - start_dt).total_seconds() // 60)
+        if offset < 0 or offset % step or offset // step >= count:
+            return None, None, None, "El horario no coincide con un sub-turno de la disponibilidad."
+        index = offset // step
+        if (availability["ocupacion"] >> index) & 1:
+            return None, None, None, SUB_SLOT_TAKEN
+
+    slot_start = start_dt + timedelta(minutes=index * step)
+    if slot_start <= now:
+        return None, None, None, "No se pueden asignar turnos en el pasado."
+    return index, slot_start, step, ""
+
+
 def _validate_slot_selection(
     conn: sqlite3.Connection, medico_id: int, availability_id: int, target_date: datetime
-) -> Tuple[bool, Optional[datetime], Optional[int], str]:
+) -> Tuple[bool, Optional[datetime], Optional[int], Optional[int], str]:
+    """Devuelve (ok, inicio, duracion, sub_turno, motivo) para reservar en la disponibilidad."""
     cursor = conn.cursor()
     cursor.execute(
         """
-        SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa
+        SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa, duracion_turno, ocupacion
         FROM disponibilidad_medicos
         WHERE id = ?
         """,
         (availability_id,),
     )
     availability = cursor.fetchone()
+    cursor.close()
     if not availability:
-        cursor.close()
-        return False, None, None, "Disponibilidad inexistente."
+        return False, None, None, None, "Disponibilidad inexistente."
     if availability["medico_id"] != medico_id:
-        cursor.close()
-        return False, None, None, "La disponibilidad no pertenece al medico."
+        return False, None, None, None, "La disponibilidad no pertenece al medico."
     if availability["activa"] == 0:
-        cursor.close()
-        return False, None, None, "La disponibilidad ya fue asignada a otro turno."
-    if not availability["fecha"]:
-        cursor.close()
-        return False, None, None, "La disponibilidad no tiene fecha asignada."
+        return False, None, None, None, SLOT_TAKEN
 
-    try:
-        availability_date = datetime.strptime(availability["fecha"], "%Y-%m-%d").date()
-    except ValueError:
-        cursor.close()
-        return False, None, None, "Formato de fecha de disponibilidad invalido."
+    sub_turno, start_dt, duration_minutes, reason = _slot_window(availability, target_date)
+    if reason:
+        return False, None, None, None, reason
+    return True, start_dt, duration_minutes, sub_turno, ""
 
-    if target_date.date() != availability_date:
-        cursor.close()
-        return False, None, None, "La fecha no coincide con la disponibilidad."
 
+def _claim_sub_slot(cursor: sqlite3.Cursor, availability_id: int, sub_turno: int) -> bool:
+    """Marca el bit del sub-turno con un UPDATE condicional; False si ya estaba ocupado."""
     cursor.execute(
-        """
-        SELECT id FROM turnos
-        WHERE disponibilidad_id = ? AND estado != 'cancelado'
+        f"""
+        UPDATE disponibilidad_medicos
+        SET ocupacion = ocupacion | ?1,
+            activa = CASE WHEN (ocupacion | ?1) = {availability_repo.FULL_MASK_SQL} THEN 0 ELSE 1 END
+        WHERE id = ?2 AND (ocupacion & ?1) = 0
         """,
-        (availability_id,),
+        (1 << sub_turno, availability_id),
     )
-    if cursor.fetchone():
-        cursor.close()
-        return False, None, None, "La disponibilidad ya fue asignada a otro turno."
-
-    try:
-        start_time = datetime.strptime(availability["hora_inicio"], "%H:%M").time()
-        end_time = datetime.strptime(availability["hora_fin"], "%H:%M").time()
-    except ValueError:
-        cursor.close()
-        return False, None, None, "Formato de hora de disponibilidad invalido."
-    start_dt = datetime.combine(availability_date, start_time)
-    end_dt = datetime.combine(availability_date, end_time)
-    if end_dt <= start_dt:
-        cursor.close()
-        return False, None, None, "Rango horario invalido en la disponibilidad."
+    return cursor.rowcount == 1
 
-    if start_dt <= datetime.now():
-        cursor.close()
-        return False, None, None, "No se pueden asignar turnos en el pasado."
 
-    duration_minutes = int((end_dt - start_dt).total_seconds() // 60)
-    cursor.close()
-    return True, start_dt, duration_minutes, ""
+def _release_sub_slot(cursor: sqlite3.Cursor, availability_id: int, sub_turno: int) -> None:
+    cursor.execute(
+        "UPDATE disponibilidad_medicos SET ocupacion = ocupacion & ~?1, activa = 1 WHERE id = ?2",
+        (1 << sub_turno, availability_id),
+    )
 
 
 def create_appointment(conn: sqlite3.Connection, data: Dict) -> int:
     target_date: datetime = data["fecha"]
-    is_ok, start_dt, duration, reason = _validate_slot_selection(
-        conn, data["medico_id"], data["disponibilidad_id"], target_date
-    )
-    if not is_ok or not start_dt or duration is None:
-        raise ValueError(reason)
+    # BEGIN IMMEDIATE: la lectura de la ocupacion y el UPDATE condicional no se intercalan con otra reserva.
+    with transaction(conn):
+        is_ok, start_dt, duration, sub_turno, reason = _validate_slot_selection(
+            conn, data["medico_id"], data["disponibilidad_id"], target_date
+        )
+        if not is_ok or not start_dt or duration is None:
+            raise ValueError(reason)
 
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO turnos (paciente_id, medico_id, disponibilidad_id, fecha, estado, motivo_consulta, duracion, recordatorio)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            data["paciente_id"],
-            data["medico_id"],
-            data["disponibilidad_id"],
-            start_dt.isoformat(sep=" "),
-            data["estado"],
-            data.get("motivo_consulta"),
-            duration,
-            "pendiente",
-        ),
-    )
-    cursor.execute(
-        "UPDATE disponibilidad_medicos SET activa = 0 WHERE id = ?",
-        (data["disponibilidad_id"],),
-    )
-    new_id = cursor.lastrowid
-    clinical_history.upsert_from_appointment(
-        conn,
-        turno_id=new_id,
-        paciente_id=data["paciente_id"],
-        estado=data["estado"],
-        fecha_turno=start_dt,
-        descripcion=data.get("motivo_consulta") or "Turno creado",
-        commit=False,
+        cursor = conn.cursor()
+        try:
+            if not _claim_sub_slot(cursor, data["disponibilidad_id"], sub_turno):
+                raise ValueError(SLOT_TAKEN)
+            try:
+                cursor.execute(
+                    """
+                    INSERT INTO turnos (paciente_id, medico_id, disponibilidad_id, fecha, estado, motivo_consulta, duracion, recordatorio, sub_turno)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        data["paciente_id"],
+                        data["medico_id"],
+                        data["disponibilidad_id"],
+                        start_dt.isoformat(sep=" "),
+                        data["estado"],
+                        data.get("motivo_consulta"),
+                        duration,
+                        "pendiente",
+                        sub_turno,
+                    ),
+                )
+            except sqlite3.IntegrityError as exc:
+                if "UNIQUE" in str(exc):
+                    raise ValueError(SLOT_TAKEN)
+                raise
+            new_id = cursor.lastrowid
+            clinical_history.upsert_from_appointment(
+                conn,
+                turno_id=new_id,
+                paciente_id=data["paciente_id"],
+                estado=data["estado"],
+                fecha_turno=start_dt,
+                descripcion=data.get("motivo_consulta") or "Turno creado",
+                commit=False,
+            )
+        finally:
+            cursor.close()
+    availability_repo.notify_change(
+        conn, "reservada", data["medico_id"], start_dt.date().isoformat(), data["disponibilidad_id"], sub_turno
     )
-    conn.commit()
-    cursor.close()
     return new_id
 
 
@@ -145,49 +203,163 @@ def list_appointments(conn: sqlite3.Connection, medico_id: Optional[int] = None)
     return [dict(row) for row in rows]
 
 
-def update_status(conn: sqlite3.Connection, appointment_id: int, estado: str) -> bool:
+# Recorren idx_turnos_paciente_fecha en el orden pedido: sin scan ni ordenamiento temporal.
+PATIENT_UPCOMING_QUERY = """
+    SELECT t.*, m.nombre as medico_nombre, m.apellido as medico_apellido, e.nombre as especialidad
+    FROM turnos t
+    JOIN medicos m ON t.medico_id = m.id
+    JOIN especialidades e ON m.especialidad_id = e.id
+    WHERE t.paciente_id = ?1 AND t.fecha >= ?2 AND (?5 OR t.estado != 'cancelado')
+    ORDER BY t.fecha
+    LIMIT ?3 OFFSET ?4
+"""
+PATIENT_PAST_QUERY = """
+    SELECT t.*, m.nombre as medico_nombre, m.apellido as medico_apellido, e.nombre as especialidad
+    FROM turnos t
+    JOIN medicos m ON t.medico_id = m.id
+    JOIN especialidades e ON m.especialidad_id = e.id
+    WHERE t.paciente_id = ?1 AND t.fecha < ?2 AND (?5 OR t.estado != 'cancelado')
+    ORDER BY t.fecha DESC
+    LIMIT ?3 OFFSET ?4
+"""
+
+
+def list_patient_appointments(
+    conn: sqlite3.Connection,
+    paciente_id: int,
+    upcoming: bool = True,
+    limit: int = 20,
+    offset: int = 0,
+    now: Optional[datetime] = None,
+    include_cancelled: bool = True,
+) -> List[dict]:
+    """Turnos de un paciente: proximos (del mas cercano en adelante) o pasados (del mas reciente hacia atras)."""
+    now = now or datetime.now()
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT disponibilidad_id, estado, paciente_id, fecha FROM turnos WHERE id = ?",
-        (appointment_id,),
+        PATIENT_UPCOMING_QUERY if upcoming else PATIENT_PAST_QUERY,
+        (paciente_id, now.isoformat(sep=" ", timespec="seconds"), limit, offset, include_cancelled),
     )
-    current = cursor.fetchone()
-    if not current:
-        cursor.close()
-        return False
-    disponibilidad_id = current["disponibilidad_id"]
-    previous_estado = current["estado"]
-    paciente_id = current["paciente_id"]
-    fecha_turno = current["fecha"]
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(row) for row in rows]
 
-    cursor.execute(
-        "UPDATE turnos SET estado = ? WHERE id = ?",
-        (estado, appointment_id),
-    )
-    updated = cursor.rowcount > 0
-    if updated and disponibilidad_id:
-        if estado == "cancelado" and previous_estado != "cancelado":
+
+def update_status(conn: sqlite3.Connection, appointment_id: int, estado: str) -> Optional[dict]:
+    """Actualiza el estado y devuelve el turno tal como estaba antes del cambio (None si no existe)."""
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
             cursor.execute(
-                "UPDATE disponibilidad_medicos SET activa = 1 WHERE id = ?",
-                (disponibilidad_id,),
+                "SELECT id, disponibilidad_id, sub_turno, estado, paciente_id, medico_id, fecha FROM turnos WHERE id = ?",
+                (appointment_id,),
             )
-        elif estado != "cancelado" and previous_estado == "cancelado":
+            current = cursor.fetchone()
+            if not current:
+                return None
+            disponibilidad_id = current["disponibilidad_id"]
+            previous_estado = current["estado"]
+
+            if disponibilidad_id:
+                if estado == "cancelado" and previous_estado != "cancelado":
+                    _release_sub_slot(cursor, disponibilidad_id, current["sub_turno"])
+                elif estado != "cancelado" and previous_estado == "cancelado":
+                    # Reactivar un turno cancelado exige volver a reclamar el sub-turno.
+                    if not _claim_sub_slot(cursor, disponibilidad_id, current["sub_turno"]):
+                        raise ValueError(SLOT_TAKEN)
             cursor.execute(
-                "UPDATE disponibilidad_medicos SET activa = 0 WHERE id = ?",
-                (disponibilidad_id,),
+                "UPDATE turnos SET estado = ? WHERE id = ?",
+                (estado, appointment_id),
             )
-    clinical_history.upsert_from_appointment(
-        conn,
-        turno_id=appointment_id,
-        paciente_id=paciente_id,
-        estado=estado,
-        fecha_turno=fecha_turno,
-        descripcion=f"Estado actualizado a {estado}",
-        commit=False,
-    )
-    conn.commit()
-    cursor.close()
-    return updated
+            clinical_history.upsert_from_appointment(
+                conn,
+                turno_id=appointment_id,
+                paciente_id=current["paciente_id"],
+                estado=estado,
+                fecha_turno=current["fecha"],
+                descripcion=f"Estado actualizado a {estado}",
+                commit=False,
+            )
+        finally:
+            cursor.close()
+    if disponibilidad_id and (estado == "cancelado") != (previous_estado == "cancelado"):
+        availability_repo.notify_change(
+            conn,
+            "liberada" if estado == "cancelado" else "reservada",
+            current["medico_id"],
+            current["fecha"],
+            disponibilidad_id,
+            current["sub_turno"],
+        )
+    return dict(current)
+
+
+def bulk_update_status(
+    conn: sqlite3.Connection,
+    estado: str,
+    ids: Optional[List[int]] = None,
+    hasta: Optional[datetime] = None,
+) -> List[dict]:
+    """Cambia el estado de muchos turnos en una sola transaccion, con sentencias por conjunto.
+
+    Con ``ids`` toma esos turnos; con ``hasta``, los ``programado`` anteriores a esa fecha.
+    Nunca reactiva cancelados (eso requiere reclamar el sub-turno uno por uno).
+    Devuelve los turnos afectados tal como estaban antes del cambio.
+    """
+    if estado == "programado":
+        raise ValueError("El cambio masivo no permite volver a 'programado'.")
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
+            if ids is not None:
+                cursor.execute(
+                    """
+                    SELECT id, paciente_id, medico_id, disponibilidad_id, sub_turno, estado, fecha FROM turnos
+                    WHERE id IN (SELECT value FROM json_each(?1)) AND estado NOT IN (?2, 'cancelado')
+                    ORDER BY id
+                    """,
+                    (json.dumps(ids), estado),
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT id, paciente_id, medico_id, disponibilidad_id, sub_turno, estado, fecha FROM turnos
+                    WHERE fecha < ? AND estado = 'programado'
+                    ORDER BY id
+                    """,
+                    (hasta.isoformat(sep=" "),),
+                )
+            affected = [dict(row) for row in cursor.fetchall()]
+            if not affected:
+                return []
+            affected_ids = json.dumps([row["id"] for row in affected])
+
+            cursor.execute(
+                "UPDATE turnos SET estado = ?1 WHERE id IN (SELECT value FROM json_each(?2))",
+                (estado, affected_ids),
+            )
+            if estado == "cancelado":
+                # Una sola actualizacion por franja con la mascara de todos sus sub-turnos liberados.
+                masks: Dict[int, int] = {}
+                for row in affected:
+                    if row["disponibilidad_id"]:
+                        masks[row["disponibilidad_id"]] = masks.get(row["disponibilidad_id"], 0) | (1 << row["sub_turno"])
+                cursor.executemany(
+                    "UPDATE disponibilidad_medicos SET ocupacion = ocupacion & ~?1, activa = 1 WHERE id = ?2",
+                    [(mask, availability_id) for availability_id, mask in masks.items()],
+                )
+            clinical_history.bulk_sync_from_appointments(
+                conn, affected_ids, estado, f"Estado actualizado a {estado}"
+            )
+        finally:
+            cursor.close()
+    if estado == "cancelado":
+        for row in affected:
+            if row["disponibilidad_id"]:
+                availability_repo.notify_change(
+                    conn, "liberada", row["medico_id"], row["fecha"], row["disponibilidad_id"], row["sub_turno"]
+                )
+    return affected
 
 
 def get_appointment(conn: sqlite3.Connection, appointment_id: int) -> Optional[dict]:
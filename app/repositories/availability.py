@@ -1,6 +1,12 @@
+import bisect
+import json
 import sqlite3
+import threading
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.db import after_commit, transaction
+from app.observers.broadcast import AvailabilityChanged, broadcaster
 
 
 def _next_weekday(start: date, weekday: int) -> date:
@@ -8,12 +14,23 @@ def _next_weekday(start: date, weekday: int) -> date:
     return start + timedelta(days=days_ahead)
 
 
+_checked_databases: Set[str] = set()
+
+
+def _db_file(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
 def _ensure_fecha_column(conn: sqlite3.Connection) -> None:
+    db_file = _db_file(conn)
+    if db_file in _checked_databases:
+        return
     cursor = conn.cursor()
     cursor.execute("PRAGMA table_info(disponibilidad_medicos)")
     cols = [row["name"] for row in cursor.fetchall()]
     if "fecha" in cols:
         cursor.close()
+        _checked_databases.add(db_file)
         return
     cursor.execute("ALTER TABLE disponibilidad_medicos ADD COLUMN fecha TEXT")
     conn.commit()
@@ -31,6 +48,195 @@ def _ensure_fecha_column(conn: sqlite3.Connection) -> None:
         )
     conn.commit()
     cursor.close()
+    _checked_databases.add(db_file)
+
+
+def to_minutes(value: str) -> int:
+    """Convierte "HH:MM" a minutos desde 00:00."""
+    try:
+        parsed = datetime.strptime(value, "%H:%M")
+    except ValueError:
+        raise ValueError("Formato de hora invalido, use HH:MM.")
+    return parsed.hour * 60 + parsed.minute
+
+
+MAX_SUB_SLOTS = 62
+MINUTES_PER_DAY = 24 * 60
+# Mascara con un bit por sub-turno, calculada en SQL a partir de las columnas de la fila.
+FULL_MASK_SQL = "((1 << COALESCE((fin_min - inicio_min) / duracion_turno, 1)) - 1)"
+
+
+def sub_slot_count(inicio_min: int, fin_min: int, duracion_turno: Optional[int]) -> int:
+    """Cantidad de sub-turnos de una franja; sin duracion_turno la franja es un solo turno."""
+    if not duracion_turno:
+        return 1
+    return (fin_min - inicio_min) // duracion_turno
+
+
+def first_free_sub_slot(ocupacion: int, count: int, skip: int = 0) -> Optional[int]:
+    """Indice del primer sub-turno libre con indice >= skip (bit mas bajo en 0), o None."""
+    mask = ocupacion | ((1 << skip) - 1)
+    index = (~mask & (mask + 1)).bit_length() - 1
+    return index if index < count else None
+
+
+def _validate_sub_slots(start: int, end: int, duracion_turno: Optional[int]) -> None:
+    if duracion_turno is None:
+        return
+    count = sub_slot_count(start, end, duracion_turno)
+    if count < 1:
+        raise ValueError("La duracion del turno no puede superar la franja.")
+    if count > MAX_SUB_SLOTS:
+        raise ValueError(f"La franja no puede tener mas de {MAX_SUB_SLOTS} sub-turnos.")
+
+
+class _DayIntervals:
+    """Franjas de un medico en una fecha, ordenadas y sin solapamiento, como [inicio, fin) en minutos.
+
+    Las filas que no entran en ese orden (solapamientos heredados de la BD) quedan en ``extra``
+    y se revisan una por una; las filas con horas corruptas ocupan el dia entero.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "extra")
+
+    def __init__(self) -> None:
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.ids: List[int] = []
+        self.extra: List[Tuple[int, int, int]] = []
+
+    def find_overlap(self, start: int, end: int) -> Optional[int]:
+        """Id de la franja que se superpone con [start, end), o None."""
+        # Primera franja que termina despues de `start`; solapa si empieza antes de `end`.
+        pos = bisect.bisect_right(self.ends, start)
+        if pos < len(self.starts) and self.starts[pos] < end:
+            return self.ids[pos]
+        for availability_id, other_start, other_end in self.extra:
+            if other_start < end and other_end > start:
+                return availability_id
+        return None
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.find_overlap(start, end) is not None
+
+    def add(self, availability_id: int, start: int, end: int) -> None:
+        pos = bisect.bisect_left(self.starts, start)
+        if (pos > 0 and self.ends[pos - 1] > start) or (pos < len(self.starts) and self.starts[pos] < end):
+            # Insertarla romperia el orden de `ends` que usa la busqueda binaria.
+            self.extra.append((availability_id, start, end))
+            return
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.ids.insert(pos, availability_id)
+
+    def block(self, availability_id: int) -> None:
+        """Fila con horas ilegibles: se la trata como si ocupara el dia entero."""
+        self.extra.append((availability_id, 0, MINUTES_PER_DAY))
+
+    def remove(self, availability_id: int, start: int) -> None:
+        for pos, item in enumerate(self.extra):
+            if item[0] == availability_id:
+                del self.extra[pos]
+                return
+        pos = bisect.bisect_left(self.starts, start)
+        while pos < len(self.starts) and self.starts[pos] == start:
+            if self.ids[pos] == availability_id:
+                del self.starts[pos], self.ends[pos], self.ids[pos]
+                return
+            pos += 1
+
+
+class AvailabilityIndex:
+    """Indice en memoria por (medico_id, fecha) para detectar solapamientos en O(log n).
+
+    Cada dia se carga perezosamente desde la BD la primera vez que se consulta y
+    se mantiene en altas y bajas hechas por este proceso.
+    """
+
+    def __init__(self) -> None:
+        self._days: Dict[Tuple[int, str], _DayIntervals] = {}
+        self._locations: Dict[int, Tuple[Tuple[int, str], int]] = {}
+        self.lock = threading.RLock()
+
+    def _day(self, conn: sqlite3.Connection, medico_id: int, fecha: str) -> _DayIntervals:
+        key = (medico_id, fecha)
+        day = self._days.get(key)
+        if day is not None:
+            return day
+        day = _DayIntervals()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id, inicio_min, fin_min, hora_inicio, hora_fin
+            FROM disponibilidad_medicos
+            WHERE medico_id = ? AND fecha = ?
+            ORDER BY inicio_min
+            """,
+            (medico_id, fecha),
+        )
+        for row in cursor.fetchall():
+            start, end = row["inicio_min"], row["fin_min"]
+            if start is None or end is None:
+                try:
+                    start, end = to_minutes(row["hora_inicio"]), to_minutes(row["hora_fin"])
+                except ValueError:
+                    # Si hay datos corruptos, bloquear el dia para no crear franjas solapadas.
+                    day.block(row["id"])
+                    self._locations[row["id"]] = (key, 0)
+                    continue
+            day.add(row["id"], start, end)
+            self._locations[row["id"]] = (key, start)
+        cursor.close()
+        self._days[key] = day
+        return day
+
+    def overlaps(self, conn: sqlite3.Connection, medico_id: int, fecha: str, start: int, end: int) -> bool:
+        with self.lock:
+            return self._day(conn, medico_id, fecha).overlaps(start, end)
+
+    def add(self, conn: sqlite3.Connection, availability_id: int, medico_id: int, fecha: str, start: int, end: int) -> None:
+        with self.lock:
+            key = (medico_id, fecha)
+            if key not in self._days:
+                # El dia se carga completo desde la BD (ya incluye la fila nueva).
+                self._day(conn, medico_id, fecha)
+                return
+            self._days[key].add(availability_id, start, end)
+            self._locations[availability_id] = (key, start)
+
+    def remove(self, availability_id: int) -> None:
+        with self.lock:
+            location = self._locations.pop(availability_id, None)
+            if location:
+                key, start = location
+                self._days[key].remove(availability_id, start)
+
+    def invalidate(self, medico_id: Optional[int] = None) -> None:
+        with self.lock:
+            keys = [key for key in self._days if medico_id is None or key[0] == medico_id]
+            for key in keys:
+                del self._days[key]
+            self._locations = {
+                av_id: loc for av_id, loc in self._locations.items() if loc[0] in self._days
+            }
+
+
+_indexes: Dict[str, AvailabilityIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(conn: sqlite3.Connection) -> AvailabilityIndex:
+    """Indice compartido por todas las conexiones del proceso a la misma base."""
+    db_file = _db_file(conn)
+    with _indexes_lock:
+        index = _indexes.get(db_file)
+        if index is None:
+            index = _indexes[db_file] = AvailabilityIndex()
+        return index
+
+
+def reset_index(conn: sqlite3.Connection) -> None:
+    get_index(conn).invalidate()
 
 
 def _has_overlap(
@@ -41,36 +247,26 @@ def _has_overlap(
     end_str: str,
 ) -> bool:
     """Verifica si el rango [start, end) se superpone con otra disponibilidad del mismo medico y fecha."""
-    _ensure_fecha_column(conn)
-    try:
-        new_start = datetime.strptime(start_str, "%H:%M").time()
-        new_end = datetime.strptime(end_str, "%H:%M").time()
-    except ValueError:
-        raise ValueError("Formato de hora invalido, use HH:MM.")
+    return get_index(conn).overlaps(conn, medico_id, fecha, to_minutes(start_str), to_minutes(end_str))
 
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT hora_inicio, hora_fin
-        FROM disponibilidad_medicos
-        WHERE medico_id = ? AND fecha = ?
-        """,
-        (medico_id, fecha),
-    )
-    rows = cursor.fetchall()
-    cursor.close()
 
-    for row in rows:
-        try:
-            existing_start = datetime.strptime(row["hora_inicio"], "%H:%M").time()
-            existing_end = datetime.strptime(row["hora_fin"], "%H:%M").time()
-        except ValueError:
-            # Si hay datos corruptos, prevenir crear otra franja solapada.
-            return True
-        # Solapa si start < other_end y end > other_start
-        if new_start < existing_end and new_end > existing_start:
-            return True
-    return False
+def notify_change(
+    conn: sqlite3.Connection,
+    tipo: str,
+    medico_id: int,
+    fecha: str,
+    disponibilidad_id: Optional[int] = None,
+    sub_turno: Optional[int] = None,
+) -> None:
+    """Avisa a los clientes de ``GET /eventos`` cuando confirma la transaccion en curso.
+
+    Sin suscriptores no consulta nada.
+    """
+    if not broadcaster.active:
+        return
+    row = conn.execute("SELECT especialidad_id FROM medicos WHERE id = ?", (medico_id,)).fetchone()
+    event = AvailabilityChanged(tipo, medico_id, row[0] if row else None, fecha[:10], disponibilidad_id, sub_turno)
+    after_commit(conn, lambda: broadcaster.publish(event))
 
 
 def create_availability(conn: sqlite3.Connection, data: Dict) -> int:
@@ -78,40 +274,291 @@ def create_availability(conn: sqlite3.Connection, data: Dict) -> int:
     fecha = data["fecha"]
     if isinstance(fecha, date):
         fecha = fecha.isoformat()
+    start, end = to_minutes(data["hora_inicio"]), to_minutes(data["hora_fin"])
+    duracion_turno = data.get("duracion_turno")
+    _validate_sub_slots(start, end, duracion_turno)
+
+    index = get_index(conn)
+    try:
+        with index.lock, transaction(conn):
+            if index.overlaps(conn, data["medico_id"], fecha, start, end):
+                raise ValueError("La disponibilidad se superpone con otra ya registrada para ese medico y fecha.")
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin, inicio_min, fin_min, duracion_turno)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (data["medico_id"], fecha, data["hora_inicio"], data["hora_fin"], start, end, duracion_turno),
+            )
+            new_id = cursor.lastrowid
+            cursor.close()
+            index.add(conn, new_id, data["medico_id"], fecha, start, end)
+    except sqlite3.Error:
+        index.invalidate(data["medico_id"])
+        raise
+    notify_change(conn, "creada", data["medico_id"], fecha, new_id)
+    return new_id
+
+
+def expand_weekly_pattern(
+    fecha_desde: date, fecha_hasta: date, bloques: Iterable[Dict]
+) -> List[Tuple[str, str, str, Optional[int]]]:
+    """Expande bloques semanales (dia_semana, hora_inicio, hora_fin) a (fecha, inicio, fin, duracion_turno)."""
+    by_weekday: Dict[int, List[Dict]] = {}
+    for bloque in bloques:
+        by_weekday.setdefault(int(bloque["dia_semana"]), []).append(bloque)
+    slots: List[Tuple[str, str, str, Optional[int]]] = []
+    current = fecha_desde
+    while current <= fecha_hasta:
+        for bloque in by_weekday.get(current.weekday(), ()):
+            slots.append(
+                (current.isoformat(), bloque["hora_inicio"], bloque["hora_fin"], bloque.get("duracion_turno"))
+            )
+        current += timedelta(days=1)
+    return slots
+
+
+def create_recurring_availability(
+    conn: sqlite3.Connection,
+    medico_id: int,
+    fecha_desde: date,
+    fecha_hasta: date,
+    bloques: Iterable[Dict],
+) -> Dict:
+    """Crea todas las franjas de un patron semanal en una transaccion.
+
+    Los solapamientos se verifican contra las franjas existentes (traidas en una sola
+    consulta) y entre los propios bloques; los que chocan se informan y no se insertan.
+    """
+    _ensure_fecha_column(conn)
+    bloques = list(bloques)
+    for bloque in bloques:
+        _validate_sub_slots(
+            to_minutes(bloque["hora_inicio"]), to_minutes(bloque["hora_fin"]), bloque.get("duracion_turno")
+        )
+    slots = expand_weekly_pattern(fecha_desde, fecha_hasta, bloques)
+    conflicts: List[Dict] = []
+    rows_to_insert: List[Tuple] = []
+    index = get_index(conn)
+    try:
+        with index.lock, transaction(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, fecha, inicio_min, fin_min, hora_inicio, hora_fin
+                FROM disponibilidad_medicos
+                WHERE medico_id = ? AND fecha BETWEEN ? AND ?
+                ORDER BY fecha, inicio_min
+                """,
+                (medico_id, fecha_desde.isoformat(), fecha_hasta.isoformat()),
+            )
+            days: Dict[str, _DayIntervals] = {}
+            for row in cursor.fetchall():
+                start, end = row["inicio_min"], row["fin_min"]
+                if start is None or end is None:
+                    try:
+                        start, end = to_minutes(row["hora_inicio"]), to_minutes(row["hora_fin"])
+                    except ValueError:
+                        start, end = 0, 24 * 60
+                days.setdefault(row["fecha"], _DayIntervals()).add(row["id"], start, end)
 
-    if _has_overlap(
-        conn,
-        data["medico_id"],
-        fecha,
-        data["hora_inicio"],
-        data["hora_fin"],
-    ):
-        raise ValueError("La disponibilidad se superpone con otra ya registrada para ese medico y fecha.")
+            for fecha, hora_inicio, hora_fin, duracion_turno in slots:
+                start, end = to_minutes(hora_inicio), to_minutes(hora_fin)
+                day = days.setdefault(fecha, _DayIntervals())
+                clash = day.find_overlap(start, end)
+                if clash is not None:
+                    conflicts.append(
+                        {
+                            "fecha": fecha,
+                            "hora_inicio": hora_inicio,
+                            "hora_fin": hora_fin,
+                            "motivo": "Se superpone con otro bloque del patron."
+                            if clash < 0
+                            else f"Se superpone con la disponibilidad {clash}.",
+                        }
+                    )
+                    continue
+                day.add(-1, start, end)
+                rows_to_insert.append((medico_id, fecha, hora_inicio, hora_fin, start, end, duracion_turno))
 
+            cursor.executemany(
+                """
+                INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin, inicio_min, fin_min, duracion_turno)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows_to_insert,
+            )
+            cursor.close()
+            # Los dias afectados se recargan desde la BD en la proxima consulta.
+            index.invalidate(medico_id)
+    except sqlite3.Error:
+        index.invalidate(medico_id)
+        raise
+    for fecha in sorted({row[1] for row in rows_to_insert}):
+        notify_change(conn, "creada", medico_id, fecha)
+    return {"creadas": len(rows_to_insert), "conflictos": conflicts}
+
+
+def upsert_availability_rows(
+    conn: sqlite3.Connection, rows: List[Tuple[int, Dict]]
+) -> Tuple[int, int, List[dict]]:
+    """Carga franjas sueltas ``(indice, datos)`` en una transaccion (importacion desde CSV).
+
+    Una franja identica (medico, fecha, inicio y fin) a una existente la actualiza: cambia
+    ``duracion_turno`` si todavia no tiene turnos. Las que se superponen con otra, las de
+    medicos inexistentes y las que no respetan los sub-turnos se informan como error.
+    Devuelve ``(insertadas, actualizadas, errores)``.
+    """
+    _ensure_fecha_column(conn)
+    errors: List[dict] = []
+    rows_to_insert: List[Tuple] = []
+    updates: List[Tuple] = []
+    medicos = {data["medico_id"] for _, data in rows}
+    index = get_index(conn)
+    try:
+        with index.lock, transaction(conn):
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM medicos WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(sorted(medicos)),)
+            )
+            existing_doctors = {row["id"] for row in cursor.fetchall()}
+            cursor.execute(
+                """
+                SELECT id, medico_id, fecha, inicio_min, fin_min, duracion_turno, ocupacion
+                FROM disponibilidad_medicos
+                WHERE (medico_id, fecha) IN (
+                    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?)
+                )
+                """,
+                (json.dumps(sorted({(data["medico_id"], data["fecha"].isoformat()) for _, data in rows})),),
+            )
+            blocks = {row["id"]: row for row in cursor.fetchall()}
+
+            for row_index, data in rows:
+                fecha = data["fecha"].isoformat()
+                start, end = to_minutes(data["hora_inicio"]), to_minutes(data["hora_fin"])
+                duracion_turno = data.get("duracion_turno")
+                if data["medico_id"] not in existing_doctors:
+                    errors.append({"indice": row_index, "error": "Medico inexistente."})
+                    continue
+                try:
+                    _validate_sub_slots(start, end, duracion_turno)
+                except ValueError as exc:
+                    errors.append({"indice": row_index, "error": str(exc)})
+                    continue
+                # Mismo indice que las altas individuales: se carga el dia si hace falta y se mantiene al dia.
+                clash = index._day(conn, data["medico_id"], fecha).find_overlap(start, end)
+                if clash is None:
+                    cursor.execute(
+                        """
+                        INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin, inicio_min, fin_min, duracion_turno)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (data["medico_id"], fecha, data["hora_inicio"], data["hora_fin"], start, end, duracion_turno),
+                    )
+                    index.add(conn, cursor.lastrowid, data["medico_id"], fecha, start, end)
+                    rows_to_insert.append((data["medico_id"], fecha))
+                    continue
+                block = blocks.get(clash)
+                if block is None or (block["inicio_min"], block["fin_min"]) != (start, end):
+                    errors.append({"indice": row_index, "error": "Se superpone con otra disponibilidad."})
+                elif block["duracion_turno"] != duracion_turno and block["ocupacion"]:
+                    errors.append({"indice": row_index, "error": "La disponibilidad ya tiene turnos asignados."})
+                else:
+                    updates.append((duracion_turno, clash))
+
+            cursor.executemany(
+                "UPDATE disponibilidad_medicos SET duracion_turno = ? WHERE id = ? AND ocupacion = 0",
+                [update for update in updates if blocks[update[1]]["duracion_turno"] != update[0]],
+            )
+            cursor.close()
+    except sqlite3.Error:
+        # Las altas de este bloque ya estaban en el indice: se recargan solo los medicos tocados.
+        for medico_id in medicos:
+            index.invalidate(medico_id)
+        raise
+    for medico_id, fecha in sorted(set(rows_to_insert)):
+        notify_change(conn, "creada", medico_id, fecha)
+    for duracion_turno, availability_id in updates:
+        block = blocks[availability_id]
+        if block["duracion_turno"] != duracion_turno:
+            notify_change(conn, "modificada", block["medico_id"], block["fecha"], availability_id)
+    return len(rows_to_insert), len(updates), errors
+
+
+NEXT_SLOTS_QUERY = """
+    SELECT d.id, d.medico_id, d.fecha, d.hora_inicio, d.hora_fin, d.inicio_min, d.fin_min,
+           d.duracion_turno, d.ocupacion,
+           m.nombre as medico_nombre, m.apellido as medico_apellido, m.especialidad_id
+    FROM disponibilidad_medicos d
+    JOIN medicos m ON m.id = d.medico_id
+    WHERE d.activa = 1 AND d.fecha >= ?1 AND (d.fecha > ?1 OR d.hora_fin > ?2)
+      AND (?3 IS NULL OR m.especialidad_id = ?3)
+    ORDER BY d.fecha, d.hora_inicio
+"""
+
+
+def find_next_free_slots(
+    conn: sqlite3.Connection,
+    especialidad_id: Optional[int],
+    desde: datetime,
+    limit: int = 10,
+) -> List[dict]:
+    """Los ``limit`` sub-turnos libres mas proximos a partir de ``desde``.
+
+    Recorre idx_disponibilidad_activa_fecha en orden (sin ordenar en memoria) y corta
+    apenas junta ``limit`` resultados; el primer sub-turno libre sale del bitmap.
+    """
+    fecha = desde.date().isoformat()
+    desde_min = desde.hour * 60 + desde.minute
     cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin)
-        VALUES (?, ?, ?, ?)
-        """,
-        (data["medico_id"], fecha, data["hora_inicio"], data["hora_fin"]),
-    )
-    conn.commit()
-    new_id = cursor.lastrowid
+    cursor.execute(NEXT_SLOTS_QUERY, (fecha, desde.strftime("%H:%M"), especialidad_id))
+    results: List[dict] = []
+    while len(results) < limit:
+        rows = cursor.fetchmany(max(limit, 16))
+        if not rows:
+            break
+        for row in rows:
+            start = row["inicio_min"] if row["inicio_min"] is not None else to_minutes(row["hora_inicio"])
+            end = row["fin_min"] if row["fin_min"] is not None else to_minutes(row["hora_fin"])
+            step = row["duracion_turno"] or (end - start)
+            count = sub_slot_count(start, end, row["duracion_turno"])
+            skip = 0
+            if row["fecha"] == fecha and desde_min > start:
+                skip = min(count, -(-(desde_min - start) // step))
+            index = first_free_sub_slot(row["ocupacion"], count, skip)
+            if index is None:
+                continue
+            results.append(
+                {
+                    "disponibilidad_id": row["id"],
+                    "medico_id": row["medico_id"],
+                    "medico_nombre": row["medico_nombre"],
+                    "medico_apellido": row["medico_apellido"],
+                    "especialidad_id": row["especialidad_id"],
+                    "fecha": row["fecha"],
+                    "hora_inicio": _format_minutes(start + index * step),
+                    "hora_fin": _format_minutes(start + (index + 1) * step),
+                    "sub_turno": index,
+                }
+            )
+            if len(results) == limit:
+                break
     cursor.close()
-    return new_id
+    return results
 
 
 def list_availability(conn: sqlite3.Connection, medico_id: Optional[int] = None) -> List[dict]:
     cursor = conn.cursor()
     if medico_id:
         cursor.execute(
-            "SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa FROM disponibilidad_medicos WHERE medico_id = ? ORDER BY fecha, hora_inicio",
+            "SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa, duracion_turno FROM disponibilidad_medicos WHERE medico_id = ? ORDER BY fecha, hora_inicio",
             (medico_id,),
         )
     else:
         cursor.execute(
-            "SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa FROM disponibilidad_medicos ORDER BY medico_id, fecha, hora_inicio"
+            "SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa, duracion_turno FROM disponibilidad_medicos ORDER BY medico_id, fecha, hora_inicio"
         )
     rows = cursor.fetchall()
     cursor.close()
@@ -120,17 +567,23 @@ def list_availability(conn: sqlite3.Connection, medico_id: Optional[int] = None)
 
 def delete_availability(conn: sqlite3.Connection, availability_id: int) -> bool:
     cursor = conn.cursor()
-    cursor.execute("DELETE FROM disponibilidad_medicos WHERE id = ?", (availability_id,))
+    cursor.execute("DELETE FROM disponibilidad_medicos WHERE id = ? RETURNING medico_id, fecha", (availability_id,))
+    row = cursor.fetchone()
     conn.commit()
-    deleted = cursor.rowcount > 0
     cursor.close()
-    return deleted
+    if row:
+        get_index(conn).remove(availability_id)
+        notify_change(conn, "eliminada", row["medico_id"], row["fecha"] or "", availability_id)
+    return row is not None
 
 
 def get_availability(conn: sqlite3.Connection, availability_id: int) -> Optional[dict]:
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa FROM disponibilidad_medicos WHERE id = ?",
+        """
+        SELECT id, medico_id, fecha, hora_inicio, hora_fin, activa, inicio_min, fin_min, duracion_turno, ocupacion
+        FROM disponibilidad_medicos WHERE id = ?
+        """,
         (availability_id,),
     )
     row = cursor.fetchone()
@@ -146,3 +599,28 @@ def set_active(conn: sqlite3.Connection, availability_id: int, activa: bool) ->
     )
     conn.commit()
     cursor.close()
+
+
+def _format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def list_sub_slots(conn: sqlite3.Connection, availability_id: int) -> Optional[List[dict]]:
+    """Sub-turnos de una franja con su estado, leidos del bitmap de ocupacion."""
+    row = get_availability(conn, availability_id)
+    if not row:
+        return None
+    start = row["inicio_min"] if row["inicio_min"] is not None else to_minutes(row["hora_inicio"])
+    end = row["fin_min"] if row["fin_min"] is not None else to_minutes(row["hora_fin"])
+    step = row["duracion_turno"] or (end - start)
+    count = sub_slot_count(start, end, row["duracion_turno"])
+    ocupacion = row["ocupacion"]
+    return [
+        {
+            "indice": index,
+            "hora_inicio": _format_minutes(start + index * step),
+            "hora_fin": _format_minutes(start + (index + 1) * step),
+            "libre": not (ocupacion >> index) & 1,
+        }
+        for index in range(count)
+    ]
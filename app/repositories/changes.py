@@ -0,0 +1,66 @@
+import sqlite3
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from app.db import read_snapshot
+
+
+def list_changes(
+    conn: sqlite3.Connection, desde: int = 0, limit: int = 500, tablas: Optional[Sequence[str]] = None
+) -> List[dict]:
+    """Cambios con ``seq`` mayor a ``desde``, en orden; es un rango sobre la clave primaria."""
+    cursor = conn.cursor()
+    if tablas:
+        placeholders = ", ".join("?" for _ in tablas)
+        cursor.execute(
+            f"""
+            SELECT seq, tabla, fila_id, operacion, fecha FROM cambios
+            WHERE seq > ? AND tabla IN ({placeholders})
+            ORDER BY seq
+            LIMIT ?
+            """,
+            (desde, *tablas, limit),
+        )
+    else:
+        cursor.execute(
+            "SELECT seq, tabla, fila_id, operacion, fecha FROM cambios WHERE seq > ? ORDER BY seq LIMIT ?",
+            (desde, limit),
+        )
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(row) for row in rows]
+
+
+def bounds(conn: sqlite3.Connection) -> Tuple[int, int]:
+    """``(primer seq conservado, ultimo seq asignado)``; el ultimo sale de sqlite_sequence y sobrevive a la poda."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(seq) FROM cambios")
+    first = cursor.fetchone()[0]
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cambios'")
+    row = cursor.fetchone()
+    cursor.close()
+    last = row[0] if row else 0
+    return (first if first is not None else last + 1), last
+
+
+def read_feed(
+    conn: sqlite3.Connection, desde: int = 0, limit: int = 500, tablas: Optional[Sequence[str]] = None
+) -> Tuple[int, int, List[dict]]:
+    """``bounds`` y ``list_changes`` sobre la misma foto; sin filas si ``desde`` ya fue podado."""
+    with read_snapshot(conn):
+        first, last = bounds(conn)
+        rows = list_changes(conn, desde, limit, tablas) if desde >= first - 1 else []
+    return first, last, rows
+
+
+def prune(conn: sqlite3.Connection, before: datetime) -> int:
+    """Borra los cambios anteriores a ``before`` (UTC, como ``fecha``).
+
+    Los clientes con un ``desde`` anterior a lo podado reciben 410 y deben resincronizar.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM cambios WHERE fecha < ?", (before.isoformat(sep=" ", timespec="seconds"),))
+    conn.commit()
+    deleted = cursor.rowcount
+    cursor.close()
+    return deleted
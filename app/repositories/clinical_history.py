@@ -1,42 +1,62 @@
+import html
+import re
 import sqlite3
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from app.repositories.fts import is_available, match_query, tokens
+
+
+DUPLICATE_TURNO = "El turno ya tiene un registro de historial clinico."
+
+# Medico y especialidad se copian al escribir; los triggers trg_medicos_historial y
+# trg_especialidades_historial los mantienen al dia si cambian los nombres.
+_COLUMNS = (
+    "paciente_id, turno_id, descripcion, estado, fecha_turno, "
+    "medico_id, medico_nombre, medico_apellido, especialidad"
+)
+_DOCTOR_VALUES = "m.id, m.nombre, m.apellido, e.nombre"
+_DOCTOR_JOINS = """LEFT JOIN medicos m ON m.id = t.medico_id
+            LEFT JOIN especialidades e ON e.id = m.especialidad_id"""
+
 
 def _normalize_fecha(value: Optional[datetime]) -> Optional[str]:
     if value is None:
         return None
     if isinstance(value, datetime):
-        return value.isoformat(sep=" ")
+        return value.isoformat(sep=" ", timespec="seconds")
     try:
-        return datetime.fromisoformat(str(value)).isoformat(sep=" ")
+        return datetime.fromisoformat(str(value)).isoformat(sep=" ", timespec="seconds")
     except Exception:
         return None
 
 
-def add_record(conn: sqlite3.Connection, data: Dict) -> int:
+def add_record(conn: sqlite3.Connection, data: Dict, commit: bool = True) -> int:
     cursor = conn.cursor()
-    turno_id = data.get("turno_id")
-    fecha_turno = _normalize_fecha(data.get("fecha_turno"))
-    if turno_id and not fecha_turno:
-        cursor.execute("SELECT fecha FROM turnos WHERE id = ?", (turno_id,))
-        turno = cursor.fetchone()
-        fecha_turno = turno["fecha"] if turno else None
-
-    cursor.execute(
-        """
-        INSERT INTO historial_clinico (paciente_id, turno_id, descripcion, estado, fecha_turno)
-        VALUES (?, ?, ?, ?, ?)
-        """,
-        (
-            data["paciente_id"],
-            turno_id,
-            data["descripcion"],
-            data.get("estado", "programado"),
-            fecha_turno,
-        ),
-    )
-    conn.commit()
+    try:
+        cursor.execute(
+            f"""
+            INSERT INTO historial_clinico ({_COLUMNS})
+            SELECT ?1, ?2, ?3, ?4, COALESCE(?5, t.fecha), {_DOCTOR_VALUES}
+            FROM (SELECT 1)
+            LEFT JOIN turnos t ON t.id = ?2
+            {_DOCTOR_JOINS}
+            """,
+            (
+                data["paciente_id"],
+                data.get("turno_id"),
+                data["descripcion"],
+                data.get("estado", "programado"),
+                _normalize_fecha(data.get("fecha_turno")),
+            ),
+        )
+    except sqlite3.IntegrityError as exc:
+        cursor.close()
+        if "UNIQUE" in str(exc):
+            raise ValueError(DUPLICATE_TURNO)
+        raise
+    if commit:
+        conn.commit()
     new_id = cursor.lastrowid
     cursor.close()
     return new_id
@@ -51,62 +71,123 @@ def upsert_from_appointment(
     descripcion: Optional[str] = None,
     commit: bool = True,
 ) -> None:
-    """Sincroniza el historial en base a un turno (crea o actualiza)."""
+    """Sincroniza el historial en base a un turno (crea o actualiza) con un unico upsert sobre ux_historial_turno."""
     cursor = conn.cursor()
-    fecha_turno_norm = _normalize_fecha(fecha_turno)
     cursor.execute(
-        "SELECT id, descripcion FROM historial_clinico WHERE turno_id = ?",
-        (turno_id,),
+        f"""
+        INSERT INTO historial_clinico ({_COLUMNS})
+        SELECT ?1, ?2, COALESCE(?3, 'Seguimiento de turno'), ?4, ?5, {_DOCTOR_VALUES}
+        FROM turnos t
+        {_DOCTOR_JOINS}
+        WHERE t.id = ?2
+        ON CONFLICT(turno_id) DO UPDATE SET
+            estado = excluded.estado,
+            fecha_turno = excluded.fecha_turno,
+            descripcion = COALESCE(?3, historial_clinico.descripcion)
+        """,
+        (paciente_id, turno_id, descripcion or None, estado, _normalize_fecha(fecha_turno)),
     )
-    existing = cursor.fetchone()
-    note = descripcion or (existing["descripcion"] if existing else "Seguimiento de turno")
-
-    if existing:
-        cursor.execute(
-            """
-            UPDATE historial_clinico
-            SET estado = ?, fecha_turno = ?, descripcion = ?
-            WHERE turno_id = ?
-            """,
-            (estado, fecha_turno_norm, note, turno_id),
-        )
-    else:
-        cursor.execute(
-            """
-            INSERT INTO historial_clinico (paciente_id, turno_id, descripcion, estado, fecha_turno)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (paciente_id, turno_id, note, estado, fecha_turno_norm),
-        )
     if commit:
         conn.commit()
     cursor.close()
 
 
-def list_records(conn: sqlite3.Connection, paciente_id: Optional[int]) -> List[dict]:
+def bulk_sync_from_appointments(
+    conn: sqlite3.Connection, turno_ids_json: str, estado: str, descripcion: str
+) -> None:
+    """Version por conjunto de ``upsert_from_appointment`` para una lista JSON de turnos. No hace commit."""
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        INSERT INTO historial_clinico ({_COLUMNS})
+        SELECT t.paciente_id, t.id, ?2, ?1, t.fecha, {_DOCTOR_VALUES}
+        FROM turnos t
+        {_DOCTOR_JOINS}
+        WHERE t.id IN (SELECT value FROM json_each(?3))
+        ON CONFLICT(turno_id) DO UPDATE SET estado = excluded.estado, descripcion = excluded.descripcion
+        """,
+        (estado, descripcion, turno_ids_json),
+    )
+    cursor.close()
+
+
+def list_records(conn: sqlite3.Connection, paciente_id: Optional[int], limit: Optional[int] = None) -> List[dict]:
+    """Linea de tiempo del historial; por paciente es un rango de idx_historial_paciente_fecha, sin JOINs ni sort."""
     cursor = conn.cursor()
     base_query = """
-        SELECT
-            h.id,
-            h.paciente_id,
-            h.turno_id,
-            h.descripcion,
-            h.estado,
-            h.fecha_turno,
-            m.nombre as medico_nombre,
-            m.apellido as medico_apellido,
-            e.nombre as especialidad
-        FROM historial_clinico h
-        LEFT JOIN turnos t ON h.turno_id = t.id
-        LEFT JOIN medicos m ON t.medico_id = m.id
-        LEFT JOIN especialidades e ON m.especialidad_id = e.id
+        SELECT id, paciente_id, turno_id, descripcion, estado, fecha_turno,
+               medico_id, medico_nombre, medico_apellido, especialidad
+        FROM historial_clinico
     """
     params = ()
     if paciente_id is not None:
-        base_query += " WHERE h.paciente_id = ?"
+        base_query += " WHERE paciente_id = ?"
         params = (paciente_id,)
-    base_query += " ORDER BY datetime(h.fecha_turno) DESC, h.id DESC"
-    cursor.execute(base_query, params)
+    base_query += " ORDER BY fecha_turno DESC, id DESC LIMIT ?"
+    cursor.execute(base_query, (*params, -1 if limit is None else limit))
     rows = cursor.fetchall()
     cursor.close()
     return [dict(row) for row in rows]
+
+
+def highlight(fragment: str) -> str:
+    """Escapa el texto del fragmento y recien despues cambia los marcadores de snippet() por ``<mark>``."""
+    return html.escape(fragment).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def search_records(
+    conn: sqlite3.Connection,
+    text: str,
+    paciente_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[dict]:
+    """Busca en las descripciones via historial_fts (bm25) con un fragmento resaltado por resultado."""
+    query = match_query(text)
+    if not query:
+        return []
+    if not is_available(conn, "historial_fts"):
+        return _search_records_like(conn, tokens(text), paciente_id, limit, offset)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT h.id, h.paciente_id, h.turno_id, h.descripcion, h.estado, h.fecha_turno,
+               h.medico_id, h.medico_nombre, h.medico_apellido, h.especialidad,
+               snippet(historial_fts, 0, char(2), char(3), '…', 12) AS fragmento
+        FROM historial_fts
+        JOIN historial_clinico h ON h.id = historial_fts.rowid
+        WHERE historial_fts MATCH ?1 AND (?2 IS NULL OR historial_fts.paciente_id = ?2)
+        ORDER BY bm25(historial_fts), h.id DESC
+        LIMIT ?3 OFFSET ?4
+        """,
+        (query, paciente_id, limit, offset),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{**dict(row), "fragmento": highlight(row["fragmento"])} for row in rows]
+
+
+def _search_records_like(
+    conn: sqlite3.Connection, terms: List[str], paciente_id: Optional[int], limit: int, offset: int
+) -> List[dict]:
+    """Sin FTS5: cada termino con LIKE (recorre la tabla), del registro mas reciente al mas viejo."""
+    conditions = " AND ".join("descripcion LIKE ?" for _ in terms)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT id, paciente_id, turno_id, descripcion, estado, fecha_turno,
+               medico_id, medico_nombre, medico_apellido, especialidad
+        FROM historial_clinico
+        WHERE (? IS NULL OR paciente_id = ?) AND {conditions}
+        ORDER BY fecha_turno DESC, id DESC
+        LIMIT ? OFFSET ?
+        """,
+        (paciente_id, paciente_id, *(f"%{term}%" for term in terms), limit, offset),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    return [
+        {**dict(row), "fragmento": highlight(pattern.sub(lambda m: f"\x02{m.group(0)}\x03", row["descripcion"]))}
+        for row in rows
+    ]
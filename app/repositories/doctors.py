@@ -1,5 +1,9 @@
+import json
 import sqlite3
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from app.db import transaction
+from app.repositories import availability, fuzzy
 
 
 def create_doctor(conn: sqlite3.Connection, data: Dict) -> int:
@@ -17,6 +21,36 @@ def create_doctor(conn: sqlite3.Connection, data: Dict) -> int:
     return new_id
 
 
+def bulk_create_doctors(
+    conn: sqlite3.Connection, rows: List[Tuple[int, Dict]]
+) -> Tuple[List[Tuple[int, int]], List[dict]]:
+    """Alta masiva de medicos ``(indice, datos)``; las filas con especialidad inexistente se informan como error."""
+    errors: List[dict] = []
+    accepted: List[Tuple[int, Dict]] = []
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT id FROM especialidades WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps([data["especialidad_id"] for _, data in rows]),),
+            )
+            specialties = {row["id"] for row in cursor.fetchall()}
+            for index, data in rows:
+                if data["especialidad_id"] in specialties:
+                    accepted.append((index, data))
+                else:
+                    errors.append({"indice": index, "error": "Especialidad inexistente."})
+            cursor.executemany(
+                "INSERT INTO medicos (nombre, apellido, especialidad_id, mail) VALUES (?, ?, ?, ?)",
+                [(data["nombre"], data["apellido"], data["especialidad_id"], data["mail"]) for _, data in accepted],
+            )
+            cursor.execute("SELECT MAX(id) FROM medicos")
+            first_id = (cursor.fetchone()[0] or 0) - len(accepted) + 1
+        finally:
+            cursor.close()
+    return [(index, first_id + offset) for offset, (index, _) in enumerate(accepted)], errors
+
+
 def list_doctors(conn: sqlite3.Connection) -> List[dict]:
     cursor = conn.cursor()
     cursor.execute(
@@ -68,4 +102,89 @@ def delete_doctor(conn: sqlite3.Connection, doctor_id: int) -> bool:
     conn.commit()
     deleted = cursor.rowcount > 0
     cursor.close()
+    if deleted:
+        # ON DELETE CASCADE borra sus disponibilidades sin pasar por el repositorio.
+        availability.get_index(conn).invalidate(doctor_id)
     return deleted
+
+
+AGENDA_QUERY = """
+    SELECT d.id as disponibilidad_id, d.hora_inicio, d.hora_fin, d.duracion_turno, d.activa,
+           t.id as turno_id, t.sub_turno, t.fecha as turno_fecha, t.duracion, t.estado, t.motivo_consulta,
+           p.id as paciente_id, p.nombre as paciente_nombre, p.apellido as paciente_apellido
+    FROM disponibilidad_medicos d
+    LEFT JOIN turnos t ON t.disponibilidad_id = d.id AND t.estado != 'cancelado'
+    LEFT JOIN pacientes p ON p.id = t.paciente_id
+    WHERE d.medico_id = ? AND d.fecha = ?
+    ORDER BY d.inicio_min, t.sub_turno
+"""
+
+
+def get_agenda(conn: sqlite3.Connection, doctor_id: int, fecha: str) -> List[dict]:
+    """Franjas del dia con sus turnos no cancelados, armadas a partir de una sola consulta.
+
+    Usa idx_disponibilidad_medico_fecha para las franjas y el indice parcial de sub-turnos
+    activos (ux_turnos_subturno_activo) para los turnos de cada una.
+    """
+    cursor = conn.cursor()
+    cursor.execute(AGENDA_QUERY, (doctor_id, fecha))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    blocks: List[dict] = []
+    for row in rows:
+        if not blocks or blocks[-1]["disponibilidad_id"] != row["disponibilidad_id"]:
+            blocks.append(
+                {
+                    "disponibilidad_id": row["disponibilidad_id"],
+                    "hora_inicio": row["hora_inicio"],
+                    "hora_fin": row["hora_fin"],
+                    "duracion_turno": row["duracion_turno"],
+                    "activa": bool(row["activa"]),
+                    "turnos": [],
+                }
+            )
+        if row["turno_id"] is not None:
+            blocks[-1]["turnos"].append(
+                {
+                    "id": row["turno_id"],
+                    "sub_turno": row["sub_turno"],
+                    "fecha": row["turno_fecha"],
+                    "duracion": row["duracion"],
+                    "estado": row["estado"],
+                    "motivo_consulta": row["motivo_consulta"],
+                    "paciente_id": row["paciente_id"],
+                    "paciente_nombre": row["paciente_nombre"],
+                    "paciente_apellido": row["paciente_apellido"],
+                }
+            )
+    return blocks
+
+
+def search_doctors(
+    conn: sqlite3.Connection,
+    text: str,
+    fuzzy_match: bool = False,
+    threshold: float = fuzzy.DEFAULT_THRESHOLD,
+    limit: int = 20,
+) -> List[dict]:
+    """Busca medicos por nombre y apellido (y especialidad sin ``fuzzy_match``).
+
+    Los medicos son pocos: se puntuan todos en memoria con la misma similitud por
+    trigramas que usa la busqueda de pacientes.
+    """
+    query_words = fuzzy.words(text)
+    if not query_words:
+        return []
+    results = []
+    for doctor in list_doctors(conn):
+        if fuzzy_match:
+            score = fuzzy.score_names(query_words, doctor["nombre"], doctor["apellido"])
+        else:
+            names = fuzzy.words(f"{doctor['nombre']} {doctor['apellido']} {doctor['especialidad']}")
+            matches = all(any(name.startswith(word) for name in names) for word in query_words)
+            score = 1.0 if matches else 0.0
+        if score >= (threshold if fuzzy_match else 1.0):
+            results.append({**doctor, "similitud": round(score, 3)})
+    results.sort(key=lambda item: (-item["similitud"], item["apellido"], item["nombre"]))
+    return results[:limit]
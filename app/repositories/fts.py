@@ -0,0 +1,57 @@
+import re
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Tablas FTS5 de contenido externo creadas por init_db.
+FTS_TABLES: Tuple[str, ...] = ("pacientes_fts", "historial_fts")
+
+# Si cada tabla FTS existe, por archivo de BD: lo fija init_db una vez y las busquedas solo lo leen.
+_available: Dict[Tuple[str, str], bool] = {}
+
+
+def _db_file(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def set_available(conn: sqlite3.Connection, table: str, available: bool) -> None:
+    _available[(_db_file(conn), table)] = available
+
+
+def is_available(conn: sqlite3.Connection, table: str) -> bool:
+    """True si ``table`` existe; sin init_db en este proceso se consulta sqlite_master una sola vez."""
+    key = (_db_file(conn), table)
+    available = _available.get(key)
+    if available is None:
+        row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        available = _available[key] = row is not None
+    return available
+
+
+def tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text or "")
+
+
+def match_query(text: str, prefix: bool = True) -> Optional[str]:
+    """Convierte texto libre en una expresion MATCH de FTS5 segura (AND implicito entre terminos).
+
+    Cada termino va entre comillas para que operadores o comillas del usuario no rompan la
+    sintaxis; con ``prefix`` el ultimo termino (el que se esta tipeando) busca por prefijo.
+    """
+    words = tokens(text)
+    if not words:
+        return None
+    terms = [f'"{token}"' for token in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def rebuild(conn: sqlite3.Connection, table: str) -> None:
+    """Reconstruye el indice desde la tabla de contenido y lo compacta (uso offline)."""
+    if table not in FTS_TABLES:
+        raise ValueError(f"Tabla FTS desconocida: {table}")
+    conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    conn.commit()
@@ -0,0 +1,142 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_THRESHOLD = 0.3
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Minusculas y sin tildes, igual que el tokenizer ``unicode61 remove_diacritics 2`` de FTS5."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+@lru_cache(maxsize=65536)
+def words(text: str) -> Tuple[str, ...]:
+    # Cacheada: los nombres y apellidos se repiten mucho entre pacientes.
+    return tuple(_WORD_RE.findall(normalize(text)))
+
+
+def trigrams(word: str) -> FrozenSet[str]:
+    # Relleno al estilo pg_trgm: el inicio de la palabra pesa mas que el final.
+    padded = f"  {word} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard entre los trigramas de dos palabras ya normalizadas."""
+    ta, tb = trigrams(a), trigrams(b)
+    shared = len(ta & tb)
+    return shared / (len(ta) + len(tb) - shared) if shared else 0.0
+
+
+class TrigramIndex:
+    """Indice invertido trigrama -> palabras sobre el vocabulario de nombres (no sobre las filas).
+
+    Hay muchas menos palabras distintas que pacientes, asi que buscar las parecidas a un
+    termino cuesta lo mismo con 5 mil o 500 mil filas. Las palabras que quedan sin uso por
+    bajas o ediciones no se quitan: como mucho producen un candidato sin resultados.
+    """
+
+    def __init__(self, words: Iterable[str] = ()) -> None:
+        self._words: List[str] = []
+        self._sizes: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self.lock = threading.RLock()
+        self.add(words)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, new_words: Iterable[str]) -> None:
+        with self.lock:
+            for word in new_words:
+                if word in self._ids:
+                    continue
+                word_id = len(self._words)
+                grams = trigrams(word)
+                self._ids[word] = word_id
+                self._words.append(word)
+                self._sizes.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(word_id)
+
+    def similar(self, word: str, threshold: float = DEFAULT_THRESHOLD, limit: int = 20) -> List[Tuple[str, float]]:
+        grams = trigrams(word)
+        with self.lock:
+            shared: Counter = Counter()
+            for gram in grams:
+                shared.update(self._postings.get(gram, ()))
+            scored = []
+            for word_id, count in shared.items():
+                score = count / (len(grams) + self._sizes[word_id] - count)
+                if score >= threshold:
+                    scored.append((self._words[word_id], score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+_VOCABULARY_QUERIES = {
+    "pacientes": "SELECT nombre FROM pacientes UNION SELECT apellido FROM pacientes",
+}
+_indexes: Dict[Tuple[str, str], TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _db_file(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+def get_name_index(conn: sqlite3.Connection, table: str) -> TrigramIndex:
+    """Indice de nombres de ``table`` compartido por el proceso; se carga la primera vez que se usa."""
+    key = (_db_file(conn), table)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            cursor = conn.cursor()
+            cursor.execute(_VOCABULARY_QUERIES[table])
+            index = TrigramIndex(word for row in cursor.fetchall() for word in words(row[0] or ""))
+            cursor.close()
+            _indexes[key] = index
+        return index
+
+
+def note_names(conn: sqlite3.Connection, table: str, *names: Optional[str]) -> None:
+    """Agrega al indice (si ya esta cargado) las palabras de nombres recien escritos."""
+    index = _indexes.get((_db_file(conn), table))
+    if index is not None:
+        index.add(word for name in names for word in words(name or ""))
+
+
+def reset_indexes(conn: Optional[sqlite3.Connection] = None) -> None:
+    with _indexes_lock:
+        if conn is None:
+            _indexes.clear()
+            return
+        db_file = _db_file(conn)
+        for key in [key for key in _indexes if key[0] == db_file]:
+            del _indexes[key]
+
+
+def score_names(query_words: Sequence[str], *names: Optional[str]) -> float:
+    """Promedio, por palabra buscada, de la mejor similitud contra las palabras del nombre."""
+    name_words = [word for name in names for word in words(name or "")]
+    if not query_words or not name_words:
+        return 0.0
+    return sum(max(similarity(q, w) for w in name_words) for q in query_words) / len(query_words)
+
+
+def score_candidates(candidates: List[Dict[str, float]], *names: Optional[str]) -> float:
+    """Como ``score_names`` pero con las similitudes ya calculadas por ``TrigramIndex.similar``."""
+    name_words = [word for name in names if name for word in words(name)]
+    if not candidates or not name_words:
+        return 0.0
+    return sum(max(scores.get(w, 0.0) for w in name_words) for scores in candidates) / len(candidates)
@@ -1,20 +1,94 @@
+import json
 import sqlite3
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from app.db import read_snapshot, transaction
+from app.repositories import appointments, clinical_history, fuzzy, prescriptions
+from app.repositories.fts import is_available, match_query
 
-def create_patient(conn: sqlite3.Connection, data: Dict) -> int:
+
+def create_patient(conn: sqlite3.Connection, data: Dict, commit: bool = True) -> int:
     cursor = conn.cursor()
     try:
         cursor.execute(
             "INSERT INTO pacientes (dni, nombre, apellido, mail) VALUES (?, ?, ?, ?)",
             (data["dni"], data["nombre"], data["apellido"], data["mail"]),
         )
-        conn.commit()
+        if commit:
+            conn.commit()
+        fuzzy.note_names(conn, "pacientes", data["nombre"], data["apellido"])
         return cursor.lastrowid
     finally:
         cursor.close()
 
 
+def bulk_create_patients(
+    conn: sqlite3.Connection, rows: List[Tuple[int, Dict]]
+) -> Tuple[List[Tuple[int, int]], List[dict]]:
+    """Alta masiva de filas ya validadas ``(indice, datos)`` con un solo ``executemany``.
+
+    Las filas cuyo DNI ya existe (o se repite dentro del lote) se informan como error por
+    indice y el resto se inserta igual. Devuelve ``(indice, id)`` de las creadas y los errores.
+    """
+    errors: List[dict] = []
+    accepted: List[Tuple[int, Dict]] = []
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT dni FROM pacientes WHERE dni IN (SELECT value FROM json_each(?))",
+                (json.dumps([data["dni"] for _, data in rows]),),
+            )
+            existing = {row["dni"] for row in cursor.fetchall()}
+            seen = set()
+            for index, data in rows:
+                if data["dni"] in existing:
+                    errors.append({"indice": index, "error": "DNI ya registrado."})
+                elif data["dni"] in seen:
+                    errors.append({"indice": index, "error": "DNI repetido en el lote."})
+                else:
+                    seen.add(data["dni"])
+                    accepted.append((index, data))
+            cursor.executemany(
+                "INSERT INTO pacientes (dni, nombre, apellido, mail) VALUES (?, ?, ?, ?)",
+                [(data["dni"], data["nombre"], data["apellido"], data["mail"]) for _, data in accepted],
+            )
+            # AUTOINCREMENT con el lock de escritura tomado: los ids del lote son consecutivos.
+            cursor.execute("SELECT MAX(id) FROM pacientes")
+            first_id = (cursor.fetchone()[0] or 0) - len(accepted) + 1
+        finally:
+            cursor.close()
+    fuzzy.note_names(conn, "pacientes", *(name for _, data in accepted for name in (data["nombre"], data["apellido"])))
+    return [(index, first_id + offset) for offset, (index, _) in enumerate(accepted)], errors
+
+
+def upsert_patients(conn: sqlite3.Connection, rows: List[Tuple[int, Dict]]) -> Tuple[int, int, List[dict]]:
+    """Inserta o actualiza por DNI las filas ``(indice, datos)`` en una transaccion.
+
+    Devuelve ``(insertados, actualizados, errores)``; si un DNI se repite en el lote gana la ultima fila.
+    """
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT dni FROM pacientes WHERE dni IN (SELECT value FROM json_each(?))",
+                (json.dumps([data["dni"] for _, data in rows]),),
+            )
+            existing = {row["dni"] for row in cursor.fetchall()}
+            cursor.executemany(
+                """
+                INSERT INTO pacientes (dni, nombre, apellido, mail) VALUES (?, ?, ?, ?)
+                ON CONFLICT(dni) DO UPDATE SET nombre = excluded.nombre, apellido = excluded.apellido, mail = excluded.mail
+                """,
+                [(data["dni"], data["nombre"], data["apellido"], data["mail"]) for _, data in rows],
+            )
+        finally:
+            cursor.close()
+    fuzzy.note_names(conn, "pacientes", *(name for _, data in rows for name in (data["nombre"], data["apellido"])))
+    inserted = len({data["dni"] for _, data in rows} - existing)
+    return inserted, len(rows) - inserted, []
+
+
 def list_patients(conn: sqlite3.Connection) -> List[dict]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM pacientes ORDER BY apellido, nombre")
@@ -42,6 +116,7 @@ def update_patient(conn: sqlite3.Connection, patient_id: int, data: Dict) -> boo
         (data["dni"], data["nombre"], data["apellido"], data["mail"], patient_id),
     )
     conn.commit()
+    fuzzy.note_names(conn, "pacientes", data["nombre"], data["apellido"])
     updated = cursor.rowcount > 0
     cursor.close()
     return updated
@@ -54,3 +129,123 @@ def delete_patient(conn: sqlite3.Connection, patient_id: int) -> bool:
     deleted = cursor.rowcount > 0
     cursor.close()
     return deleted
+
+
+# Tope de candidatos a rankear: con prefijos muy comunes ("Ga") hay decenas de miles de
+# coincidencias y puntuarlas todas cuesta decenas de ms. Solo esas busquedas amplias se
+# limitan a las mas recientes; si hay hasta RANK_CANDIDATES coincidencias se rankean todas.
+RANK_CANDIDATES = 1000
+
+
+def _candidate_limit(cursor: sqlite3.Cursor, match: str) -> int:
+    """``RANK_CANDIDATES`` si la expresion tiene mas coincidencias que el tope; si no, -1 (sin limite)."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM pacientes_fts WHERE pacientes_fts MATCH ?1 LIMIT ?2)",
+        (match, RANK_CANDIDATES + 1),
+    )
+    return RANK_CANDIDATES if cursor.fetchone()[0] > RANK_CANDIDATES else -1
+
+
+def search_patients(conn: sqlite3.Connection, text: str, limit: int = 20) -> List[dict]:
+    """Busqueda por nombre, apellido, DNI o mail sobre pacientes_fts, ordenada por bm25.
+
+    El ultimo termino busca por prefijo, asi sirve mientras se escribe; el apellido pesa mas.
+    """
+    query = match_query(text)
+    if not query:
+        return []
+    cursor = conn.cursor()
+    if is_available(conn, "pacientes_fts"):
+        cursor.execute(
+            """
+            SELECT p.*
+            FROM (
+                SELECT rowid, bm25(pacientes_fts, 2.0, 4.0, 3.0, 1.0) AS score
+                FROM pacientes_fts
+                WHERE pacientes_fts MATCH ?1
+                ORDER BY rowid DESC
+                LIMIT ?3
+            ) f
+            JOIN pacientes p ON p.id = f.rowid
+            ORDER BY f.score, p.id DESC
+            LIMIT ?2
+            """,
+            (query, limit, _candidate_limit(cursor, query)),
+        )
+    else:
+        # Sin FTS5: coincidencia por prefijo con LIKE (recorre la tabla).
+        like = f"{text.strip()}%"
+        cursor.execute(
+            """
+            SELECT * FROM pacientes
+            WHERE nombre LIKE ?1 OR apellido LIKE ?1 OR dni LIKE ?1 OR mail LIKE ?1
+            ORDER BY apellido, nombre
+            LIMIT ?2
+            """,
+            (like, limit),
+        )
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(row) for row in rows]
+
+
+def fuzzy_search_patients(
+    conn: sqlite3.Connection, text: str, threshold: float = fuzzy.DEFAULT_THRESHOLD, limit: int = 20
+) -> List[dict]:
+    """Busqueda tolerante a errores de tipeo en nombre y apellido ("Gimenes" encuentra "Gimenez").
+
+    Cada palabra buscada se expande a las palabras parecidas del vocabulario (indice de
+    trigramas en memoria); las filas salen de pacientes_fts y se ordenan por similitud.
+    """
+    query_words = fuzzy.words(text)
+    if not query_words:
+        return []
+    index = fuzzy.get_name_index(conn, "pacientes")
+    candidates = [dict(index.similar(word, threshold)) for word in query_words]
+    if not all(candidates):
+        return []
+    groups = ["(" + " OR ".join(f'"{word}"' for word in scores) + ")" for scores in candidates]
+    cursor = conn.cursor()
+    if is_available(conn, "pacientes_fts"):
+        match = "{nombre apellido} : (" + " AND ".join(groups) + ")"
+        cursor.execute(
+            """
+            SELECT p.*
+            FROM (
+                SELECT rowid FROM pacientes_fts WHERE pacientes_fts MATCH ?1 ORDER BY rowid DESC LIMIT ?2
+            ) f
+            JOIN pacientes p ON p.id = f.rowid
+            """,
+            (match, _candidate_limit(cursor, match)),
+        )
+    else:
+        # Sin FTS5: se puntua toda la tabla.
+        cursor.execute("SELECT * FROM pacientes")
+    rows = cursor.fetchall()
+    cursor.close()
+    scored = []
+    for row in rows:
+        score = fuzzy.score_candidates(candidates, row["nombre"], row["apellido"])
+        if score >= threshold:
+            scored.append({**dict(row), "similitud": round(score, 3)})
+    scored.sort(key=lambda item: (-item["similitud"], item["apellido"], item["nombre"], item["id"]))
+    return scored[:limit]
+
+
+def get_summary(conn: sqlite3.Connection, patient_id: int, limit: int = 5) -> Optional[dict]:
+    """Ficha del paciente: datos, proximos turnos y los ultimos ``limit`` registros de historial y recetas.
+
+    Cuatro consultas indexadas sobre una misma foto de la BD (``read_snapshot``).
+    """
+    with read_snapshot(conn):
+        patient = get_patient(conn, patient_id)
+        if not patient:
+            return None
+        return {
+            "paciente": patient,
+            "proximos_turnos": appointments.list_patient_appointments(
+                conn, patient_id, limit=limit, include_cancelled=False
+            ),
+            "historial": clinical_history.list_records(conn, patient_id, limit=limit),
+            "recetas": prescriptions.list_prescriptions(conn, patient_id, limit=limit),
+        }
@@ -1,8 +1,11 @@
+import json
 import sqlite3
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from app.db import transaction
 
-def create_prescription(conn: sqlite3.Connection, data: Dict) -> int:
+
+def create_prescription(conn: sqlite3.Connection, data: Dict, commit: bool = True) -> int:
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -11,13 +14,48 @@ def create_prescription(conn: sqlite3.Connection, data: Dict) -> int:
         """,
         (data["medico_id"], data["paciente_id"], data["descripcion"]),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
     new_id = cursor.lastrowid
     cursor.close()
     return new_id
 
 
-def list_prescriptions(conn: sqlite3.Connection, paciente_id: int) -> List[dict]:
+def bulk_create_prescriptions(
+    conn: sqlite3.Connection, rows: List[Tuple[int, Dict]]
+) -> Tuple[List[Tuple[int, int]], List[dict]]:
+    """Alta masiva de recetas ``(indice, datos)``; informa como error las filas sin paciente o medico."""
+    errors: List[dict] = []
+    accepted: List[Tuple[int, Dict]] = []
+    with transaction(conn):
+        cursor = conn.cursor()
+        try:
+            found = {}
+            for table, field in (("pacientes", "paciente_id"), ("medicos", "medico_id")):
+                cursor.execute(
+                    f"SELECT id FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps([data[field] for _, data in rows]),),
+                )
+                found[field] = {row["id"] for row in cursor.fetchall()}
+            for index, data in rows:
+                if data["paciente_id"] not in found["paciente_id"]:
+                    errors.append({"indice": index, "error": "Paciente inexistente."})
+                elif data["medico_id"] not in found["medico_id"]:
+                    errors.append({"indice": index, "error": "Medico inexistente."})
+                else:
+                    accepted.append((index, data))
+            cursor.executemany(
+                "INSERT INTO recetas (medico_id, paciente_id, descripcion) VALUES (?, ?, ?)",
+                [(data["medico_id"], data["paciente_id"], data["descripcion"]) for _, data in accepted],
+            )
+            cursor.execute("SELECT MAX(id) FROM recetas")
+            first_id = (cursor.fetchone()[0] or 0) - len(accepted) + 1
+        finally:
+            cursor.close()
+    return [(index, first_id + offset) for offset, (index, _) in enumerate(accepted)], errors
+
+
+def list_prescriptions(conn: sqlite3.Connection, paciente_id: int, limit: Optional[int] = None) -> List[dict]:
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -26,8 +64,9 @@ def list_prescriptions(conn: sqlite3.Connection, paciente_id: int) -> List[dict]
         JOIN medicos m ON r.medico_id = m.id
         WHERE r.paciente_id = ?
         ORDER BY r.id DESC
+        LIMIT ?
         """,
-        (paciente_id,),
+        (paciente_id, -1 if limit is None else limit),
     )
     rows = cursor.fetchall()
     cursor.close()
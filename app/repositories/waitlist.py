@@ -0,0 +1,136 @@
+import sqlite3
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+# Indices parciales: solo las entradas en espera, ordenadas como las consume el matcher.
+_CANDIDATE_QUERY = """
+    SELECT id, paciente_id, prioridad
+    FROM lista_espera
+    WHERE estado = 'esperando' AND {filtro}
+      AND fecha_desde <= ?2 AND fecha_hasta >= ?2 AND paciente_id != ?3
+      {excluidos}
+    ORDER BY prioridad DESC, id
+    LIMIT 1
+"""
+
+
+def add_entry(conn: sqlite3.Connection, data: Dict) -> int:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO lista_espera (paciente_id, medico_id, especialidad_id, fecha_desde, fecha_hasta, prioridad)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            data["paciente_id"],
+            data.get("medico_id"),
+            data.get("especialidad_id"),
+            data["fecha_desde"].isoformat(),
+            data["fecha_hasta"].isoformat(),
+            data.get("prioridad", 0),
+        ),
+    )
+    conn.commit()
+    new_id = cursor.lastrowid
+    cursor.close()
+    return new_id
+
+
+def get_entry(conn: sqlite3.Connection, entry_id: int) -> Optional[dict]:
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM lista_espera WHERE id = ?", (entry_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return dict(row) if row else None
+
+
+def list_entries(
+    conn: sqlite3.Connection, paciente_id: Optional[int] = None, estado: Optional[str] = None
+) -> List[dict]:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT * FROM lista_espera
+        WHERE (?1 IS NULL OR paciente_id = ?1) AND (?2 IS NULL OR estado = ?2)
+        ORDER BY prioridad DESC, id
+        """,
+        (paciente_id, estado),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(row) for row in rows]
+
+
+def cancel_entry(conn: sqlite3.Connection, entry_id: int) -> bool:
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE lista_espera SET estado = 'cancelado' WHERE id = ? AND estado = 'esperando'",
+        (entry_id,),
+    )
+    conn.commit()
+    updated = cursor.rowcount > 0
+    cursor.close()
+    return updated
+
+
+def expire_entries(conn: sqlite3.Connection, today: date) -> int:
+    """Pasa a ``vencido`` las entradas en espera cuyo rango ya termino; devuelve cuantas.
+
+    Asi salen de los indices parciales y el matcher no las vuelve a saltear. Usa
+    ``idx_lista_espera_vencimiento``: solo lee las entradas que efectivamente vencen.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE lista_espera SET estado = 'vencido' WHERE estado = 'esperando' AND fecha_hasta < ?",
+        (today.isoformat(),),
+    )
+    conn.commit()
+    expired = cursor.rowcount
+    cursor.close()
+    return expired
+
+
+def find_candidate(
+    conn: sqlite3.Connection,
+    medico_id: int,
+    especialidad_id: int,
+    fecha: date,
+    excluded_patient: int,
+    excluded_ids: Iterable[int] = (),
+) -> Optional[dict]:
+    """Mejor entrada en espera para un turno liberado: mayor prioridad y, a igual prioridad, la mas antigua.
+
+    Compara la cabeza de la cola del medico con la de la especialidad (entradas sin medico);
+    cada una es un seek sobre su indice parcial. El rango de fechas y las exclusiones se filtran
+    al recorrer el indice: el costo crece con las entradas vigentes de mayor prioridad que no
+    cubren ``fecha`` (las vencidas ya salieron con ``expire_entries``) y con las excluidas.
+    """
+    excluded = list(excluded_ids)
+    excluidos = f"AND id NOT IN ({', '.join(f'?{n}' for n in range(4, 4 + len(excluded)))})" if excluded else ""
+    cursor = conn.cursor()
+    best: Optional[sqlite3.Row] = None
+    for filtro, key in (
+        ("medico_id = ?1", medico_id),
+        ("medico_id IS NULL AND especialidad_id = ?1", especialidad_id),
+    ):
+        cursor.execute(
+            _CANDIDATE_QUERY.format(filtro=filtro, excluidos=excluidos),
+            (key, fecha.isoformat(), excluded_patient, *excluded),
+        )
+        row = cursor.fetchone()
+        if row and (best is None or (-row["prioridad"], row["id"]) < (-best["prioridad"], best["id"])):
+            best = row
+    cursor.close()
+    return dict(best) if best else None
+
+
+def assign_entry(conn: sqlite3.Connection, entry_id: int, turno_id: int) -> bool:
+    """Marca la entrada como asignada; False si otro matcher la tomo antes. No hace commit."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE lista_espera SET estado = 'asignado', turno_id = ? WHERE id = ? AND estado = 'esperando'",
+        (turno_id, entry_id),
+    )
+    updated = cursor.rowcount > 0
+    cursor.close()
+    return updated
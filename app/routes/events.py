@@ -0,0 +1,59 @@
+import asyncio
+import json
+from dataclasses import asdict
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.observers.broadcast import Broadcaster, broadcaster
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_event(seq: int, event: str, data: dict) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+async def stream_events(
+    source: Broadcaster,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    medico_id: Optional[int] = None,
+    especialidad_id: Optional[int] = None,
+    keepalive: float = KEEPALIVE_SECONDS,
+) -> AsyncIterator[str]:
+    """Frames SSE de una suscripcion; termina cuando el cliente se desconecta.
+
+    Cada cliente es solo una cola y esta corrutina esperando en el loop: miles de conexiones
+    ociosas no ocupan hilos. Si el cliente no da abasto se emite ``resync`` una vez y los
+    eventos perdidos se recuperan consultando ``GET /disponibilidad``.
+    """
+    subscription = source.subscribe(medico_id, especialidad_id)
+    try:
+        yield f"retry: {int(keepalive * 1000)}\n\n"
+        while not await is_disconnected():
+            try:
+                seq, event = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexion a traves de proxies.
+                yield ": ping\n\n"
+                continue
+            yield format_event(seq, "disponibilidad", asdict(event))
+            if subscription.overflowed and subscription.queue.empty():
+                subscription.overflowed = False
+                yield format_event(seq, "resync", {"motivo": "cola llena, se perdieron eventos"})
+    finally:
+        source.unsubscribe(subscription)
+
+
+@router.get("/eventos")
+async def availability_events(
+    request: Request, medico_id: Optional[int] = None, especialidad_id: Optional[int] = None
+):
+    return StreamingResponse(
+        stream_events(broadcaster, request.is_disconnected, medico_id, especialidad_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
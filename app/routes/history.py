@@ -1,9 +1,8 @@
-import sqlite3
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
-from app.db import get_connection
+from app.db import DatabaseExecutor, get_executor
 from app.repositories import clinical_history
 from app import schemas
 
@@ -11,5 +10,16 @@ router = APIRouter()
 
 
 @router.get("/historial", response_model=List[schemas.ClinicalRecord])
-def list_all_history(conn: sqlite3.Connection = Depends(get_connection)):
-    return clinical_history.list_records(conn, paciente_id=None)
+async def list_all_history(db: DatabaseExecutor = Depends(get_executor)):
+    return await db.run(clinical_history.list_records, paciente_id=None)
+
+
+@router.get("/historial/buscar", response_model=List[schemas.ClinicalRecordSearchHit])
+async def search_history(
+    q: str = Query(..., min_length=1, max_length=200),
+    paciente_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: DatabaseExecutor = Depends(get_executor),
+):
+    return await db.run(clinical_history.search_records, q, paciente_id, limit, offset)
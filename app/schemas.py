@@ -1,8 +1,8 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import re
 
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, root_validator, validator
 
 
 NAME_REGEX = re.compile(r"^[A-Za-z]+$")
@@ -46,6 +46,10 @@ class Patient(BaseModel):
     mail: str
 
 
+class PatientSearchHit(Patient):
+    similitud: Optional[float] = None
+
+
 class SpecialtyCreate(BaseModel):
     nombre: str
 
@@ -73,32 +77,48 @@ class Doctor(DoctorCreate):
     id: int
 
 
+class DoctorSearchHit(Doctor):
+    especialidad: str
+    similitud: float
+
+
+def _validate_hora_inicio(value: str) -> str:
+    try:
+        datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        raise ValueError("Hora inicio debe estar entre 00:00 y 23:59 (HH:MM)")
+    return value
+
+
+def _validate_hora_fin(value: str, values: dict) -> str:
+    start = values.get("hora_inicio")
+    try:
+        end_time = datetime.strptime(value, "%H:%M").time()
+        start_time = datetime.strptime(start, "%H:%M").time() if start else None
+    except ValueError:
+        raise ValueError("Hora fin debe estar entre 00:00 y 23:59 (HH:MM)")
+
+    if start_time and end_time <= start_time:
+        raise ValueError("Hora fin debe ser mayor que hora inicio")
+    return value
+
+
 class AvailabilityCreate(BaseModel):
     medico_id: int
     fecha: date
     hora_inicio: str = Field(..., regex=r"^\d{2}:\d{2}$")
     hora_fin: str = Field(..., regex=r"^\d{2}:\d{2}$")
+    duracion_turno: Optional[int] = Field(
+        default=None, ge=5, le=720, description="Minutos por sub-turno; sin valor la franja es un solo turno"
+    )
 
     @validator("hora_inicio")
     def validate_hora_inicio(cls, v):
-        try:
-            datetime.strptime(v, "%H:%M").time()
-        except ValueError:
-            raise ValueError("Hora inicio debe estar entre 00:00 y 23:59 (HH:MM)")
-        return v
+        return _validate_hora_inicio(v)
 
     @validator("hora_fin")
     def validate_range(cls, v, values):
-        start = values.get("hora_inicio")
-        try:
-            end_time = datetime.strptime(v, "%H:%M").time()
-            start_time = datetime.strptime(start, "%H:%M").time() if start else None
-        except ValueError:
-            raise ValueError("Hora fin debe estar entre 00:00 y 23:59 (HH:MM)")
-
-        if start_time and end_time <= start_time:
-            raise ValueError("Hora fin debe ser mayor que hora inicio")
-        return v
+        return _validate_hora_fin(v, values)
 
 
 class Availability(AvailabilityCreate):
@@ -106,6 +126,130 @@ class Availability(AvailabilityCreate):
     activa: bool = True
 
 
+class WeeklyAvailabilityBlock(BaseModel):
+    dia_semana: int = Field(..., ge=0, le=6, description="0=lunes ... 6=domingo")
+    hora_inicio: str = Field(..., regex=r"^\d{2}:\d{2}$")
+    hora_fin: str = Field(..., regex=r"^\d{2}:\d{2}$")
+    duracion_turno: Optional[int] = Field(default=None, ge=5, le=720)
+
+    @validator("hora_inicio")
+    def validate_hora_inicio(cls, v):
+        return _validate_hora_inicio(v)
+
+    @validator("hora_fin")
+    def validate_range(cls, v, values):
+        return _validate_hora_fin(v, values)
+
+
+class RecurringAvailabilityCreate(BaseModel):
+    medico_id: int
+    fecha_desde: date
+    fecha_hasta: date
+    bloques: List[WeeklyAvailabilityBlock] = Field(..., min_items=1)
+
+    @validator("fecha_hasta")
+    def validate_fecha_hasta(cls, v, values):
+        start = values.get("fecha_desde")
+        if start and v < start:
+            raise ValueError("fecha_hasta debe ser posterior o igual a fecha_desde")
+        if start and (v - start).days > 366:
+            raise ValueError("El rango no puede superar un año")
+        return v
+
+
+class SubSlot(BaseModel):
+    indice: int
+    hora_inicio: str
+    hora_fin: str
+    libre: bool
+
+
+class WaitlistEntryCreate(BaseModel):
+    paciente_id: int
+    medico_id: Optional[int] = None
+    especialidad_id: Optional[int] = None
+    fecha_desde: date
+    fecha_hasta: date
+    prioridad: int = Field(0, ge=0, le=100)
+
+    @validator("fecha_hasta")
+    def validate_fecha_hasta(cls, v, values):
+        start = values.get("fecha_desde")
+        if start and v < start:
+            raise ValueError("fecha_hasta debe ser posterior o igual a fecha_desde")
+        return v
+
+    @root_validator(skip_on_failure=True)
+    def validate_destino(cls, values):
+        if values.get("medico_id") is None and values.get("especialidad_id") is None:
+            raise ValueError("Debe indicar medico_id o especialidad_id")
+        return values
+
+
+class WaitlistEntry(BaseModel):
+    id: int
+    paciente_id: int
+    medico_id: Optional[int]
+    especialidad_id: Optional[int]
+    fecha_desde: date
+    fecha_hasta: date
+    prioridad: int
+    estado: str
+    turno_id: Optional[int]
+    creado_en: datetime
+
+
+class AgendaAppointment(BaseModel):
+    id: int
+    sub_turno: int
+    fecha: datetime
+    duracion: int
+    estado: str
+    motivo_consulta: Optional[str]
+    paciente_id: int
+    paciente_nombre: str
+    paciente_apellido: str
+
+
+class AgendaBlock(BaseModel):
+    disponibilidad_id: int
+    hora_inicio: str
+    hora_fin: str
+    duracion_turno: Optional[int]
+    activa: bool
+    turnos: List[AgendaAppointment]
+
+
+class DoctorAgenda(BaseModel):
+    medico_id: int
+    fecha: date
+    bloques: List[AgendaBlock]
+
+
+class NextSlot(BaseModel):
+    disponibilidad_id: int
+    medico_id: int
+    medico_nombre: str
+    medico_apellido: str
+    especialidad_id: int
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+    sub_turno: int
+
+
+class AvailabilityConflict(BaseModel):
+    fecha: date
+    hora_inicio: str
+    hora_fin: str
+    motivo: str
+
+
+class RecurringAvailabilityResult(BaseModel):
+    creadas: int
+    conflictos: List[AvailabilityConflict]
+
+
 class AppointmentCreate(BaseModel):
     paciente_id: int
     medico_id: int
@@ -131,6 +275,13 @@ class AppointmentCreate(BaseModel):
 class Appointment(AppointmentCreate):
     id: int
     duracion: int
+    sub_turno: int = 0
+
+
+class PatientAppointment(Appointment):
+    medico_nombre: str
+    medico_apellido: str
+    especialidad: str
 
 
 class AppointmentUpdateStatus(BaseModel):
@@ -144,6 +295,34 @@ class AppointmentUpdateStatus(BaseModel):
         return v
 
 
+class BatchAppointmentStatus(AppointmentUpdateStatus):
+    id: int
+
+
+class AppointmentBulkStatusUpdate(BaseModel):
+    estado: str
+    ids: Optional[List[int]] = Field(None, min_items=1, max_items=5000)
+    hasta: Optional[datetime] = None
+
+    @validator("estado")
+    def validate_estado(cls, v):
+        allowed = {"completado", "cancelado", "ausente"}
+        if v not in allowed:
+            raise ValueError(f"Estado invalido. Valores permitidos: {allowed}")
+        return v
+
+    @root_validator(skip_on_failure=True)
+    def validate_seleccion(cls, values):
+        if (values.get("ids") is None) == (values.get("hasta") is None):
+            raise ValueError("Debe indicar ids o hasta (uno solo)")
+        return values
+
+
+class AppointmentBulkStatusResult(BaseModel):
+    estado: str
+    actualizados: List[int]
+
+
 class ClinicalRecordCreate(BaseModel):
     paciente_id: int
     turno_id: Optional[int] = None
@@ -167,11 +346,16 @@ class ClinicalRecordCreate(BaseModel):
 
 class ClinicalRecord(ClinicalRecordCreate):
     id: int
+    medico_id: Optional[int] = None
     medico_nombre: Optional[str] = None
     medico_apellido: Optional[str] = None
     especialidad: Optional[str] = None
 
 
+class ClinicalRecordSearchHit(ClinicalRecord):
+    fragmento: str
+
+
 class PrescriptionCreate(BaseModel):
     medico_id: int
     paciente_id: int
@@ -180,6 +364,15 @@ class PrescriptionCreate(BaseModel):
 
 class Prescription(PrescriptionCreate):
     id: int
+    medico_nombre: Optional[str] = None
+    medico_apellido: Optional[str] = None
+
+
+class PatientSummary(BaseModel):
+    paciente: Patient
+    proximos_turnos: List[PatientAppointment]
+    historial: List[ClinicalRecord]
+    recetas: List[Prescription]
 
 
 class ReportRequest(BaseModel):
@@ -195,3 +388,50 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+
+
+class BatchOperation(BaseModel):
+    op: str
+    datos: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    operaciones: List[BatchOperation] = Field(..., min_items=1, max_items=100)
+
+
+class BatchOperationResult(BaseModel):
+    op: str
+    resultado: Dict[str, Any]
+
+
+class BatchResult(BaseModel):
+    resultados: List[BatchOperationResult]
+
+
+class BulkCreateRequest(BaseModel):
+    filas: List[Dict[str, Any]] = Field(..., min_items=1, max_items=50000)
+
+
+class BulkRowError(BaseModel):
+    indice: int
+    error: str
+
+
+class BulkCreateResult(BaseModel):
+    creados: int
+    ids: List[Optional[int]]
+    errores: List[BulkRowError]
+
+
+class Change(BaseModel):
+    seq: int
+    tabla: str
+    fila_id: int
+    operacion: str
+    fecha: str
+
+
+class ChangeFeed(BaseModel):
+    cambios: List[Change]
+    hasta: int
+    hay_mas: bool
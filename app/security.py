@@ -1,8 +1,11 @@
 import hashlib
 import hmac
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 import jwt
 
@@ -10,6 +13,7 @@ ALGORITHM = "HS256"
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 PASSWORD_SALT = os.getenv("PASSWORD_SALT", "dev-salt")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
 
 
 def hash_password(password: str) -> str:
@@ -30,3 +34,62 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
 def decode_token(token: str) -> str:
     data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     return data.get("sub")
+
+
+class VerifiedTokenCache:
+    """LRU acotado de tokens ya verificados, indexado por hash del token y respetando ``exp``."""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            subject, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return subject
+
+    def put(self, token: str, subject: str, expires_at: float) -> None:
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (subject, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = VerifiedTokenCache()
+
+
+def verify_token(token: str) -> str:
+    """Como ``decode_token`` pero evita re-verificar la firma de tokens vistos recientemente."""
+    subject = token_cache.get(token)
+    if subject:
+        return subject
+    data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    subject = data.get("sub")
+    expires_at = data.get("exp")
+    if subject and expires_at is not None:
+        token_cache.put(token, subject, float(expires_at))
+    return subject
@@ -0,0 +1,116 @@
+import re
+import sqlite3
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app import schemas
+from app.db import transaction
+from app.observers import events
+from app.repositories import appointments, clinical_history, doctors, patients, prescriptions
+
+# "$0.id" toma el campo id del resultado de la operacion 0.
+_REFERENCE_RE = re.compile(r"^\$(\d+)\.(\w+)$")
+
+Handler = Callable[[sqlite3.Connection, Dict], Tuple[Dict, List[Any]]]
+
+
+class BatchError(Exception):
+    def __init__(self, index: int, detail: Any) -> None:
+        super().__init__(detail)
+        self.index = index
+        self.detail = detail
+
+
+def _create_patient(conn: sqlite3.Connection, data: Dict) -> Tuple[Dict, List[Any]]:
+    try:
+        new_id = patients.create_patient(conn, data, commit=False)
+    except sqlite3.IntegrityError:
+        raise ValueError("DNI o mail ya registrado.")
+    return {"id": new_id, **data}, []
+
+
+def _create_appointment(conn: sqlite3.Connection, data: Dict) -> Tuple[Dict, List[Any]]:
+    try:
+        new_id = appointments.create_appointment(conn, data)
+    except sqlite3.IntegrityError:
+        raise ValueError("Paciente o médico inexistente.")
+    turno = appointments.get_appointment(conn, new_id)
+    return dict(turno), [events.appointment_created_event(turno)]
+
+
+def _update_appointment_status(conn: sqlite3.Connection, data: Dict) -> Tuple[Dict, List[Any]]:
+    previous = appointments.update_status(conn, data["id"], data["estado"])
+    if not previous:
+        raise ValueError("Turno no encontrado.")
+    return {"id": data["id"], "estado": data["estado"]}, [
+        events.appointment_status_changed_event(previous, data["estado"])
+    ]
+
+
+def _create_record(conn: sqlite3.Connection, data: Dict) -> Tuple[Dict, List[Any]]:
+    try:
+        new_id = clinical_history.add_record(conn, data, commit=False)
+    except sqlite3.IntegrityError:
+        raise ValueError("Paciente o turno inexistente.")
+    return {"id": new_id, **data}, []
+
+
+def _create_prescription(conn: sqlite3.Connection, data: Dict) -> Tuple[Dict, List[Any]]:
+    patient = patients.get_patient(conn, data["paciente_id"])
+    doctor = doctors.get_doctor(conn, data["medico_id"])
+    if not patient or not doctor:
+        raise ValueError("Paciente o medico no encontrado.")
+    new_id = prescriptions.create_prescription(conn, data, commit=False)
+    return {"id": new_id, **data}, [events.prescription_issued_event(new_id, patient, doctor, data["descripcion"])]
+
+
+OPERATIONS: Dict[str, Tuple[Type[BaseModel], Handler]] = {
+    "crear_paciente": (schemas.PatientCreate, _create_patient),
+    "crear_turno": (schemas.AppointmentCreate, _create_appointment),
+    "cambiar_estado_turno": (schemas.BatchAppointmentStatus, _update_appointment_status),
+    "crear_historial": (schemas.ClinicalRecordCreate, _create_record),
+    "crear_receta": (schemas.PrescriptionCreate, _create_prescription),
+}
+
+
+def _resolve(value: Any, results: List[Dict]) -> Any:
+    if isinstance(value, dict):
+        return {key: _resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, results) for item in value]
+    if isinstance(value, str):
+        match = _REFERENCE_RE.match(value)
+        if match:
+            index, field = int(match.group(1)), match.group(2)
+            if index >= len(results) or field not in results[index]:
+                raise ValueError(f"Referencia invalida: {value}")
+            return results[index][field]
+    return value
+
+
+def run_batch(conn: sqlite3.Connection, operations: List[Dict]) -> Tuple[List[Dict], List[Any]]:
+    """Ejecuta las operaciones en orden dentro de una unica transaccion (todo o nada).
+
+    Devuelve los resultados y los eventos a publicar; el llamador los publica recien despues
+    del commit, asi ningun mail sale por una operacion que termino revirtiendose.
+    Ante la primera falla levanta ``BatchError`` con el indice de la operacion.
+    """
+    results: List[Dict] = []
+    pending: List[Any] = []
+    with transaction(conn):
+        for index, operation in enumerate(operations):
+            spec = OPERATIONS.get(operation["op"])
+            if spec is None:
+                raise BatchError(index, f"Operacion desconocida: {operation['op']}")
+            schema, handler = spec
+            try:
+                data = schema(**_resolve(operation["datos"], results)).dict()
+                result, new_events = handler(conn, data)
+            except ValidationError as exc:
+                raise BatchError(index, exc.errors())
+            except ValueError as exc:
+                raise BatchError(index, str(exc))
+            results.append(result)
+            pending.extend(new_events)
+    return [{"op": op["op"], "resultado": result} for op, result in zip(operations, results)], pending
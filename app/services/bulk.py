@@ -0,0 +1,47 @@
+import sqlite3
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+Inserter = Callable[[sqlite3.Connection, List[Tuple[int, Dict]]], Tuple[List[Tuple[int, int]], List[dict]]]
+
+
+def validate_rows(
+    schema: Type[BaseModel], rows: Iterable[Tuple[int, Dict[str, Any]]]
+) -> Tuple[List[Tuple[int, Dict]], List[dict]]:
+    """Valida cada fila ``(indice, fila)`` con ``schema``; devuelve las validas y un error por cada invalida."""
+    valid: List[Tuple[int, Dict]] = []
+    errors: List[dict] = []
+    for index, row in rows:
+        try:
+            valid.append((index, schema(**row).dict()))
+        except ValidationError as exc:
+            errors.append({"indice": index, "error": "; ".join(_describe(error) for error in exc.errors())})
+        except TypeError:
+            errors.append({"indice": index, "error": "La fila debe ser un objeto."})
+    return valid, errors
+
+
+def _describe(error: Dict[str, Any]) -> str:
+    location = ".".join(str(part) for part in error["loc"] if part != "__root__")
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+def bulk_create(
+    conn: sqlite3.Connection, schema: Type[BaseModel], rows: List[Dict[str, Any]], insert: Inserter
+) -> Dict[str, Any]:
+    """Valida todo el lote y pasa las filas validas a ``insert`` (un ``executemany`` en una transaccion).
+
+    Las filas rechazadas, por validacion o por conflicto, no frenan al resto. ``ids`` queda
+    alineado con la entrada (None en las rechazadas).
+    """
+    valid, errors = validate_rows(schema, enumerate(rows))
+    created, conflicts = insert(conn, valid) if valid else ([], [])
+    ids: List[Any] = [None] * len(rows)
+    for index, new_id in created:
+        ids[index] = new_id
+    return {
+        "creados": len(created),
+        "ids": ids,
+        "errores": sorted(errors + conflicts, key=lambda error: error["indice"]),
+    }
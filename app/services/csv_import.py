@@ -0,0 +1,62 @@
+import csv
+import sqlite3
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Type
+
+from pydantic import BaseModel
+
+from app import schemas
+from app.repositories import availability, patients
+from app.services.bulk import validate_rows
+
+CHUNK_SIZE = 1000
+
+Upserter = Callable[[sqlite3.Connection, List[Tuple[int, Dict]]], Tuple[int, int, List[dict]]]
+
+IMPORTERS: Dict[str, Tuple[Type[BaseModel], Upserter]] = {
+    "pacientes": (schemas.PatientCreate, patients.upsert_patients),
+    "disponibilidad": (schemas.AvailabilityCreate, availability.upsert_availability_rows),
+}
+
+
+def open_reader(kind: str, lines: Iterable[str]) -> csv.DictReader:
+    """Lee el encabezado y verifica que tenga las columnas obligatorias del esquema de ``kind``."""
+    schema, _ = IMPORTERS[kind]
+    reader = csv.DictReader(lines)
+    columns = set(reader.fieldnames or ())
+    missing = [name for name, field in schema.__fields__.items() if field.required and name not in columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(missing)}")
+    return reader
+
+
+def _rows(reader: csv.DictReader) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for row in reader:
+        # Celdas vacias como None (campos opcionales); las columnas sobrantes se ignoran.
+        yield reader.line_num, {key: value if value != "" else None for key, value in row.items() if key is not None}
+
+
+def import_rows(
+    conn: sqlite3.Connection, kind: str, reader: csv.DictReader, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """Valida y carga el CSV de a ``chunk_size`` filas, una transaccion por bloque.
+
+    Produce un avance por bloque con los acumulados y los errores de ese bloque (``indice``
+    es la linea del archivo). Nada se acumula entre bloques, asi que la memoria no depende
+    del largo del archivo. Si se corta a mitad, los bloques anteriores quedan confirmados.
+    """
+    schema, upsert = IMPORTERS[kind]
+    totals = {"filas": 0, "insertadas": 0, "actualizadas": 0, "rechazadas": 0}
+    rows = _rows(reader)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        valid, errors = validate_rows(schema, chunk)
+        inserted, updated, conflicts = upsert(conn, valid) if valid else (0, 0, [])
+        errors = sorted(errors + conflicts, key=lambda error: error["indice"])
+        totals["filas"] += len(chunk)
+        totals["insertadas"] += inserted
+        totals["actualizadas"] += updated
+        totals["rechazadas"] += len(errors)
+        yield {**totals, "errores": errors}
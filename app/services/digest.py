@@ -0,0 +1,102 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.email_client import EmailClient
+
+Email = Tuple[str, str, str]
+
+FOOTER = "MediFlow - Chacabuco 1244, Nueva Cordoba, Cordoba."
+
+
+def fetch_agenda(conn: sqlite3.Connection, target_date: date) -> List[dict]:
+    """Turnos programados del dia con datos de paciente y medico, en una sola consulta por rango."""
+    start = target_date.isoformat()
+    end = (target_date + timedelta(days=1)).isoformat()
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT t.id, t.fecha, t.duracion, t.motivo_consulta,
+               t.paciente_id, p.nombre as paciente_nombre, p.apellido as paciente_apellido, p.mail as paciente_mail,
+               t.medico_id, m.nombre as medico_nombre, m.apellido as medico_apellido, m.mail as medico_mail,
+               e.nombre as especialidad_nombre
+        FROM turnos t
+        JOIN pacientes p ON t.paciente_id = p.id
+        JOIN medicos m ON t.medico_id = m.id
+        JOIN especialidades e ON m.especialidad_id = e.id
+        WHERE t.fecha >= ? AND t.fecha < ? AND t.estado = 'programado'
+        ORDER BY t.medico_id, t.fecha
+        """,
+        (start, end),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    return [dict(row) for row in rows]
+
+
+def _hour(fecha: str) -> str:
+    return datetime.fromisoformat(fecha).strftime("%H:%M")
+
+
+def build_digests(rows: List[dict], target_date: date, include_patients: bool = False) -> List[Email]:
+    """Arma todos los mails del dia en una pasada: uno por medico y opcionalmente uno por paciente."""
+    by_doctor: Dict[int, List[dict]] = {}
+    by_patient: Dict[int, List[dict]] = {}
+    for row in rows:
+        by_doctor.setdefault(row["medico_id"], []).append(row)
+        if include_patients:
+            by_patient.setdefault(row["paciente_id"], []).append(row)
+
+    date_str = target_date.isoformat()
+    emails: List[Email] = []
+    for items in by_doctor.values():
+        first = items[0]
+        lines = [
+            f"- {_hour(item['fecha'])} ({item['duracion']} min) {item['paciente_nombre']} {item['paciente_apellido']}"
+            + (f": {item['motivo_consulta']}" if item["motivo_consulta"] else "")
+            for item in items
+        ]
+        body = (
+            f"Hola {first['medico_nombre']} {first['medico_apellido']},\n\n"
+            f"Tu agenda para el {date_str} ({len(items)} turnos):\n"
+            + "\n".join(lines)
+            + f"\n\n{FOOTER}"
+        )
+        emails.append((first["medico_mail"], f"Agenda del {date_str}", body))
+
+    for items in by_patient.values():
+        first = items[0]
+        lines = [
+            f"- {_hour(item['fecha'])} con {item['medico_nombre']} {item['medico_apellido']} de {item['especialidad_nombre']}"
+            for item in items
+        ]
+        body = (
+            f"Hola {first['paciente_nombre']},\n\n"
+            f"Te recordamos tus turnos del {date_str}:\n"
+            + "\n".join(lines)
+            + f"\n\nLo esperamos!\n{FOOTER}"
+        )
+        emails.append((first["paciente_mail"], f"Tus turnos del {date_str}", body))
+    return emails
+
+
+class AgendaDigestJob:
+    """Job batch: agenda del dia siguiente para cada medico (y resumen por paciente)."""
+
+    def __init__(
+        self,
+        email_client: EmailClient,
+        connection_factory: Callable[[], sqlite3.Connection],
+        include_patients: bool = False,
+    ) -> None:
+        self.email_client = email_client
+        self.connection_factory = connection_factory
+        self.include_patients = include_patients
+
+    def run(self, target_date: Optional[date] = None) -> int:
+        target_date = target_date or date.today() + timedelta(days=1)
+        rows = fetch_agenda(self.connection_factory(), target_date)
+        emails = build_digests(rows, target_date, self.include_patients)
+        if not emails:
+            return 0
+        return self.email_client.send_bulk(emails)
@@ -2,7 +2,7 @@ import os
 import smtplib
 import ssl
 from email.message import EmailMessage
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
 
 class EmailClient:
@@ -38,26 +38,54 @@ class EmailClient:
         else:
             self.use_ssl = self.smtp_port == 465
 
-    def send_email(self, recipient: str, subject: str, body: str) -> None:
+    def _build_message(self, recipient: str, subject: str, body: str) -> EmailMessage:
         msg = EmailMessage()
         msg["From"] = self.sender
         msg["To"] = recipient
         msg["Subject"] = subject
         msg.set_content(body)
+        return msg
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            context = ssl.create_default_context()
+            server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context, timeout=10)
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        else:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=10)
+            if self.username and self.password:
+                server.starttls()
+                server.login(self.username, self.password)
+        return server
+
+    def send_email(self, recipient: str, subject: str, body: str) -> None:
+        msg = self._build_message(recipient, subject, body)
 
         if self.dry_run:
             print(f"[DRY RUN EMAIL] To: {recipient} | Subject: {subject} | Body: {body}")
             return
 
-        if self.use_ssl:
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, context=context, timeout=10) as server:
-                if self.username and self.password:
-                    server.login(self.username, self.password)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=10) as server:
-                if self.username and self.password:
-                    server.starttls()
-                    server.login(self.username, self.password)
-                server.send_message(msg)
+        with self._connect() as server:
+            server.send_message(msg)
+
+    def send_bulk(self, messages: Iterable[Tuple[str, str, str]]) -> int:
+        """Envia (destinatario, asunto, cuerpo) reutilizando una unica conexion SMTP."""
+        sent = 0
+        if self.dry_run:
+            for recipient, subject, body in messages:
+                print(f"[DRY RUN EMAIL] To: {recipient} | Subject: {subject} | Body: {body}")
+                sent += 1
+            return sent
+
+        with self._connect() as server:
+            for recipient, subject, body in messages:
+                try:
+                    server.send_message(self._build_message(recipient, subject, body))
+                except smtplib.SMTPRecipientsRefused:
+                    continue
+                except smtplib.SMTPResponseException:
+                    server.rset()
+                    continue
+                sent += 1
+        return sent
@@ -1,29 +1,19 @@
 from datetime import datetime
 
-from app.observers.base import Observer, Subject
+from app.observers.base import Observer
+from app.observers.events import PrescriptionIssued
 from app.services.email_client import EmailClient
 
 
-class PrescriptionObserver(Observer):
-    def __init__(self, patient_name: str, patient_email: str, email_client: EmailClient) -> None:
-        self.patient_name = patient_name
-        self.patient_email = patient_email
-        self.email_client = email_client
-
-    def update(self, data: str) -> None:
-        subject = "Nueva receta medica"
-        self.email_client.send_email(self.patient_email, subject, data)
-
-
-class PrescriptionSubject(Subject):
-    def __init__(self) -> None:
-        super().__init__()
+class PrescriptionNotifier(Observer):
+    """Suscriptor de ``PrescriptionIssued``: avisa al paciente por mail."""
 
-
-class PrescriptionNotifier:
     def __init__(self, email_client: EmailClient) -> None:
         self.email_client = email_client
 
+    def update(self, data: PrescriptionIssued) -> None:
+        self.notify_prescription(data.paciente_nombre, data.paciente_mail, data.medico_nombre, data.descripcion)
+
     def notify_prescription(
         self,
         patient_name: str,
@@ -31,9 +21,6 @@ class PrescriptionNotifier:
         doctor_name: str,
         description: str,
     ) -> None:
-        subject = PrescriptionSubject()
-        subject.attach(PrescriptionObserver(patient_name, patient_email, self.email_client))
-
         issued_at = datetime.now().strftime("%Y-%m-%d %H:%M")
         message = (
             f"Hola {patient_name},\n\n"
@@ -43,4 +30,4 @@ class PrescriptionNotifier:
             "Ante cualquier duda responde este correo o comunicate con tu medico.\n"
             "MediFlow"
         )
-        subject.notify(message)
+        self.email_client.send_email(patient_email, "Nueva receta medica", message)
@@ -2,27 +2,14 @@ import threading
 from datetime import datetime, timedelta
 from typing import Iterable, List
 
-from app.observers.base import Observer, Subject
+from app.observers.base import Observer
+from app.observers.events import AppointmentCreated
 from app.services.email_client import EmailClient
 
 
-class PatientObserver(Observer):
-    def __init__(self, name: str, email: str, email_client: EmailClient) -> None:
-        self.name = name
-        self.email = email
-        self.email_client = email_client
-
-    def update(self, data: str) -> None:
-        subject = "Recordatorio de turno medico"
-        self.email_client.send_email(self.email, subject, data)
-
-
-class ReminderSubject(Subject):
-    def __init__(self) -> None:
-        super().__init__()
-
+class ReminderService(Observer):
+    """Suscriptor de ``AppointmentCreated``: confirma el turno y programa recordatorios."""
 
-class ReminderService:
     def __init__(
         self,
         email_client: EmailClient,
@@ -35,6 +22,18 @@ class ReminderService:
         self.email_client = email_client
         self.lead_times: List[timedelta] = list(lead_times)
 
+    def update(self, data: AppointmentCreated) -> None:
+        self.schedule_reminders(
+            data.fecha,
+            data.paciente_nombre,
+            data.paciente_mail,
+            data.medico_nombre,
+            data.especialidad_nombre,
+        )
+
+    def _send(self, patient_email: str, message: str) -> None:
+        self.email_client.send_email(patient_email, "Recordatorio de turno medico", message)
+
     def schedule_reminders(
         self,
         appointment_dt: datetime,
@@ -43,16 +42,13 @@ class ReminderService:
         doctor_name: str,
         specialty: str,
     ) -> List[threading.Timer]:
-        subject = ReminderSubject()
-        subject.attach(PatientObserver(patient_name, patient_email, self.email_client))
-
         date_str = appointment_dt.strftime("%Y-%m-%d")
         time_str = appointment_dt.strftime("%H:%M")
         confirmation_msg = (
             f"Confirmamos su reserva del turno con {doctor_name} de {specialty} el {date_str} a las {time_str}.\n"
             "Lo esperamos!\nMediFlow - Chacabuco 1244, Nueva Cordoba, Cordoba."
         )
-        subject.notify(f"Hola {patient_name},\n\n{confirmation_msg}")
+        self._send(patient_email, f"Hola {patient_name},\n\n{confirmation_msg}")
 
         timers: List[threading.Timer] = []
         now = datetime.now()
@@ -66,7 +62,7 @@ class ReminderService:
                 f"el {date_str} a las {time_str}.\n"
                 "Lo esperamos!\nMediFlow - Chacabuco 1244, Nueva Cordoba, Cordoba."
             )
-            timer = threading.Timer(delay_seconds, subject.notify, args=(message,))
+            timer = threading.Timer(delay_seconds, self._send, args=(patient_email, message))
             timer.daemon = True
             timer.start()
             timers.append(timer)
@@ -0,0 +1,51 @@
+import threading
+from datetime import datetime, time, timedelta
+from typing import Callable, Optional
+
+
+class DailyScheduler:
+    """Ejecuta un job una vez por dia a la hora indicada usando threading.Timer."""
+
+    def __init__(self, run_at: time, job: Callable[[], object], name: str = "job-diario") -> None:
+        self.run_at = run_at
+        self.job = job
+        self.name = name
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env_value(cls, value: str, job: Callable[[], object], name: str = "job-diario") -> "DailyScheduler":
+        return cls(datetime.strptime(value, "%H:%M").time(), job, name)
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now()
+        target = datetime.combine(now.date(), self.run_at)
+        if target <= now:
+            target += timedelta(days=1)
+        return (target - now).total_seconds()
+
+    def start(self) -> None:
+        with self._lock:
+            self._arm()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _arm(self) -> None:
+        self._timer = threading.Timer(self.seconds_until_next_run(), self._run)
+        self._timer.name = self.name
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _run(self) -> None:
+        try:
+            self.job()
+        except Exception as exc:
+            print(f"[{self.name}] error ejecutando job: {exc}")
+        finally:
+            with self._lock:
+                if self._timer is not None:
+                    self._arm()
@@ -0,0 +1,194 @@
+import random
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List, Optional
+
+
+@dataclass
+class RecordedMessage:
+    sender: str
+    recipients: List[str]
+    data: bytes
+    received_at: float = field(default_factory=time.time)
+
+    def parsed(self) -> EmailMessage:
+        return message_from_bytes(self.data, policy=policy.default)
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Implementa el subconjunto de SMTP que usa smtplib (EHLO/MAIL/RCPT/DATA/QUIT)."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        sink: SmtpSink = self.server.sink
+        sink._register_connection()
+        self._reply("220 mediflow-sink ESMTP")
+        sender = ""
+        recipients: List[str] = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            verb = line[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                if verb == "EHLO":
+                    # Una sola escritura: respuestas multilinea fragmentadas disparan Nagle/ACK diferido.
+                    self._reply("250-mediflow-sink\r\n250-8BITMIME\r\n250 SMTPUTF8")
+                else:
+                    self._reply("250 mediflow-sink")
+            elif verb == "MAIL":
+                sender = _extract_address(line)
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(_extract_address(line))
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                if data is None:
+                    return
+                error = sink._process(sender, recipients, data)
+                self._reply(error or "250 OK: queued")
+                sender, recipients = "", []
+            elif verb == "RSET":
+                sender, recipients = "", []
+                self._reply("250 OK")
+            elif verb == "NOOP":
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+    def _read_data(self) -> Optional[bytes]:
+        chunks: List[bytes] = []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return None
+            if raw in (b".\r\n", b".\n"):
+                return b"".join(chunks)
+            if raw.startswith(b".."):
+                raw = raw[1:]
+            chunks.append(raw)
+
+
+def _extract_address(line: str) -> str:
+    start = line.find("<")
+    end = line.find(">", start + 1)
+    if start == -1 or end == -1:
+        return line.split(":", 1)[-1].strip()
+    return line[start + 1 : end]
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SmtpSink:
+    """Servidor SMTP local que registra los mensajes en memoria.
+
+    Reemplaza al proveedor real en desarrollo y benchmarks: permite inyectar
+    latencia por mensaje y fallas (tasa aleatoria o cada N mensajes).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        fail_every: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_every = fail_every
+        self.messages: List[RecordedMessage] = []
+        self.connections = 0
+        self.failures = 0
+        self._attempts = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[_ThreadingSMTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SmtpSink":
+        self._server = _ThreadingSMTPServer((self.host, self.port), _SinkHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.messages = []
+            self.connections = 0
+            self.failures = 0
+            self._attempts = 0
+
+    def __enter__(self) -> "SmtpSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _register_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def _process(self, sender: str, recipients: List[str], data: bytes) -> Optional[str]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self._attempts += 1
+            failed = (self.fail_every and self._attempts % self.fail_every == 0) or (
+                self.failure_rate and self._random.random() < self.failure_rate
+            )
+            if failed:
+                self.failures += 1
+                return "451 4.3.0 Falla inyectada por el sink"
+            self.messages.append(RecordedMessage(sender, list(recipients), data))
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sink SMTP local para desarrollo.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos por mensaje")
+    parser.add_argument("--tasa-fallas", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.port, latency=args.latencia, failure_rate=args.tasa_fallas).start()
+    print(f"Sink SMTP escuchando en {sink.host}:{sink.port} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        sink.stop()
@@ -0,0 +1,30 @@
+import sqlite3
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from app.observers.bus import EventBus
+from app.observers.events import appointment_status_changed_event
+from app.repositories import appointments
+
+
+class StaleAppointmentsJob:
+    """Job batch: pasa a ``estado`` (por defecto ``ausente``) los turnos ``programado`` ya vencidos."""
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], sqlite3.Connection],
+        event_bus: Optional[EventBus] = None,
+        estado: str = "ausente",
+    ) -> None:
+        self.connection_factory = connection_factory
+        self.event_bus = event_bus
+        self.estado = estado
+
+    def run(self, hasta: Optional[datetime] = None) -> List[int]:
+        affected = appointments.bulk_update_status(
+            self.connection_factory(), self.estado, hasta=hasta or datetime.now()
+        )
+        if self.event_bus:
+            for previous in affected:
+                self.event_bus.publish(appointment_status_changed_event(previous, self.estado))
+        return [row["id"] for row in affected]
@@ -0,0 +1,81 @@
+import sqlite3
+from datetime import date, datetime
+from typing import Callable, List, Optional
+
+from app.db import transaction
+from app.observers.base import Observer
+from app.observers.bus import EventBus
+from app.observers.events import AppointmentStatusChanged, appointment_created_event
+from app.repositories import appointments, waitlist
+
+MAX_ATTEMPTS = 5
+
+
+class WaitlistMatcher(Observer):
+    """Suscriptor de ``AppointmentStatusChanged``: ofrece cada turno cancelado a la lista de espera.
+
+    El candidato se reserva por el mismo camino atomico que ``POST /turnos``; si la reserva
+    falla para ese paciente se prueba con el siguiente, y si el sub-turno ya fue tomado se desiste.
+    """
+
+    def __init__(self, event_bus: EventBus, connection_factory: Callable[[], sqlite3.Connection]) -> None:
+        self.event_bus = event_bus
+        self.connection_factory = connection_factory
+
+    def update(self, data: AppointmentStatusChanged) -> None:
+        if data.estado != "cancelado" or data.estado_anterior == "cancelado" or not data.disponibilidad_id:
+            return
+        self.match(data.turno_id)
+
+    def match(self, cancelled_turno_id: int) -> Optional[int]:
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT t.paciente_id, t.medico_id, t.disponibilidad_id, t.fecha, m.especialidad_id
+            FROM turnos t
+            JOIN medicos m ON t.medico_id = m.id
+            WHERE t.id = ? AND t.estado = 'cancelado'
+            """,
+            (cancelled_turno_id,),
+        )
+        freed = cursor.fetchone()
+        cursor.close()
+        if not freed or not freed["disponibilidad_id"]:
+            return None
+
+        fecha = datetime.fromisoformat(freed["fecha"])
+        if fecha <= datetime.now():
+            return None
+        waitlist.expire_entries(conn, date.today())
+        skipped: List[int] = []
+        for _ in range(MAX_ATTEMPTS):
+            candidate = waitlist.find_candidate(
+                conn, freed["medico_id"], freed["especialidad_id"], fecha.date(), freed["paciente_id"], skipped
+            )
+            if not candidate:
+                return None
+            try:
+                with transaction(conn):
+                    turno_id = appointments.create_appointment(
+                        conn,
+                        {
+                            "paciente_id": candidate["paciente_id"],
+                            "medico_id": freed["medico_id"],
+                            "disponibilidad_id": freed["disponibilidad_id"],
+                            "fecha": fecha,
+                            "estado": "programado",
+                            "motivo_consulta": "Asignado desde lista de espera",
+                        },
+                    )
+                    if not waitlist.assign_entry(conn, candidate["id"], turno_id):
+                        raise ValueError("La entrada de lista de espera ya fue asignada.")
+            except ValueError as exc:
+                if str(exc) in (appointments.SLOT_TAKEN, appointments.SUB_SLOT_TAKEN):
+                    return None
+                skipped.append(candidate["id"])
+                continue
+            turno = appointments.get_appointment(conn, turno_id)
+            self.event_bus.publish(appointment_created_event(turno))
+            return turno_id
+        return None
@@ -0,0 +1,108 @@
+"""Requests/s de GET /health vs GET /especialidades autenticado, en proceso (ASGI).
+
+Compara el middleware actual (ASGI puro + cache de tokens verificados) con el
+anterior (``@app.middleware("http")`` + HTTPBearer + jwt.decode en cada request).
+
+Uso:
+    python -m benchmarks.bench_auth --requests 3000 --concurrencia 16
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def _legacy_dispatch(open_paths):
+    from fastapi.responses import JSONResponse
+    from fastapi.security import HTTPBearer
+
+    from app.security import decode_token
+
+    bearer_scheme = HTTPBearer(auto_error=False)
+
+    async def enforce_auth(request, call_next):
+        path = request.url.path
+        if path in open_paths or path.startswith("/docs") or path.startswith("/static"):
+            return await call_next(request)
+        credentials = await bearer_scheme(request)
+        if not credentials or credentials.scheme.lower() != "bearer":
+            return JSONResponse({"detail": "No autorizado"}, status_code=401)
+        try:
+            username = decode_token(credentials.credentials)
+            if not username:
+                raise ValueError("invalid subject")
+        except Exception:
+            return JSONResponse({"detail": "Token invalido o expirado"}, status_code=401)
+        request.state.user = username
+        return await call_next(request)
+
+    return enforce_auth
+
+
+def _use_legacy_middleware(app, open_paths) -> None:
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from app.middleware import AuthMiddleware
+
+    app.user_middleware = [
+        Middleware(BaseHTTPMiddleware, dispatch=_legacy_dispatch(open_paths)) if m.cls is AuthMiddleware else m
+        for m in app.user_middleware
+    ]
+    app.middleware_stack = None
+
+
+async def _measure(app, path: str, headers: dict, total: int, concurrency: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Calentamiento (construye el stack de middlewares y llena caches).
+        for _ in range(20):
+            assert (await client.get(path, headers=headers)).status_code == 200
+        remaining = total
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                res = await client.get(path, headers=headers)
+                assert res.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--modo", choices=["actual", "legacy", "ambos"], default="ambos")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    from app.db import init_db
+    from app.security import create_access_token
+
+    init_db()
+    headers = {"Authorization": f"Bearer {create_access_token('admin')}"}
+    modes = ["actual", "legacy"] if args.modo == "ambos" else [args.modo]
+    for mode in modes:
+        import importlib
+
+        import app.main as main_module
+
+        main_module = importlib.reload(main_module)
+        if mode == "legacy":
+            _use_legacy_middleware(main_module.app, main_module.OPEN_PATHS)
+        health = asyncio.run(_measure(main_module.app, "/health", {}, args.requests, args.concurrencia))
+        auth = asyncio.run(_measure(main_module.app, "/especialidades", headers, args.requests, args.concurrencia))
+        print(f"== middleware {mode}")
+        print(f"   GET /health:                      {health:,.0f} req/s")
+        print(f"   GET /especialidades (con token):  {auth:,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Alta masiva de disponibilidad para toda una clinica.
+
+Crea ``--slots`` franjas de 5 minutos por medico y dia para ``--medicos`` medicos y
+reporta altas/s. ``--legacy`` usa la verificacion anterior (traer todas las franjas del
+dia y parsear cada hora con strptime en cada alta), que crece de forma cuadratica.
+``--recurrente`` genera en cambio un trimestre de patron semanal (lunes a viernes,
+``--slots`` bloques de 30 minutos por dia) por medico via create_recurring_availability.
+
+Uso:
+    python -m benchmarks.bench_availability --medicos 50 --dias 5 --slots 100
+    python -m benchmarks.bench_availability --medicos 500 --slots 8 --recurrente
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def _legacy_has_overlap(conn, medico_id, fecha, start_str, end_str) -> bool:
+    new_start = datetime.strptime(start_str, "%H:%M").time()
+    new_end = datetime.strptime(end_str, "%H:%M").time()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT hora_inicio, hora_fin FROM disponibilidad_medicos WHERE medico_id = ? AND fecha = ?",
+        (medico_id, fecha),
+    )
+    rows = cursor.fetchall()
+    cursor.close()
+    for row in rows:
+        existing_start = datetime.strptime(row["hora_inicio"], "%H:%M").time()
+        existing_end = datetime.strptime(row["hora_fin"], "%H:%M").time()
+        if new_start < existing_end and new_end > existing_start:
+            return True
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--medicos", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=5)
+    parser.add_argument("--slots", type=int, default=100, help="Franjas de 5 minutos por medico y dia")
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--recurrente", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(), "availability.db")
+    from app.db import get_connection, init_db
+    from app.repositories import availability
+
+    init_db()
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO medicos (nombre, apellido, especialidad_id, mail) VALUES ('Bench', 'Medico', 1, ?)",
+        [(f"bench{i}@mediflow.test",) for i in range(args.medicos)],
+    )
+    conn.commit()
+    doctor_ids = [row[0] for row in conn.execute("SELECT id FROM medicos WHERE nombre = 'Bench'")]
+    if args.legacy:
+        availability._has_overlap = _legacy_has_overlap
+        availability.get_index(conn).overlaps = (
+            lambda c, medico_id, fecha, start, end: _legacy_has_overlap(
+                c, medico_id, fecha, f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+            )
+        )
+
+    first_day = date.today() + timedelta(days=30)
+    if args.recurrente:
+        bloques = [
+            {
+                "dia_semana": weekday,
+                "hora_inicio": f"{(8 * 60 + 30 * i) // 60:02d}:{(8 * 60 + 30 * i) % 60:02d}",
+                "hora_fin": f"{(8 * 60 + 30 * (i + 1)) // 60:02d}:{(8 * 60 + 30 * (i + 1)) % 60:02d}",
+            }
+            for weekday in range(5)
+            for i in range(args.slots)
+        ]
+        created = 0
+        start = time.perf_counter()
+        for medico_id in doctor_ids:
+            result = availability.create_recurring_availability(
+                conn, medico_id, first_day, first_day + timedelta(days=90), bloques
+            )
+            created += result["creadas"]
+        elapsed = time.perf_counter() - start
+        print(f"== patron recurrente: {len(doctor_ids)} medicos, un trimestre")
+        print(f"   {created} franjas en {elapsed:.2f}s -> {created / elapsed:,.0f} altas/s")
+        return
+
+    created = 0
+    start = time.perf_counter()
+    for day_offset in range(args.dias):
+        fecha = (first_day + timedelta(days=day_offset)).isoformat()
+        for medico_id in doctor_ids:
+            for slot in range(args.slots):
+                begin = 7 * 60 + slot * 5
+                availability.create_availability(
+                    conn,
+                    {
+                        "medico_id": medico_id,
+                        "fecha": fecha,
+                        "hora_inicio": f"{begin // 60:02d}:{begin % 60:02d}",
+                        "hora_fin": f"{(begin + 5) // 60:02d}:{(begin + 5) % 60:02d}",
+                    },
+                )
+                created += 1
+    elapsed = time.perf_counter() - start
+    print(f"== verificacion {'legacy' if args.legacy else 'indice de intervalos'}")
+    print(f"   {created} franjas en {elapsed:.2f}s -> {created / elapsed:,.0f} altas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Contencion de reservas: cientos de clientes compiten por las mismas disponibilidades.
+
+Cada cliente usa su propia conexion SQLite (como varios workers de uvicorn) e intenta
+reservar disponibilidades al azar de un conjunto chico. Reporta reservas exitosas,
+rechazos, dobles reservas detectadas, intentos/s y latencia p50/p99.
+
+``--legacy`` usa el camino anterior (leer, validar y luego INSERT + UPDATE) sin el
+indice unico, para mostrar las dobles reservas que producia.
+
+Uso:
+    python -m benchmarks.bench_booking_contention --clientes 200 --slots 20 --intentos 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def _legacy_create(conn: sqlite3.Connection, data: dict) -> int:
+    from app.repositories import appointments, clinical_history
+
+    ok, start_dt, duration, _, reason = appointments._validate_slot_selection(
+        conn, data["medico_id"], data["disponibilidad_id"], data["fecha"]
+    )
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id FROM turnos WHERE disponibilidad_id = ? AND estado != 'cancelado'",
+        (data["disponibilidad_id"],),
+    )
+    if not ok or cursor.fetchone():
+        cursor.close()
+        raise ValueError(reason or appointments.SLOT_TAKEN)
+    cursor.execute(
+        """
+        INSERT INTO turnos (paciente_id, medico_id, disponibilidad_id, fecha, estado, motivo_consulta, duracion, recordatorio)
+        VALUES (?, ?, ?, ?, 'programado', NULL, ?, 'pendiente')
+        """,
+        (data["paciente_id"], data["medico_id"], data["disponibilidad_id"], start_dt.isoformat(sep=" "), duration),
+    )
+    new_id = cursor.lastrowid
+    cursor.execute("UPDATE disponibilidad_medicos SET activa = 0 WHERE id = ?", (data["disponibilidad_id"],))
+    clinical_history.upsert_from_appointment(
+        conn, turno_id=new_id, paciente_id=data["paciente_id"], estado="programado",
+        fecha_turno=start_dt, descripcion="Turno", commit=False,
+    )
+    conn.commit()
+    cursor.close()
+    return new_id
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=20)
+    parser.add_argument("--intentos", type=int, default=5, help="Intentos por cliente")
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "contention.db")
+    os.environ["DATABASE_URL"] = db_path
+    from app.db import get_connection, init_db
+    from app.repositories import appointments
+
+    init_db()
+    setup = get_connection()
+    fecha: date = date.today() + timedelta(days=7)
+    slot_ids = []
+    for i in range(args.slots):
+        start = datetime(2000, 1, 1, 8, 0) + timedelta(minutes=15 * i)
+        end = start + timedelta(minutes=15)
+        cur = setup.execute(
+            "INSERT INTO disponibilidad_medicos (medico_id, fecha, hora_inicio, hora_fin) VALUES (1, ?, ?, ?)",
+            (fecha.isoformat(), start.strftime("%H:%M"), end.strftime("%H:%M")),
+        )
+        slot_ids.append(cur.lastrowid)
+    if args.legacy:
+        setup.execute("DROP INDEX IF EXISTS ux_turnos_subturno_activo")
+    setup.commit()
+
+    create = _legacy_create if args.legacy else appointments.create_appointment
+    barrier = threading.Barrier(args.clientes)
+    lock = threading.Lock()
+    latencies: List[float] = []
+    counters = {"ok": 0, "rechazado": 0, "error": 0}
+
+    def client(index: int) -> None:
+        conn = _connect(db_path)
+        rng = random.Random(index)
+        barrier.wait()
+        for _ in range(args.intentos):
+            data = {
+                "paciente_id": 1 + index % 8,
+                "medico_id": 1,
+                "disponibilidad_id": rng.choice(slot_ids),
+                "fecha": datetime.combine(fecha, datetime.min.time()),
+                "estado": "programado",
+            }
+            start = time.perf_counter()
+            try:
+                create(conn, data)
+                outcome = "ok"
+            except ValueError:
+                outcome = "rechazado"
+            except sqlite3.Error:
+                outcome = "error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                counters[outcome] += 1
+                latencies.append(elapsed)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clientes)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    dobles = setup.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT disponibilidad_id FROM turnos
+            WHERE disponibilidad_id IS NOT NULL AND estado != 'cancelado'
+            GROUP BY disponibilidad_id HAVING COUNT(*) > 1
+        )
+        """
+    ).fetchone()[0]
+    total = sum(counters.values())
+    print(f"== camino {'legacy' if args.legacy else 'atomico'}: {args.clientes} clientes, {args.slots} slots")
+    print(f"   reservas ok: {counters['ok']}  rechazos: {counters['rechazado']}  errores sqlite: {counters['error']}")
+    print(f"   disponibilidades con doble reserva: {dobles}")
+    print(f"   intentos/s: {total / elapsed:,.0f}  p50: {_percentile(latencies, 50) * 1000:.2f} ms  p99: {_percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Alta de pacientes de a uno (POST /pacientes) contra el alta masiva (POST /pacientes/lote).
+
+Carga ``--pacientes`` pacientes sinteticos por cada camino (con un ``--duplicados`` de DNIs ya
+existentes) y reporta filas/s. El lote se manda en requests de ``--lote`` filas.
+
+Uso:
+    python -m benchmarks.bench_bulk --pacientes 20000 --lote 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+
+def _rows(start: int, total: int) -> List[Dict]:
+    return [
+        {"dni": str(start + i), "nombre": "Carga", "apellido": "Masiva", "mail": f"p{start + i}@mail.test"}
+        for i in range(total)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pacientes", type=int, default=20000)
+    parser.add_argument("--lote", type=int, default=5000)
+    parser.add_argument("--duplicados", type=float, default=0.05, help="Fraccion de filas con DNI ya cargado")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(), "bulk.db")
+    os.environ.setdefault("EVENT_BUS_WORKERS", "0")
+    os.environ.setdefault("SMTP_DRY_RUN", "true")
+    os.environ.setdefault("ADMIN_DEFAULT_PASSWORD", "admin123")
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        token = client.post(
+            "/auth/login", json={"username": "admin", "password": os.environ["ADMIN_DEFAULT_PASSWORD"]}
+        ).json()["access_token"]
+        client.headers.update({"Authorization": f"Bearer {token}"})
+        duplicated = int(args.pacientes * args.duplicados)
+
+        single = _rows(30000000, args.pacientes)
+        single[:duplicated] = _rows(30000000 + args.pacientes - duplicated, duplicated)
+        start = time.perf_counter()
+        rejected = sum(client.post("/pacientes", json=row).status_code != 200 for row in single)
+        single_elapsed = time.perf_counter() - start
+
+        bulk = _rows(40000000, args.pacientes)
+        bulk[:duplicated] = _rows(40000000 + args.pacientes - duplicated, duplicated)
+        start = time.perf_counter()
+        bulk_rejected = 0
+        for offset in range(0, len(bulk), args.lote):
+            res = client.post("/pacientes/lote", json={"filas": bulk[offset : offset + args.lote]})
+            bulk_rejected += len(res.json()["errores"])
+        bulk_elapsed = time.perf_counter() - start
+
+    print(f"== {args.pacientes:,} pacientes ({duplicated:,} con DNI duplicado)")
+    print(f"   {'POST /pacientes':<24} {args.pacientes / single_elapsed:>10,.0f} filas/s  rechazadas: {rejected}")
+    print(
+        f"   {'POST /pacientes/lote':<24} {args.pacientes / bulk_elapsed:>10,.0f} filas/s  rechazadas: {bulk_rejected}"
+        f"  (lotes de {args.lote})"
+    )
+
+
+if __name__ == "__main__":
+    main()
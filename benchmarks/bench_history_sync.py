@@ -0,0 +1,161 @@
+"""Latencia de escritura de POST /turnos y PUT /turnos/{id}/estado (sincronizacion del historial).
+
+Reserva ``--turnos`` sub-turnos de a uno y luego alterna sus estados, midiendo p50/p99 de
+cada endpoint; al final mide la sincronizacion aislada (sin HTTP ni commit por turno). ``--legacy`` reemplaza el upsert actual (INSERT ... ON CONFLICT sobre
+ux_historial_turno) por el anterior: SELECT y luego UPDATE o INSERT, con indice no unico.
+
+Uso:
+    python -m benchmarks.bench_history_sync --turnos 1000
+    python -m benchmarks.bench_history_sync --turnos 1000 --legacy
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List, Optional
+
+
+def _legacy_upsert(
+    conn,
+    turno_id: int,
+    paciente_id: int,
+    estado: str,
+    fecha_turno,
+    descripcion: Optional[str] = None,
+    commit: bool = True,
+) -> None:
+    from app.repositories.clinical_history import _normalize_fecha
+
+    cursor = conn.cursor()
+    fecha_turno_norm = _normalize_fecha(fecha_turno)
+    cursor.execute("SELECT id, descripcion FROM historial_clinico WHERE turno_id = ?", (turno_id,))
+    existing = cursor.fetchone()
+    note = descripcion or (existing["descripcion"] if existing else "Seguimiento de turno")
+    if existing:
+        cursor.execute(
+            "UPDATE historial_clinico SET estado = ?, fecha_turno = ?, descripcion = ? WHERE turno_id = ?",
+            (estado, fecha_turno_norm, note, turno_id),
+        )
+    else:
+        cursor.execute(
+            """
+            INSERT INTO historial_clinico (paciente_id, turno_id, descripcion, estado, fecha_turno)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (paciente_id, turno_id, note, estado, fecha_turno_norm),
+        )
+    if commit:
+        conn.commit()
+    cursor.close()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _report(name: str, latencies: List[float]) -> None:
+    total = sum(latencies)
+    print(
+        f"   {name:<28} {len(latencies) / total:>8,.0f} req/s  "
+        f"p50: {_percentile(latencies, 50) * 1000:.2f} ms  p99: {_percentile(latencies, 99) * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turnos", type=int, default=1000)
+    parser.add_argument("--historial-previo", type=int, default=50000, help="Filas de historial sin turno precargadas")
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(), "history.db")
+    os.environ.setdefault("EVENT_BUS_WORKERS", "0")
+    os.environ.setdefault("SMTP_DRY_RUN", "true")
+    os.environ.setdefault("ADMIN_DEFAULT_PASSWORD", "admin123")
+    from fastapi.testclient import TestClient
+
+    from app.db import get_connection
+    from app.main import app
+    from app.repositories import clinical_history
+
+    # Los mails en dry-run se imprimen: se descartan para no medir la consola.
+    with TestClient(app) as client, contextlib.redirect_stdout(io.StringIO()):
+        conn = get_connection()
+        conn.executemany(
+            "INSERT INTO historial_clinico (paciente_id, descripcion, estado) VALUES (1, 'Nota previa', 'completado')",
+            [()] * args.historial_previo,
+        )
+        if args.legacy:
+            conn.execute("DROP INDEX IF EXISTS ux_historial_turno")
+            conn.execute("CREATE INDEX idx_historial_turno ON historial_clinico(turno_id)")
+            clinical_history.upsert_from_appointment = _legacy_upsert
+        conn.commit()
+
+        token = client.post(
+            "/auth/login", json={"username": "admin", "password": os.environ["ADMIN_DEFAULT_PASSWORD"]}
+        ).json()["access_token"]
+        client.headers.update({"Authorization": f"Bearer {token}"})
+
+        fecha = date.today() + timedelta(days=10)
+        per_block = 48
+        slots = []
+        for block in range((args.turnos + per_block - 1) // per_block):
+            res = client.post(
+                "/disponibilidad",
+                json={
+                    "medico_id": 1 + block % 5,
+                    "fecha": (fecha + timedelta(days=block // 5)).isoformat(),
+                    "hora_inicio": "08:00",
+                    "hora_fin": "20:00",
+                    "duracion_turno": 15,
+                },
+            )
+            slots.append((res.json()["id"], 1 + block % 5, fecha + timedelta(days=block // 5)))
+
+        created: List[int] = []
+        create_latencies: List[float] = []
+        for i in range(args.turnos):
+            availability_id, medico_id, slot_date = slots[i // per_block]
+            minutes = 15 * (i % per_block) + 480
+            payload = {
+                "paciente_id": 1 + i % 8,
+                "medico_id": medico_id,
+                "disponibilidad_id": availability_id,
+                "fecha": f"{slot_date.isoformat()}T{minutes // 60:02d}:{minutes % 60:02d}:00",
+            }
+            start = time.perf_counter()
+            res = client.post("/turnos", json=payload)
+            create_latencies.append(time.perf_counter() - start)
+            assert res.status_code == 200, res.text
+            created.append(res.json()["id"])
+
+        status_latencies: List[float] = []
+        for estado in ("completado", "ausente"):
+            for turno_id in created:
+                start = time.perf_counter()
+                res = client.put(f"/turnos/{turno_id}/estado", json={"estado": estado})
+                status_latencies.append(time.perf_counter() - start)
+                assert res.status_code == 200, res.text
+
+        sync_start = time.perf_counter()
+        for estado in ("completado", "ausente") * 5:
+            for turno_id in created:
+                clinical_history.upsert_from_appointment(
+                    conn, turno_id, 1, estado, f"{fecha.isoformat()} 08:00:00", commit=False
+                )
+        conn.commit()
+        sync_elapsed = time.perf_counter() - sync_start
+        syncs = len(created) * 10
+
+    print(f"== historial {'legacy (SELECT + UPDATE/INSERT)' if args.legacy else 'upsert ON CONFLICT'}: {args.turnos} turnos")
+    _report("POST /turnos", create_latencies)
+    _report("PUT /turnos/{id}/estado", status_latencies)
+    print(f"   {'sync aislado':<28} {syncs / sync_elapsed:>8,.0f} upserts/s  {sync_elapsed / syncs * 1e6:.1f} us/upsert")
+
+
+if __name__ == "__main__":
+    main()
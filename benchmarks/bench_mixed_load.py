@@ -0,0 +1,129 @@
+"""Latencia de requests rapidos mientras otros clientes saturan el servidor con consultas lentas.
+
+Levanta uvicorn en un hilo sobre una base con ``--turnos`` turnos. ``--lentas`` clientes piden en
+bucle ``GET /reportes/turnos-por-especialidad`` (recorre todos los turnos). Mientras tanto, un
+cliente mide p50/p99 de ``GET /health`` (sin BD) y otro los de ``GET /pacientes/{id}`` (busqueda
+por clave primaria). ``--pool`` fija ``DB_POOL_SIZE``.
+
+Uso:
+    python -m benchmarks.bench_mixed_load --turnos 300000 --lentas 60 --segundos 10
+    python -m benchmarks.bench_mixed_load --lentas 60 --pool 8
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _report(name: str, latencies: List[float], elapsed: float) -> None:
+    print(
+        f"   {name:<34} {len(latencies) / elapsed:>8,.0f} req/s  "
+        f"p50: {_percentile(latencies, 50) * 1000:7.2f} ms  p99: {_percentile(latencies, 99) * 1000:7.2f} ms"
+    )
+
+
+def _seed(db_path: str, turnos: int) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO turnos (paciente_id, medico_id, fecha, estado, duracion)
+        SELECT 1 + i % 8, 1 + i % 5, datetime('2020-01-01', '+' || (i % 2000) || ' hours'), 'completado', 30 FROM n
+        """,
+        (turnos,),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def _loop_requests(client, path: str, deadline: float, latencies: List[float]) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        res = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        assert res.status_code == 200, res.text
+
+
+async def _run(port: int, token: str, lentas: int, segundos: float) -> None:
+    import httpx
+
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=lentas + 2, max_keepalive_connections=lentas + 2)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", headers=headers, limits=limits, timeout=120
+    ) as client:
+        slow: List[float] = []
+        health: List[float] = []
+        lookup: List[float] = []
+        start = time.perf_counter()
+        deadline = start + segundos
+        await asyncio.gather(
+            *(_loop_requests(client, "/reportes/turnos-por-especialidad", deadline, slow) for _ in range(lentas)),
+            _loop_requests(client, "/health", deadline, health),
+            _loop_requests(client, "/pacientes/1", deadline, lookup),
+        )
+        elapsed = time.perf_counter() - start
+    _report("GET /reportes/turnos-por-especialidad", slow, elapsed)
+    _report("GET /health", health, elapsed)
+    _report("GET /pacientes/1", lookup, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turnos", type=int, default=300000)
+    parser.add_argument("--lentas", type=int, default=60, help="Clientes concurrentes con la consulta lenta")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--pool", type=int, default=None, help="DB_POOL_SIZE")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "mixed.db")
+    os.environ["DATABASE_URL"] = db_path
+    os.environ.setdefault("EVENT_BUS_WORKERS", "0")
+    os.environ.setdefault("SMTP_DRY_RUN", "true")
+    os.environ.setdefault("ADMIN_DEFAULT_PASSWORD", "admin123")
+    if args.pool:
+        os.environ["DB_POOL_SIZE"] = str(args.pool)
+    import httpx
+    import uvicorn
+
+    from app.db import init_db
+
+    init_db()
+    _seed(db_path, args.turnos)
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config("app.main:app", host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        token = httpx.post(
+            f"http://127.0.0.1:{port}/auth/login",
+            json={"username": "admin", "password": os.environ["ADMIN_DEFAULT_PASSWORD"]},
+        ).json()["access_token"]
+        pool = os.getenv("DB_POOL_SIZE", "4")
+        print(f"== {args.turnos:,} turnos, {args.lentas} clientes lentos, DB_POOL_SIZE={pool}, {args.segundos:.0f} s")
+        print(f"   hilos del proceso al arrancar: {threading.active_count()}")
+        asyncio.run(_run(port, token, args.lentas, args.segundos))
+        print(f"   hilos del proceso al terminar: {threading.active_count()}")
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
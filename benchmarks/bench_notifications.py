@@ -0,0 +1,102 @@
+"""Benchmark del camino de mails (recordatorios y recetas) contra el sink SMTP local.
+
+Uso:
+    python -m benchmarks.bench_notifications --mensajes 500 --hilos 8 --latencia 0.005
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List
+
+from app.services.email_client import EmailClient
+from app.services.prescription_notifier import PrescriptionNotifier
+from app.services.reminder import ReminderService
+from app.services.smtp_sink import SmtpSink
+
+
+class TimedEmailClient(EmailClient):
+    """EmailClient que registra la latencia de cada envio."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def send_email(self, recipient: str, subject: str, body: str) -> None:
+        start = time.perf_counter()
+        try:
+            super().send_email(recipient, subject, body)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run_scenario(name: str, sink: SmtpSink, total: int, threads: int, job) -> None:
+    sink.reset()
+    client = TimedEmailClient(
+        smtp_server=sink.host, smtp_port=sink.port, dry_run=False, use_ssl=False
+    )
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: job(client, i), range(total)))
+    elapsed = time.perf_counter() - start
+
+    sent = len(sink.messages)
+    print(f"== {name}")
+    print(f"   envios: {len(client.latencies)}  entregados: {sent}  errores: {client.errors}")
+    print(f"   mensajes/s: {sent / elapsed:,.1f}  (total {elapsed:.2f}s)")
+    print(
+        "   latencia envio p50: {:.2f} ms  p99: {:.2f} ms  media: {:.2f} ms".format(
+            _percentile(client.latencies, 50) * 1000,
+            _percentile(client.latencies, 99) * 1000,
+            (statistics.mean(client.latencies) if client.latencies else 0) * 1000,
+        )
+    )
+    print(f"   conexiones SMTP: {sink.connections}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mensajes", type=int, default=500)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latencia inyectada por mensaje (s)")
+    parser.add_argument("--tasa-fallas", type=float, default=0.0)
+    args = parser.parse_args()
+
+    appointment_dt = datetime.now() + timedelta(days=2)
+
+    def reminder_job(client: EmailClient, i: int) -> None:
+        # Sin lead times: solo se mide la confirmacion inmediata, no los timers diferidos.
+        service = ReminderService(client, lead_times=())
+        service.schedule_reminders(
+            appointment_dt, f"Paciente {i}", f"paciente{i}@mediflow.test", "Dra. Suarez", "Clinica"
+        )
+
+    def prescription_job(client: EmailClient, i: int) -> None:
+        PrescriptionNotifier(client).notify_prescription(
+            f"Paciente {i}", f"paciente{i}@mediflow.test", "Dr. Lopez", "Ibuprofeno 400mg cada 8hs"
+        )
+
+    with SmtpSink(latency=args.latencia, failure_rate=args.tasa_fallas, seed=1) as sink:
+        _run_scenario("ReminderService.schedule_reminders", sink, args.mensajes, args.hilos, reminder_job)
+        _run_scenario("PrescriptionNotifier.notify_prescription", sink, args.mensajes, args.hilos, prescription_job)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Latencia de busqueda de pacientes sobre una base grande (FTS5).
+
+Carga ``--pacientes`` pacientes sinteticos y mide p50/p99 de ``patients.search_patients``
+para consultas tipicas de recepcion (apellido parcial, nombre + apellido, DNI parcial).
+``--legacy`` mide la alternativa sin indice: LIKE por prefijo sobre la tabla. ``--fuzzy`` mide
+``patients.fuzzy_search_patients`` con apellidos mal escritos (una letra cambiada).
+
+Uso:
+    python -m benchmarks.bench_search --pacientes 500000
+    python -m benchmarks.bench_search --pacientes 500000 --fuzzy
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, List
+
+NOMBRES = ["Ana", "Luis", "Sofia", "Carlos", "Valeria", "Matias", "Carla", "Nicolas", "Lucia", "Diego",
+           "Martina", "Juan", "Camila", "Pedro", "Julieta", "Tomas", "Florencia", "Agustin", "Rocio", "Franco"]
+APELLIDOS = ["Garcia", "Perez", "Martinez", "Ramos", "Torres", "Rios", "Diaz", "Fernandez", "Gimenez",
+             "Suarez", "Lopez", "Castro", "Gonzalez", "Rodriguez", "Sosa", "Romero", "Alvarez", "Benitez",
+             "Acosta", "Medina", "Herrera", "Aguirre", "Pereyra", "Gutierrez", "Molina", "Silva", "Ojeda"]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _legacy_search(conn, text: str, limit: int = 20):
+    like = f"{text.strip()}%"
+    return conn.execute(
+        """
+        SELECT * FROM pacientes
+        WHERE nombre LIKE ?1 OR apellido LIKE ?1 OR dni LIKE ?1 OR mail LIKE ?1
+        ORDER BY apellido, nombre LIMIT ?2
+        """,
+        (like, limit),
+    ).fetchall()
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    pos = rng.randrange(1, len(word))
+    return word[:pos] + rng.choice("aeiouszcxj") + word[pos + 1 :]
+
+
+def _populate(conn, total: int, rng: random.Random) -> None:
+    batch = []
+    for i in range(total):
+        nombre = rng.choice(NOMBRES)
+        apellido = rng.choice(APELLIDOS) + ("" if i % 3 else rng.choice(["", "s", "o", "ez"]))
+        batch.append((str(20000000 + i), nombre, apellido, f"{nombre.lower()}.{apellido.lower()}{i}@mail.test"))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO pacientes (dni, nombre, apellido, mail) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO pacientes (dni, nombre, apellido, mail) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pacientes", type=int, default=500000)
+    parser.add_argument("--consultas", type=int, default=500)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--legacy", action="store_true")
+    mode.add_argument("--fuzzy", action="store_true")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = os.path.join(tempfile.mkdtemp(), "search.db")
+    from app.db import get_connection, init_db
+    from app.repositories import fuzzy, patients
+
+    init_db()
+    conn = get_connection()
+    rng = random.Random(7)
+    start = time.perf_counter()
+    _populate(conn, args.pacientes, rng)
+    print(f"== {args.pacientes:,} pacientes cargados (con triggers FTS) en {time.perf_counter() - start:.1f}s")
+
+    if args.fuzzy:
+        start = time.perf_counter()
+        fuzzy.get_name_index(conn, "pacientes")
+        print(f"   indice de trigramas cargado en {(time.perf_counter() - start) * 1000:.0f} ms")
+        queries = {
+            "apellido con error": lambda: _typo(rng.choice(APELLIDOS), rng),
+            "nombre + apellido": lambda: f"{rng.choice(NOMBRES)} {_typo(rng.choice(APELLIDOS), rng)}",
+        }
+        search: Callable = lambda text: patients.fuzzy_search_patients(conn, text)
+        label = "tolerante a errores (trigramas)"
+    else:
+        queries = {
+            "apellido parcial": lambda: rng.choice(APELLIDOS)[: rng.randint(3, 5)],
+            "nombre + apellido": lambda: f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)[:4]}",
+            "dni parcial": lambda: str(20000000 + rng.randrange(args.pacientes))[:6],
+        }
+        search = (lambda text: _legacy_search(conn, text)) if args.legacy else (
+            lambda text: patients.search_patients(conn, text)
+        )
+        label = "LIKE (legacy)" if args.legacy else "FTS5"
+    print(f"   busqueda {label}:")
+    for name, make in queries.items():
+        latencies = []
+        for _ in range(args.consultas):
+            text = make()
+            t0 = time.perf_counter()
+            search(text)
+            latencies.append(time.perf_counter() - t0)
+        print(
+            f"   {name:<20} p50: {_percentile(latencies, 50) * 1000:.2f} ms  "
+            f"p99: {_percentile(latencies, 99) * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
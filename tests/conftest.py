@@ -2,6 +2,10 @@ import os
 import pytest
 from fastapi.testclient import TestClient
 
+# Eventos sincronicos y mails sin red para que los tests sean deterministas.
+os.environ.setdefault("EVENT_BUS_WORKERS", "0")
+os.environ.setdefault("SMTP_DRY_RUN", "true")
+
 from app.db import Database, init_db
 from app.main import app
 
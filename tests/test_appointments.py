@@ -125,3 +125,171 @@ def test_invalid_availability_time_validation(client):
         },
     )
     assert res2.status_code == 422
+
+
+def test_concurrent_bookings_claim_slot_only_once(client):
+    import os
+    import sqlite3
+    import threading
+
+    from app.repositories import appointments
+
+    base_date = (_next_weekday(datetime.now(), 0) + timedelta(days=21)).date()
+    availability_id = prepare_doctor_with_availability(client, base_date.isoformat())
+    db_path = os.environ["DATABASE_URL"]
+    barrier = threading.Barrier(12)
+    results = []
+
+    def book(paciente_id: int) -> None:
+        conn = sqlite3.connect(db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        barrier.wait()
+        try:
+            appointments.create_appointment(
+                conn,
+                {
+                    "paciente_id": paciente_id,
+                    "medico_id": 1,
+                    "disponibilidad_id": availability_id,
+                    "fecha": datetime.combine(base_date, datetime.min.time()),
+                    "estado": "programado",
+                },
+            )
+            results.append("ok")
+        except ValueError:
+            results.append("rechazado")
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=book, args=(1 + i % 8,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count("ok") == 1
+    assert results.count("rechazado") == 11
+    booked = [t for t in client.get("/turnos").json() if t["disponibilidad_id"] == availability_id]
+    assert len(booked) == 1
+
+
+def test_reactivating_cancelled_appointment_fails_when_slot_was_rebooked(client):
+    base_date = (_next_weekday(datetime.now(), 0) + timedelta(days=14)).date()
+    availability_id = prepare_doctor_with_availability(client, base_date.isoformat())
+    turno = {
+        "paciente_id": create_patient(client, "3333"),
+        "medico_id": 1,
+        "disponibilidad_id": availability_id,
+        "fecha": base_date.isoformat(),
+        "estado": "programado",
+    }
+    first_id = client.post("/turnos", json=turno).json()["id"]
+    assert client.put(f"/turnos/{first_id}/estado", json={"estado": "cancelado"}).status_code == 200
+    assert client.post("/turnos", json=turno).status_code == 200
+
+    res = client.put(f"/turnos/{first_id}/estado", json={"estado": "programado"})
+    assert res.status_code == 400
+    assert "disponibilidad" in res.json()["detail"].lower()
+
+
+def test_sub_slots_are_booked_and_released_independently(client):
+    base_date = (_next_weekday(datetime.now(), 0) + timedelta(days=35)).date()
+    fecha = base_date.isoformat()
+    res = client.post(
+        "/disponibilidad",
+        json={"medico_id": 1, "fecha": fecha, "hora_inicio": "09:00", "hora_fin": "10:30", "duracion_turno": 30},
+    )
+    assert res.status_code == 200
+    availability_id = res.json()["id"]
+    patient_id = create_patient(client, "4444")
+
+    def book(fecha_turno: str):
+        return client.post(
+            "/turnos",
+            json={
+                "paciente_id": patient_id,
+                "medico_id": 1,
+                "disponibilidad_id": availability_id,
+                "fecha": fecha_turno,
+            },
+        )
+
+    first = book(fecha)  # sin hora: primer sub-turno libre
+    assert first.status_code == 200
+    assert first.json()["fecha"].endswith("09:00:00")
+    assert first.json()["duracion"] == 30
+    last = book(f"{fecha}T10:00:00")
+    assert last.status_code == 200 and last.json()["sub_turno"] == 2
+    assert book(f"{fecha}T09:00:00").status_code == 400
+    assert "no coincide" in book(f"{fecha}T09:15:00").json()["detail"]
+
+    slots = client.get(f"/disponibilidad/{availability_id}/subturnos").json()
+    assert [s["libre"] for s in slots] == [False, True, False]
+    assert slots[1]["hora_inicio"] == "09:30" and slots[1]["hora_fin"] == "10:00"
+
+    middle = book(fecha)
+    assert middle.status_code == 200 and middle.json()["sub_turno"] == 1
+    listed = client.get("/disponibilidad", params={"medico_id": 1}).json()
+    assert next(item for item in listed if item["id"] == availability_id)["activa"] is False
+    assert book(fecha).status_code == 400
+
+    assert client.put(f"/turnos/{middle.json()['id']}/estado", json={"estado": "cancelado"}).status_code == 200
+    slots = client.get(f"/disponibilidad/{availability_id}/subturnos").json()
+    assert [s["libre"] for s in slots] == [False, True, False]
+    assert book(fecha).json()["sub_turno"] == 1
+
+
+def test_bulk_status_update_is_set_based_and_reports_ids(client):
+    from app.db import get_connection
+    from app.services.stale_appointments import StaleAppointmentsJob
+
+    base_date = (_next_weekday(datetime.now(), 1) + timedelta(days=42)).date()
+    fecha = base_date.isoformat()
+    availability_id = client.post(
+        "/disponibilidad",
+        json={"medico_id": 1, "fecha": fecha, "hora_inicio": "09:00", "hora_fin": "10:30", "duracion_turno": 30},
+    ).json()["id"]
+    patient_id = create_patient(client, "7777")
+    ids = [
+        client.post(
+            "/turnos",
+            json={"paciente_id": patient_id, "medico_id": 1, "disponibilidad_id": availability_id, "fecha": f"{fecha}T{hora}"},
+        ).json()["id"]
+        for hora in ("09:00:00", "09:30:00", "10:00:00")
+    ]
+
+    res = client.post("/turnos/estado/lote", json={"estado": "cancelado", "ids": ids[:2] + [999999]})
+    assert res.status_code == 200
+    assert res.json()["actualizados"] == ids[:2]
+    slots = client.get(f"/disponibilidad/{availability_id}/subturnos").json()
+    assert [s["libre"] for s in slots] == [True, True, False]
+    history = {h["turno_id"]: h["estado"] for h in client.get(f"/pacientes/{patient_id}/historial").json()}
+    assert history == {ids[0]: "cancelado", ids[1]: "cancelado", ids[2]: "programado"}
+    # Los cancelados no se vuelven a tocar.
+    assert client.post("/turnos/estado/lote", json={"estado": "completado", "ids": ids}).json()["actualizados"] == [ids[2]]
+
+    assert client.post("/turnos/estado/lote", json={"estado": "ausente"}).status_code == 422
+    assert client.post("/turnos/estado/lote", json={"estado": "programado", "ids": ids}).status_code == 422
+
+    # El job diario toma los programados vencidos hasta el corte.
+    again = client.post(
+        "/turnos",
+        json={"paciente_id": patient_id, "medico_id": 1, "disponibilidad_id": availability_id, "fecha": f"{fecha}T09:00:00"},
+    ).json()["id"]
+    job = StaleAppointmentsJob(get_connection)
+    assert again not in job.run(datetime.fromisoformat(f"{fecha}T08:00:00"))  # incluye turnos vencidos del seed
+    assert job.run(datetime.fromisoformat(f"{fecha}T23:00:00")) == [again]
+    states = {t["id"]: t["estado"] for t in client.get("/turnos", params={"medico_id": 1}).json()}
+    assert states[again] == "ausente"
+
+
+def test_bulk_status_update_rejects_future_cutoff_and_accepts_aware_hasta(client):
+    future = (datetime.now() + timedelta(days=1)).isoformat()
+    res = client.post("/turnos/estado/lote", json={"estado": "ausente", "hasta": future})
+    assert res.status_code == 400
+    # Una hora con zona se pasa a hora local antes de compararla con los turnos.
+    aware = (datetime.now().astimezone() + timedelta(hours=1)).isoformat()
+    assert client.post("/turnos/estado/lote", json={"estado": "ausente", "hasta": aware}).status_code == 400
+    past = (datetime.now().astimezone() - timedelta(days=1)).isoformat()
+    assert client.post("/turnos/estado/lote", json={"estado": "ausente", "hasta": past}).status_code == 200
@@ -19,3 +19,64 @@ def test_login_rejects_bad_credentials(client):
     res = client.post("/auth/login", json={"username": "admin", "password": "wrong"})
     assert res.status_code == 401
     assert "Credenciales" in res.json()["detail"]
+
+
+def test_rejects_invalid_and_expired_tokens():
+    from datetime import timedelta
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.security import create_access_token
+
+    expired = create_access_token("admin", expires_delta=timedelta(seconds=-1))
+    with TestClient(app) as unauth_client:
+        for token in ("no-es-un-jwt", expired):
+            res = unauth_client.get("/pacientes", headers={"Authorization": f"Bearer {token}"})
+            assert res.status_code == 401
+            assert "Token invalido" in res.json()["detail"]
+
+
+def test_verified_token_cache_is_bounded_and_respects_exp():
+    import time
+
+    from app.security import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(maxsize=2)
+    now = time.time()
+    cache.put("a", "admin", now + 60)
+    cache.put("b", "admin", now - 1)
+    assert cache.get("b") is None  # expirado: se descarta
+    cache.put("c", "otro", now + 60)
+    cache.put("d", "otro", now + 60)
+    assert len(cache) == 2
+    assert cache.get("a") is None  # desalojado por LRU
+    assert cache.get("d") == "otro"
+
+
+def test_query_token_only_accepted_on_configured_paths():
+    import asyncio
+
+    from app.middleware import AuthMiddleware
+    from app.security import create_access_token
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": scope["state"]["user"].encode()})
+
+    middleware = AuthMiddleware(endpoint, query_token_paths={"/eventos"})
+    token = create_access_token("admin")
+
+    def status(path: str, query: str) -> int:
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "path": path, "headers": [], "query_string": query.encode()}
+        asyncio.run(middleware(scope, None, send))
+        return sent[0]["status"]
+
+    assert status("/eventos", f"token={token}") == 200
+    assert status("/eventos", "token=no-es-un-jwt") == 401
+    assert status("/eventos", "") == 401
+    assert status("/pacientes", f"token={token}") == 401
@@ -56,3 +56,147 @@ def test_availability_requires_fecha(client):
         json={"medico_id": 1, "hora_inicio": "10:00", "hora_fin": "11:00"},
     )
     assert res.status_code == 422
+
+
+def test_deleted_slot_frees_range_and_index_tracks_changes(client):
+    payload = {"medico_id": 3, "fecha": "2025-12-10", "hora_inicio": "08:00", "hora_fin": "10:00"}
+    first = client.post("/disponibilidad", json=payload)
+    assert first.status_code == 200
+    inner = {**payload, "hora_inicio": "08:30", "hora_fin": "09:00"}
+    assert client.post("/disponibilidad", json=inner).status_code == 400
+    before = {**payload, "hora_inicio": "07:00", "hora_fin": "08:00"}
+    assert client.post("/disponibilidad", json=before).status_code == 200
+
+    assert client.delete(f"/disponibilidad/{first.json()['id']}").status_code == 200
+    assert client.post("/disponibilidad", json=inner).status_code == 200
+    wrapping = {**payload, "hora_inicio": "07:30", "hora_fin": "11:00"}
+    assert client.post("/disponibilidad", json=wrapping).status_code == 400
+
+
+def test_interval_index_overlap_queries():
+    from app.repositories.availability import _DayIntervals
+
+    day = _DayIntervals()
+    for av_id, (start, end) in enumerate([(600, 660), (540, 600), (720, 780)], start=1):
+        assert not day.overlaps(start, end)
+        day.add(av_id, start, end)
+    assert day.starts == [540, 600, 720]
+    assert not day.overlaps(660, 720)  # hueco exacto entre franjas
+    assert day.overlaps(659, 661)
+    assert day.overlaps(500, 800)
+    day.remove(1, 600)
+    assert not day.overlaps(600, 660)
+
+    # Las filas fuera de orden (solapamientos heredados) solo bloquean lo que realmente pisan.
+    day = _DayIntervals()
+    day.add(1, 540, 720)
+    day.add(2, 600, 660)
+    assert day.find_overlap(700, 720) == 1
+    assert day.find_overlap(0, 30) is None
+    day.remove(1, 540)
+    assert day.find_overlap(700, 720) is None
+    assert day.find_overlap(630, 700) == 2
+    # Una fila con horas corruptas ocupa el dia entero hasta que se borra.
+    day.block(3)
+    assert day.find_overlap(0, 30) == 3
+    day.remove(3, 0)
+    day.remove(2, 600)
+    assert not day.overlaps(0, 1440)
+
+
+def test_recurring_availability_expands_pattern_and_reports_conflicts(client):
+    existing = {"medico_id": 2, "fecha": "2026-03-04", "hora_inicio": "09:30", "hora_fin": "10:30"}
+    assert client.post("/disponibilidad", json=existing).status_code == 200
+
+    res = client.post(
+        "/disponibilidad/recurrente",
+        json={
+            "medico_id": 2,
+            "fecha_desde": "2026-03-02",  # lunes
+            "fecha_hasta": "2026-03-15",
+            "bloques": [
+                {"dia_semana": 0, "hora_inicio": "08:00", "hora_fin": "12:00"},
+                {"dia_semana": 2, "hora_inicio": "09:00", "hora_fin": "10:00"},
+                {"dia_semana": 2, "hora_inicio": "09:45", "hora_fin": "11:00"},
+            ],
+        },
+    )
+    assert res.status_code == 200
+    data = res.json()
+    # 2 lunes + 2 miercoles x 2 bloques = 6 franjas; el 04/03 chocan ambas con la existente,
+    # y el 11/03 el segundo bloque choca con el primero.
+    assert data["creadas"] == 3
+    motivos = {(c["fecha"], c["hora_inicio"]): c["motivo"] for c in data["conflictos"]}
+    assert set(motivos) == {("2026-03-04", "09:00"), ("2026-03-04", "09:45"), ("2026-03-11", "09:45")}
+    assert "patron" in motivos[("2026-03-11", "09:45")]
+
+    listed = client.get("/disponibilidad", params={"medico_id": 2}).json()
+    fechas = sorted(item["fecha"] for item in listed if item["fecha"].startswith("2026-03"))
+    assert fechas == ["2026-03-02", "2026-03-04", "2026-03-09", "2026-03-11"]
+
+    overlap = {"medico_id": 2, "fecha": "2026-03-09", "hora_inicio": "11:00", "hora_fin": "13:00"}
+    assert client.post("/disponibilidad", json=overlap).status_code == 400
+
+
+def test_recurring_availability_rejects_block_shorter_than_sub_slot(client):
+    res = client.post(
+        "/disponibilidad/recurrente",
+        json={
+            "medico_id": 2,
+            "fecha_desde": "2026-03-02",
+            "fecha_hasta": "2026-03-08",
+            "bloques": [{"dia_semana": 0, "hora_inicio": "09:00", "hora_fin": "09:30", "duracion_turno": 60}],
+        },
+    )
+    assert res.status_code == 400
+    listed = client.get("/disponibilidad", params={"medico_id": 2}).json()
+    assert not [item for item in listed if item["fecha"] == "2026-03-02"]
+
+
+def test_next_free_slots_for_specialty_skip_taken_and_started_sub_slots(client):
+    def crear(medico_id, fecha, inicio, fin, duracion=None):
+        payload = {"medico_id": medico_id, "fecha": fecha, "hora_inicio": inicio, "hora_fin": fin}
+        if duracion:
+            payload["duracion_turno"] = duracion
+        res = client.post("/disponibilidad", json=payload)
+        assert res.status_code == 200
+        return res.json()["id"]
+
+    crear(1, "2030-01-02", "08:00", "09:00")  # Clinica: no entra en cardiologia
+    bloque = crear(3, "2030-01-02", "09:00", "10:30", 30)
+    crear(3, "2030-01-03", "08:00", "09:00")
+    crear(3, "2030-01-04", "08:00", "09:00")
+    paciente = client.post(
+        "/pacientes", json={"nombre": "Eva", "apellido": "Sosa", "dni": "40005050", "mail": "eva@test.com"}
+    ).json()["id"]
+    turno = {"paciente_id": paciente, "medico_id": 3, "disponibilidad_id": bloque, "fecha": "2030-01-02T09:30:00"}
+    assert client.post("/turnos", json=turno).status_code == 200
+
+    res = client.get(
+        "/disponibilidad/proximos",
+        params={"especialidad_id": 3, "desde": "2030-01-02T09:10:00", "limit": 2},
+    )
+    assert res.status_code == 200
+    slots = [(s["fecha"], s["hora_inicio"], s["sub_turno"]) for s in res.json()]
+    # 09:00 ya empezo y 09:30 esta tomado: queda 10:00; despues la franja del dia siguiente.
+    assert slots == [("2030-01-02", "10:00", 2), ("2030-01-03", "08:00", 0)]
+
+    # Con zona horaria se compara en hora local, igual que las fechas guardadas.
+    from datetime import datetime
+
+    aware = datetime(2030, 1, 2, 9, 10).astimezone().isoformat()
+    res = client.get("/disponibilidad/proximos", params={"especialidad_id": 3, "desde": aware, "limit": 2})
+    assert res.status_code == 200
+    assert [(s["fecha"], s["hora_inicio"]) for s in res.json()] == [("2030-01-02", "10:00"), ("2030-01-03", "08:00")]
+
+    from app.db import get_connection
+    from app.repositories import availability
+
+    plan = " ".join(
+        row[3]
+        for row in get_connection().execute(
+            "EXPLAIN QUERY PLAN " + availability.NEXT_SLOTS_QUERY, ("2030-01-01", "00:00", 3)
+        )
+    )
+    assert "idx_disponibilidad_activa_fecha" in plan
+    assert "TEMP B-TREE" not in plan
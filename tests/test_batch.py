@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from app.db import get_connection
+
+
+def _counts():
+    conn = get_connection()
+    return [conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ("pacientes", "turnos", "recetas")]
+
+
+def _patient(dni, nombre, apellido):
+    datos = {"dni": dni, "nombre": nombre, "apellido": apellido, "mail": f"{dni}@test.com"}
+    return {"op": "crear_paciente", "datos": datos}
+
+
+def _slot(client, fecha):
+    res = client.post(
+        "/disponibilidad",
+        json={"medico_id": 1, "fecha": fecha, "hora_inicio": "09:00", "hora_fin": "10:00", "duracion_turno": 30},
+    )
+    assert res.status_code == 200
+    return res.json()["id"]
+
+
+def test_batch_runs_operations_in_order_with_references(client):
+    fecha = (date.today() + timedelta(days=12)).isoformat()
+    slot = _slot(client, fecha)
+    operaciones = [
+        _patient("45000001", "Ines", "Mora"),
+        {
+            "op": "crear_turno",
+            "datos": {"paciente_id": "$0.id", "medico_id": 1, "disponibilidad_id": slot, "fecha": f"{fecha}T09:30:00"},
+        },
+        {"op": "crear_historial", "datos": {"paciente_id": "$0.id", "descripcion": "Alta desde recepcion"}},
+        {"op": "crear_receta", "datos": {"paciente_id": "$0.id", "medico_id": 1, "descripcion": "Ibuprofeno"}},
+        {"op": "cambiar_estado_turno", "datos": {"id": "$1.id", "estado": "completado"}},
+    ]
+    res = client.post("/batch", json={"operaciones": operaciones})
+    assert res.status_code == 200, res.text
+    resultados = res.json()["resultados"]
+    assert [r["op"] for r in resultados] == [op["op"] for op in operaciones]
+    patient_id = resultados[0]["resultado"]["id"]
+    assert resultados[1]["resultado"]["paciente_id"] == patient_id
+    assert resultados[4]["resultado"] == {"id": resultados[1]["resultado"]["id"], "estado": "completado"}
+
+    resumen = client.get(f"/pacientes/{patient_id}/resumen").json()
+    assert [r["descripcion"] for r in resumen["recetas"]] == ["Ibuprofeno"]
+    assert {h["estado"] for h in resumen["historial"]} == {"programado", "completado"}
+
+
+def test_batch_rolls_back_everything_on_failure(client):
+    fecha = (date.today() + timedelta(days=12)).isoformat()
+    slot = _slot(client, fecha)
+    before = _counts()
+    operaciones = [
+        _patient("45000002", "Ana", "Rey"),
+        {
+            "op": "crear_turno",
+            "datos": {"paciente_id": "$0.id", "medico_id": 1, "disponibilidad_id": slot, "fecha": f"{fecha}T09:00:00"},
+        },
+        {
+            "op": "crear_turno",
+            "datos": {"paciente_id": "$0.id", "medico_id": 1, "disponibilidad_id": slot, "fecha": f"{fecha}T09:00:00"},
+        },
+    ]
+    res = client.post("/batch", json={"operaciones": operaciones})
+    assert res.status_code == 400
+    assert res.json()["detail"]["operacion"] == 2
+    assert _counts() == before
+    assert [s["libre"] for s in client.get(f"/disponibilidad/{slot}/subturnos").json()] == [True, True]
+
+    bad_ref = [{"op": "crear_historial", "datos": {"paciente_id": "$3.id", "descripcion": "x"}}]
+    assert client.post("/batch", json={"operaciones": bad_ref}).json()["detail"]["operacion"] == 0
+    unknown = [{"op": "borrar_todo", "datos": {}}]
+    assert client.post("/batch", json={"operaciones": unknown}).status_code == 400
+    invalid = [{"op": "crear_paciente", "datos": {"dni": "1", "nombre": "A", "apellido": "B", "mail": "x"}}]
+    assert isinstance(client.post("/batch", json={"operaciones": invalid}).json()["detail"]["error"], list)
@@ -0,0 +1,51 @@
+def test_bulk_create_patients_reports_conflicts_per_row(client):
+    existing = client.post(
+        "/pacientes", json={"dni": "46000000", "nombre": "Ya", "apellido": "Cargado", "mail": "ya@test.com"}
+    ).json()["id"]
+    filas = [
+        {"dni": "46000001", "nombre": "Lara", "apellido": "Funes", "mail": "lara@test.com"},
+        {"dni": "46000000", "nombre": "Otro", "apellido": "Duplicado", "mail": "dup@test.com"},
+        {"dni": "46000002", "nombre": "Beto", "apellido": "Paz", "mail": "sin-arroba"},
+        {"dni": "46000001", "nombre": "Lara", "apellido": "Repetida", "mail": "lara2@test.com"},
+        {"dni": "46000003", "nombre": "Noe", "apellido": "Vera", "mail": "noe@test.com"},
+    ]
+    res = client.post("/pacientes/lote", json={"filas": filas})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["creados"] == 2
+    assert [e["indice"] for e in body["errores"]] == [1, 2, 3]
+    assert body["errores"][0]["error"] == "DNI ya registrado."
+    assert "mail" in body["errores"][1]["error"]
+    assert body["ids"][1:4] == [None, None, None]
+    assert body["ids"][4] == body["ids"][0] + 1 > existing
+
+    lara = client.get(f"/pacientes/{body['ids'][0]}").json()
+    assert lara["apellido"] == "Funes"
+    assert [p["id"] for p in client.get("/pacientes/buscar", params={"q": "vera"}).json()] == [body["ids"][4]]
+
+
+def test_bulk_create_doctors_and_prescriptions(client):
+    res = client.post(
+        "/medicos/lote",
+        json={
+            "filas": [
+                {"nombre": "Dora", "apellido": "Lima", "especialidad_id": 1, "mail": "dora@test.com"},
+                {"nombre": "Ivo", "apellido": "Sanz", "especialidad_id": 999, "mail": "ivo@test.com"},
+            ]
+        },
+    ).json()
+    assert res["creados"] == 1 and res["errores"] == [{"indice": 1, "error": "Especialidad inexistente."}]
+    doctor = res["ids"][0]
+    assert client.get(f"/medicos/{doctor}").json()["apellido"] == "Lima"
+
+    filas = [
+        {"medico_id": doctor, "paciente_id": 1, "descripcion": "Amoxicilina"},
+        {"medico_id": doctor, "paciente_id": 99999, "descripcion": "Sin paciente"},
+        {"medico_id": 99999, "paciente_id": 1, "descripcion": "Sin medico"},
+        {"medico_id": doctor, "paciente_id": 1},
+    ]
+    res = client.post("/recetas/lote", json={"filas": filas}).json()
+    assert res["creados"] == 1
+    assert [e["indice"] for e in res["errores"]] == [1, 2, 3]
+    assert client.get(f"/recetas/{res['ids'][0]}").json()["descripcion"] == "Amoxicilina"
+    assert client.post("/recetas/lote", json={"filas": []}).status_code == 422
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from app.db import get_connection
+from app.repositories import changes
+
+
+def test_change_feed_returns_only_deltas_in_order(client):
+    start = client.get("/cambios", params={"desde": 0, "limit": 5000}).json()
+    assert not start["hay_mas"] and start["hasta"] > 0
+    cursor = start["hasta"]
+
+    patient = client.post(
+        "/pacientes", json={"dni": "48000001", "nombre": "Olga", "apellido": "Mena", "mail": "olga@test.com"}
+    ).json()["id"]
+    updated = {"dni": "48000001", "nombre": "Olga", "apellido": "Mena", "mail": "o@test.com"}
+    client.put(f"/pacientes/{patient}", json=updated)
+    receta = {"medico_id": 1, "paciente_id": patient, "descripcion": "Jarabe"}
+    receta = client.post("/recetas", json=receta).json()["id"]
+    client.delete(f"/pacientes/{patient}")
+
+    feed = client.get("/cambios", params={"desde": cursor}).json()
+    observed = [(c["tabla"], c["fila_id"], c["operacion"]) for c in feed["cambios"]]
+    assert observed == [
+        ("pacientes", patient, "alta"),
+        ("pacientes", patient, "modificacion"),
+        ("recetas", receta, "alta"),
+        ("recetas", receta, "baja"),
+        ("pacientes", patient, "baja"),
+    ]
+    assert [c["seq"] for c in feed["cambios"]] == sorted(c["seq"] for c in feed["cambios"])
+    assert feed["hasta"] == feed["cambios"][-1]["seq"] and not feed["hay_mas"]
+
+    page = client.get("/cambios", params={"desde": cursor, "limit": 2}).json()
+    assert page["hay_mas"] and page["hasta"] == feed["cambios"][1]["seq"]
+    only_recetas = client.get("/cambios", params={"desde": cursor, "tabla": "recetas"}).json()
+    assert [c["operacion"] for c in only_recetas["cambios"]] == ["alta", "baja"]
+    assert only_recetas["hasta"] == feed["hasta"]
+    assert client.get("/cambios", params={"desde": feed["hasta"]}).json()["cambios"] == []
+    assert client.get("/cambios", params={"tabla": "admins"}).status_code == 400
+
+
+def test_change_feed_reports_pruned_ranges(client):
+    conn = get_connection()
+    last = client.get("/cambios", params={"desde": 0, "limit": 5000}).json()["hasta"]
+    assert changes.prune(conn, datetime.utcnow() + timedelta(days=1)) > 0
+    assert client.get("/cambios", params={"desde": 0}).status_code == 410
+    feed = client.get("/cambios", params={"desde": last}).json()
+    assert feed == {"cambios": [], "hasta": last, "hay_mas": False}
+
+    sql = "EXPLAIN QUERY PLAN SELECT * FROM cambios WHERE seq > ? ORDER BY seq"
+    plan = " ".join(row[3] for row in conn.execute(sql, (0,)))
+    assert "INTEGER PRIMARY KEY" in plan and "TEMP B-TREE" not in plan
@@ -0,0 +1,110 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.db import Database, DatabaseExecutor, transaction
+
+
+def test_executor_threads_are_bounded_and_keep_their_connection():
+    executor = DatabaseExecutor(Database().db_path, size=2)
+    seen = []
+
+    def work(conn, i):
+        seen.append((threading.get_ident(), id(conn)))
+        time.sleep(0.01)
+        return conn.execute("SELECT ?", (i,)).fetchone()[0]
+
+    async def scenario():
+        return await asyncio.gather(*(executor.run(work, i) for i in range(20)))
+
+    try:
+        assert asyncio.run(scenario()) == list(range(20))
+    finally:
+        executor.shutdown()
+    threads = {thread: set() for thread, _ in seen}
+    for thread, conn in seen:
+        threads[thread].add(conn)
+    assert len(threads) == 2
+    assert all(len(conns) == 1 for conns in threads.values())
+    assert executor._connections == []
+
+
+def test_executor_stream_runs_generator_on_one_connection():
+    executor = DatabaseExecutor(Database().db_path, size=3)
+    closed = threading.Event()
+
+    def numbers(conn, n):
+        try:
+            for i in range(n):
+                yield (i, id(conn))
+            raise ValueError("fin")
+        finally:
+            closed.set()
+
+    async def scenario():
+        items = []
+        with pytest.raises(ValueError, match="fin"):
+            async for item in executor.stream(numbers, 5):
+                items.append(item)
+        return items
+
+    try:
+        items = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert [i for i, _ in items] == list(range(5))
+    assert len({conn for _, conn in items}) == 1
+    assert closed.is_set()
+
+
+def test_routes_use_pool_connections(client):
+    res = client.post(
+        "/pacientes", json={"dni": "49000001", "nombre": "Ines", "apellido": "Roca", "mail": "ines@test.com"}
+    )
+    assert res.status_code == 200
+    executor = Database().executor()
+    assert 1 <= len(executor._connections) <= executor.size
+    assert Database().connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    # Las claves foraneas valen tambien en las conexiones del pool.
+    entry = {"paciente_id": 9999, "medico_id": 1, "fecha_desde": "2030-01-01", "fecha_hasta": "2030-01-31"}
+    assert client.post("/lista-espera", json=entry).status_code == 400
+
+
+def test_failed_write_does_not_leave_the_pool_connection_in_a_transaction(client):
+    paciente = {"dni": "49000002", "nombre": "Ines", "apellido": "Roca", "mail": "ines2@test.com"}
+    assert client.post("/pacientes", json=paciente).status_code == 200
+    assert client.post("/pacientes", json=paciente).status_code == 400
+    assert all(not conn.in_transaction for conn in Database().executor()._connections)
+
+    otro = {"dni": "49000003", "nombre": "Ana", "apellido": "Paz", "mail": "ana3@test.com"}
+    res = client.post("/pacientes", json=otro)
+    assert res.status_code == 200
+    reader = sqlite3.connect(Database().db_path)
+    try:
+        row = reader.execute("SELECT dni FROM pacientes WHERE id = ?", (res.json()["id"],)).fetchone()
+    finally:
+        reader.close()
+    assert row == ("49000003",)
+
+
+def test_transaction_discards_a_stray_implicit_transaction():
+    conn = sqlite3.connect(Database().db_path)
+    try:
+        conn.execute("INSERT INTO especialidades (nombre) VALUES ('Guardia')")
+        conn.commit()
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO especialidades (nombre) VALUES ('Guardia')")
+        assert conn.in_transaction
+        with transaction(conn):
+            conn.execute("INSERT INTO especialidades (nombre) VALUES ('Triage')")
+        assert not conn.in_transaction
+    finally:
+        conn.close()
+    reader = sqlite3.connect(Database().db_path)
+    try:
+        assert reader.execute("SELECT COUNT(*) FROM especialidades WHERE nombre = 'Triage'").fetchone() == (1,)
+    finally:
+        reader.close()
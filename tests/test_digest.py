@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from app.db import get_connection
+from app.services.digest import AgendaDigestJob
+from app.services.email_client import EmailClient
+from app.services.smtp_sink import SmtpSink
+
+
+def _book(client, medico_id: int, fecha: str, start: str, end: str, paciente_id: int) -> None:
+    res = client.post(
+        "/disponibilidad",
+        json={"medico_id": medico_id, "fecha": fecha, "hora_inicio": start, "hora_fin": end},
+    )
+    assert res.status_code == 200
+    res = client.post(
+        "/turnos",
+        json={
+            "paciente_id": paciente_id,
+            "medico_id": medico_id,
+            "disponibilidad_id": res.json()["id"],
+            "fecha": fecha,
+            "motivo_consulta": "Control",
+        },
+    )
+    assert res.status_code == 200
+
+
+def test_agenda_digest_sends_one_mail_per_recipient_in_one_connection(client):
+    target = date.today() + timedelta(days=1)
+    fecha = target.isoformat()
+    _book(client, 1, fecha, "09:00", "09:30", paciente_id=1)
+    _book(client, 1, fecha, "10:00", "10:30", paciente_id=2)
+    _book(client, 1, fecha, "11:00", "11:30", paciente_id=1)
+    _book(client, 2, fecha, "09:00", "10:00", paciente_id=3)
+
+    with SmtpSink() as sink:
+        email_client = EmailClient(smtp_server=sink.host, smtp_port=sink.port, dry_run=False, use_ssl=False)
+        sent = AgendaDigestJob(email_client, get_connection, include_patients=True).run(target)
+
+    assert sent == 5  # 2 medicos + 3 pacientes
+    assert sink.connections == 1
+    doctor_mail = next(m for m in sink.messages if m.recipients == ["mariana.suarez@mediflow.com"])
+    body = doctor_mail.parsed().get_content()
+    assert "(3 turnos)" in body
+    assert body.index("09:00") < body.index("10:00") < body.index("11:00")
+    patient_mail = next(m for m in sink.messages if m.recipients == ["ana@mediflow.test"])
+    assert patient_mail.parsed().get_content().count("Suarez") == 2
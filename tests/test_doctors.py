@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+
+def test_doctor_agenda_merges_blocks_with_bookings_and_supports_etag(client):
+    fecha = (date.today() + timedelta(days=15)).isoformat()
+    for inicio, fin in (("14:00", "15:00"), ("09:00", "10:00")):
+        res = client.post(
+            "/disponibilidad",
+            json={"medico_id": 2, "fecha": fecha, "hora_inicio": inicio, "hora_fin": fin, "duracion_turno": 30},
+        )
+        assert res.status_code == 200
+    morning = client.get("/disponibilidad", params={"medico_id": 2}).json()
+    morning_id = next(s["id"] for s in morning if s["fecha"] == fecha and s["hora_inicio"] == "09:00")
+    patient = client.post(
+        "/pacientes", json={"dni": "60000001", "nombre": "Rosa", "apellido": "Vega", "mail": "rosa@test.com"}
+    ).json()["id"]
+
+    res = client.get("/medicos/2/agenda", params={"fecha": fecha})
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+    assert [b["hora_inicio"] for b in res.json()["bloques"]] == ["09:00", "14:00"]
+    assert all(b["turnos"] == [] for b in res.json()["bloques"])
+    assert client.get("/medicos/2/agenda", params={"fecha": fecha}, headers={"If-None-Match": etag}).status_code == 304
+
+    turno = {"paciente_id": patient, "medico_id": 2, "disponibilidad_id": morning_id, "fecha": f"{fecha}T09:30:00"}
+    assert client.post("/turnos", json=turno).status_code == 200
+
+    res = client.get("/medicos/2/agenda", params={"fecha": fecha}, headers={"If-None-Match": etag})
+    assert res.status_code == 200 and res.headers["ETag"] != etag
+    booked = res.json()["bloques"][0]["turnos"]
+    assert [(t["sub_turno"], t["paciente_apellido"]) for t in booked] == [(1, "Vega")]
+
+    assert client.get("/medicos/999/agenda", params={"fecha": fecha}).status_code == 404
+
+
+def test_search_doctors_by_prefix_and_fuzzy(client):
+    doctor = client.get("/medicos").json()[0]
+    res = client.get("/medicos/buscar", params={"q": doctor["apellido"][:3]})
+    assert res.status_code == 200
+    assert doctor["id"] in [d["id"] for d in res.json()]
+
+    typo = doctor["apellido"][:-1] + ("x" if doctor["apellido"][-1] != "x" else "y")
+    assert doctor["id"] not in [d["id"] for d in client.get("/medicos/buscar", params={"q": typo}).json()]
+    hits = client.get("/medicos/buscar", params={"q": typo, "fuzzy": True}).json()
+    assert hits[0]["id"] == doctor["id"] and 0.3 <= hits[0]["similitud"] < 1
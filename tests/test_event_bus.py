@@ -0,0 +1,75 @@
+import threading
+
+from app.observers.base import Observer
+from app.observers.bus import EventBus
+from app.observers.events import AppointmentStatusChanged, PrescriptionIssued
+
+
+def _status_event(turno_id: int = 1) -> AppointmentStatusChanged:
+    return AppointmentStatusChanged(
+        turno_id=turno_id,
+        paciente_id=1,
+        medico_id=1,
+        disponibilidad_id=None,
+        estado_anterior="programado",
+        estado="cancelado",
+    )
+
+
+class Collector(Observer):
+    def __init__(self) -> None:
+        self.events = []
+
+    def update(self, data) -> None:
+        self.events.append(data)
+
+
+def test_sync_bus_dispatches_by_event_type_and_isolates_failures():
+    bus = EventBus(workers=0)
+    collector = Collector()
+
+    def broken(event):
+        raise RuntimeError("falla")
+
+    bus.subscribe(AppointmentStatusChanged, broken)
+    bus.subscribe(AppointmentStatusChanged, collector)
+    bus.subscribe(AppointmentStatusChanged, collector)  # registro idempotente
+
+    bus.publish(_status_event())
+    assert len(collector.events) == 1
+
+    bus.unsubscribe(AppointmentStatusChanged, collector)
+    bus.publish(_status_event(2))
+    assert len(collector.events) == 1
+
+
+def test_worker_bus_does_not_block_publisher():
+    bus = EventBus(workers=2)
+    release = threading.Event()
+    received = []
+
+    def slow(event):
+        release.wait(timeout=5)
+        received.append(event.turno_id)
+
+    bus.subscribe(AppointmentStatusChanged, slow)
+    bus.publish(_status_event(7))
+    assert received == []
+    release.set()
+    bus.shutdown()
+    assert received == [7]
+
+
+def test_prescription_endpoint_publishes_event(client):
+    from app.main import event_bus
+
+    collector = Collector()
+    event_bus.subscribe(PrescriptionIssued, collector)
+    try:
+        res = client.post("/recetas", json={"medico_id": 1, "paciente_id": 1, "descripcion": "Paracetamol"})
+    finally:
+        event_bus.unsubscribe(PrescriptionIssued, collector)
+    assert res.status_code == 200
+    [event] = collector.events
+    assert event.receta_id == res.json()["id"]
+    assert event.paciente_mail == "ana@mediflow.test"
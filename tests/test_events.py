@@ -0,0 +1,91 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+from app.observers.broadcast import AvailabilityChanged, Broadcaster, broadcaster
+from app.routes.events import stream_events
+
+
+async def _connected() -> bool:
+    return False
+
+
+def _parse(frame: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    return {"event": fields["event"], **json.loads(fields["data"])}
+
+
+def test_stream_pushes_availability_changes_for_one_doctor(client):
+    fecha = (date.today() + timedelta(days=12)).isoformat()
+
+    async def scenario():
+        stream = stream_events(broadcaster, _connected, medico_id=1, keepalive=5)
+        assert (await stream.__anext__()).startswith("retry:")
+        # La escritura corre en otro hilo, como en el servidor.
+        block = {"fecha": fecha, "hora_inicio": "08:00", "hora_fin": "09:00", "duracion_turno": 30}
+        other = await asyncio.to_thread(client.post, "/disponibilidad", json={**block, "medico_id": 2})
+        created = await asyncio.to_thread(client.post, "/disponibilidad", json={**block, "medico_id": 1})
+        availability_id = created.json()["id"]
+        turno = {"paciente_id": 1, "medico_id": 1, "disponibilidad_id": availability_id, "fecha": f"{fecha}T08:30:00"}
+        turno_id = (await asyncio.to_thread(client.post, "/turnos", json=turno)).json()["id"]
+        await asyncio.to_thread(client.put, f"/turnos/{turno_id}/estado", json={"estado": "cancelado"})
+        await asyncio.to_thread(client.delete, f"/disponibilidad/{availability_id}")
+        frames = [_parse(await asyncio.wait_for(stream.__anext__(), 5)) for _ in range(4)]
+        await stream.aclose()
+        assert other.status_code == 200 and not broadcaster.active
+        return availability_id, frames
+
+    availability_id, frames = asyncio.run(scenario())
+    assert [(f["tipo"], f["medico_id"], f["disponibilidad_id"]) for f in frames] == [
+        ("creada", 1, availability_id),
+        ("reservada", 1, availability_id),
+        ("liberada", 1, availability_id),
+        ("eliminada", 1, availability_id),
+    ]
+    assert all(f["event"] == "disponibilidad" and f["fecha"] == fecha for f in frames)
+    assert frames[1]["sub_turno"] == frames[2]["sub_turno"] == 1
+
+
+def test_slow_subscriber_gets_resync_and_keepalive():
+    source = Broadcaster(queue_size=2)
+
+    async def scenario():
+        stream = stream_events(source, _connected, especialidad_id=3, keepalive=0.05)
+        await stream.__anext__()
+        for medico_id in range(1, 6):
+            source.publish(AvailabilityChanged("creada", medico_id, 3, "2030-01-01"))
+        source.publish(AvailabilityChanged("creada", 9, 4, "2030-01-01"))
+        await asyncio.sleep(0)
+        frames = [await stream.__anext__() for _ in range(4)]
+        await stream.aclose()
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert [f.split("\n")[1] for f in frames[:3]] == ["event: disponibilidad", "event: disponibilidad", "event: resync"]
+    assert frames[3] == ": ping\n\n"
+    assert not source.active
+
+
+def test_batch_only_announces_bookings_after_commit(client):
+    fecha = (date.today() + timedelta(days=13)).isoformat()
+    block = {"medico_id": 1, "fecha": fecha, "hora_inicio": "09:00", "hora_fin": "10:00", "duracion_turno": 30}
+    slot = client.post("/disponibilidad", json=block).json()["id"]
+    turno = {"paciente_id": 1, "medico_id": 1, "disponibilidad_id": slot, "fecha": f"{fecha}T09:00:00"}
+
+    async def scenario():
+        subscription = broadcaster.subscribe(medico_id=1)
+        try:
+            failing = [{"op": "crear_turno", "datos": turno}, {"op": "crear_receta", "datos": {"paciente_id": 9999}}]
+            res = await asyncio.to_thread(client.post, "/batch", json={"operaciones": failing})
+            assert res.status_code == 400
+            await asyncio.sleep(0.05)
+            assert subscription.queue.empty()
+            res = await asyncio.to_thread(client.post, "/batch", json={"operaciones": failing[:1]})
+            assert res.status_code == 200
+            _, event = await asyncio.wait_for(subscription.queue.get(), 5)
+            return event
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    event = asyncio.run(scenario())
+    assert (event.tipo, event.disponibilidad_id, event.sub_turno) == ("reservada", slot, 0)
@@ -68,3 +68,108 @@ def test_history_tracks_appointment_creation_and_updates(client):
     assert res_hist_after.status_code == 200
     updated_entry = next(item for item in res_hist_after.json() if item["turno_id"] == turno_id)
     assert updated_entry["estado"] == "completado"
+    assert len([item for item in res_hist_after.json() if item["turno_id"] == turno_id]) == 1
+
+
+def test_history_allows_one_record_per_appointment(client):
+    base_date = (_next_weekday(datetime.now(), 2) + timedelta(days=28)).date()
+    availability_id = _create_availability(client, 2, base_date.isoformat())
+    patient_id = _create_patient(client)
+    turno_id = client.post(
+        "/turnos",
+        json={"paciente_id": patient_id, "medico_id": 2, "disponibilidad_id": availability_id, "fecha": base_date.isoformat()},
+    ).json()["id"]
+
+    res = client.post("/historial", json={"paciente_id": patient_id, "turno_id": turno_id, "descripcion": "Duplicado"})
+    assert res.status_code == 400
+    assert "historial" in res.json()["detail"]
+    # Sin turno asociado se pueden cargar todas las notas que hagan falta.
+    for _ in range(2):
+        assert client.post("/historial", json={"paciente_id": patient_id, "descripcion": "Nota"}).status_code == 200
+
+
+def test_history_keeps_doctor_names_in_sync_and_reads_by_index(client):
+    base_date = (_next_weekday(datetime.now(), 3) + timedelta(days=28)).date()
+    availability_id = _create_availability(client, 3, base_date.isoformat())
+    patient_id = _create_patient(client)
+    turno_id = client.post(
+        "/turnos",
+        json={"paciente_id": patient_id, "medico_id": 3, "disponibilidad_id": availability_id, "fecha": base_date.isoformat()},
+    ).json()["id"]
+    note = client.post(
+        "/historial", json={"paciente_id": patient_id, "descripcion": "Nota sin turno", "fecha_turno": "2020-01-01T10:00:00"}
+    ).json()["id"]
+
+    doctor = client.get("/medicos/3").json()
+    res = client.put("/medicos/3", json={**doctor, "apellido": "Gimenezz"})
+    assert res.status_code == 200
+    assert client.put(f"/especialidades/{doctor['especialidad_id']}", json={"nombre": "Cardio"}).status_code == 200
+
+    historial = client.get(f"/pacientes/{patient_id}/historial").json()
+    assert [h["id"] for h in historial][-1] == note  # la fecha mas antigua queda al final
+    entry = next(h for h in historial if h["turno_id"] == turno_id)
+    assert (entry["medico_id"], entry["medico_apellido"], entry["especialidad"]) == (3, "Gimenezz", "Cardio")
+
+    from app.db import get_connection
+
+    plan = " ".join(
+        row[3]
+        for row in get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM historial_clinico WHERE paciente_id = ? ORDER BY fecha_turno DESC, id DESC",
+            (patient_id,),
+        )
+    )
+    assert "idx_historial_paciente_fecha" in plan and "TEMP B-TREE" not in plan
+
+
+def test_history_full_text_search_with_snippets_and_pagination(client):
+    patient_id = _create_patient(client)
+    other = client.post(
+        "/pacientes", json={"dni": "50999888", "nombre": "Otro", "apellido": "Paciente", "mail": "otro@test.com"}
+    ).json()["id"]
+    notes = [
+        (patient_id, "Control anual. Hipertensión arterial controlada con dieta."),
+        (patient_id, "Cefalea tensional, se indica reposo."),
+        (other, "Hipertension leve, repetir control en un mes."),
+    ]
+    ids = [client.post("/historial", json={"paciente_id": p, "descripcion": d}).json()["id"] for p, d in notes]
+
+    res = client.get("/historial/buscar", params={"q": "hipertens"})
+    assert res.status_code == 200
+    hits = [hit for hit in res.json() if hit["id"] in ids]  # el seed tambien trae notas de hipertension
+    assert {hit["id"] for hit in hits} == {ids[0], ids[2]}
+    assert all("<mark>" in hit["fragmento"] for hit in hits)
+
+    own = client.get("/historial/buscar", params={"q": "hipertension", "paciente_id": patient_id}).json()
+    assert [hit["id"] for hit in own] == [ids[0]]
+
+    first = client.get("/historial/buscar", params={"q": "control", "paciente_id": other, "limit": 1}).json()
+    second = client.get("/historial/buscar", params={"q": "control", "limit": 1, "offset": 1}).json()
+    assert len(first) == len(second) == 1 and first[0]["id"] != second[0]["id"]
+
+    from app.db import get_connection
+    from app.repositories import fts
+
+    conn = get_connection()
+    conn.execute("UPDATE historial_clinico SET descripcion = 'Migraña' WHERE id = ?", (ids[1],))
+    conn.commit()
+    fts.rebuild(conn, "historial_fts")
+    assert [hit["id"] for hit in client.get("/historial/buscar", params={"q": "migrana"}).json()] == [ids[1]]
+    assert client.get("/historial/buscar", params={"q": "cefalea"}).json() == []
+
+    nota = "Refiere <script>alert(1)</script> dolor & fiebre"
+    record = client.post("/historial", json={"paciente_id": other, "descripcion": nota}).json()["id"]
+    hit = next(h for h in client.get("/historial/buscar", params={"q": "fiebre"}).json() if h["id"] == record)
+    assert "<script>" not in hit["fragmento"]
+    assert "&lt;script&gt;" in hit["fragmento"] and "&amp;" in hit["fragmento"]
+    assert "<mark>fiebre</mark>" in hit["fragmento"]
+
+    # Sin FTS5 la busqueda cae a LIKE en vez de fallar.
+    fts.set_available(conn, "historial_fts", False)
+    try:
+        res = client.get("/historial/buscar", params={"q": "fiebre", "paciente_id": other})
+        assert res.status_code == 200
+        assert [h["id"] for h in res.json()] == [record]
+        assert "<mark>fiebre</mark>" in res.json()[0]["fragmento"] and "<script>" not in res.json()[0]["fragmento"]
+    finally:
+        fts.set_available(conn, "historial_fts", True)
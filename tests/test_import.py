@@ -0,0 +1,84 @@
+import json
+from datetime import date, timedelta
+
+PACIENTES_CSV = """\ufeffdni,nombre,apellido,mail,extra
+47000001,Rita,Ocampo,rita@test.com,x
+47000002,Saul,Ibarra,saul@test.com,
+47000003,Tea,,tea@test.com,
+47000001,Rita,Ocampos,rita@nuevo.com,
+47000004,Uma,Leiva,sin-arroba,
+"""
+
+
+def _progress(res):
+    assert res.status_code == 200, res.text
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in res.text.splitlines()]
+
+
+def test_import_patients_csv_in_chunks_with_upsert(client):
+    existing = client.post(
+        "/pacientes", json={"dni": "47000002", "nombre": "Viejo", "apellido": "Nombre", "mail": "v@test.com"}
+    ).json()["id"]
+    res = client.post(
+        "/importar/pacientes",
+        params={"lote": 2},
+        content=PACIENTES_CSV.encode("utf-8"),
+        headers={"Content-Type": "text/csv"},
+    )
+    steps = _progress(res)
+    assert [step["filas"] for step in steps] == [2, 4, 5]
+    final = steps[-1]
+    assert (final["insertadas"], final["actualizadas"], final["rechazadas"]) == (1, 2, 2)
+    assert [e["indice"] for step in steps for e in step["errores"]] == [4, 6]
+
+    assert client.get(f"/pacientes/{existing}").json()["apellido"] == "Ibarra"
+    rita = client.get("/pacientes/buscar", params={"q": "47000001"}).json()
+    assert [(p["apellido"], p["mail"]) for p in rita] == [("Ocampos", "rita@nuevo.com")]
+
+    res = client.post("/importar/pacientes", content=b"dni,nombre\n1,A\n", headers={"Content-Type": "text/csv"})
+    assert res.status_code == 400 and "apellido" in res.json()["detail"]
+    assert client.post("/importar/turnos", content=b"a\n").status_code == 404
+
+
+def test_import_availability_csv(client):
+    fecha = (date.today() + timedelta(days=40)).isoformat()
+    body = "\n".join(
+        [
+            "medico_id,fecha,hora_inicio,hora_fin,duracion_turno",
+            f"1,{fecha},09:00,10:00,30",
+            f"1,{fecha},09:30,11:00,",
+            f"999,{fecha},09:00,10:00,",
+            f"2,{fecha},08:00,20:00,5",
+            f"2,{fecha},21:00,22:00,",
+        ]
+    )
+    steps = _progress(client.post("/importar/disponibilidad", content=body.encode()))
+    assert len(steps) == 1
+    assert (steps[0]["insertadas"], steps[0]["rechazadas"]) == (2, 3)
+    assert [e["indice"] for e in steps[0]["errores"]] == [3, 4, 5]
+
+    again = f"medico_id,fecha,hora_inicio,hora_fin,duracion_turno\n1,{fecha},09:00,10:00,20\n"
+    steps = _progress(client.post("/importar/disponibilidad", content=again.encode()))
+    assert (steps[0]["insertadas"], steps[0]["actualizadas"]) == (0, 1)
+    slot = next(s for s in client.get("/disponibilidad", params={"medico_id": 1}).json() if s["fecha"] == fecha)
+    assert slot["duracion_turno"] == 20
+    assert len(client.get(f"/disponibilidad/{slot['id']}/subturnos").json()) == 3
+
+    # La importacion mantiene el indice de solapamientos en vez de descartarlo.
+    from app.db import get_connection
+    from app.repositories import availability
+
+    index = availability.get_index(get_connection())
+    other_day = (3, (date.today() + timedelta(days=41)).isoformat())
+    index.overlaps(get_connection(), *other_day, 0, 1)
+    nuevo = f"medico_id,fecha,hora_inicio,hora_fin,duracion_turno\n1,{fecha},14:00,15:00,\n"
+    assert _progress(client.post("/importar/disponibilidad", content=nuevo.encode()))[0]["insertadas"] == 1
+    assert other_day in index._days and index.overlaps(get_connection(), 1, fecha, 14 * 60 + 30, 14 * 60 + 45)
+    solapada = {"medico_id": 1, "fecha": fecha, "hora_inicio": "14:30", "hora_fin": "16:00"}
+    assert client.post("/disponibilidad", json=solapada).status_code == 400
+
+    from app.db import Database
+
+    # La importacion corre en su propio pool y no ocupa hilos del general.
+    assert len(Database().executor("importaciones")._connections) == 1
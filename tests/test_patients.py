@@ -14,3 +14,205 @@ def test_create_and_get_patient(client):
     data = res_get.json()
     assert data["dni"] == payload["dni"]
     assert data["nombre"] == payload["nombre"]
+
+
+def test_search_patients_by_prefix_with_ranking_and_sync(client):
+    def crear(dni, nombre, apellido, mail):
+        res = client.post("/pacientes", json={"dni": dni, "nombre": nombre, "apellido": apellido, "mail": mail})
+        assert res.status_code == 200
+        return res.json()["id"]
+
+    gonzalez = crear("41000001", "Pedro", "Gonzalez", "pedro@test.com")
+    gonzalo = crear("41000002", "Gonzalo", "Paz", "gpaz@test.com")
+    crear("41000003", "Julia", "Benitez", "julia@test.com")
+
+    res = client.get("/pacientes/buscar", params={"q": "gonz"})
+    assert res.status_code == 200
+    # Coincidir en apellido pesa mas que en nombre.
+    assert [p["id"] for p in res.json()] == [gonzalez, gonzalo]
+    assert [p["id"] for p in client.get("/pacientes/buscar", params={"q": "pedro gonz"}).json()] == [gonzalez]
+    assert len(client.get("/pacientes/buscar", params={"q": "4100000"}).json()) == 3
+    assert len(client.get("/pacientes/buscar", params={"q": "4100000", "limit": 2}).json()) == 2
+    assert client.get("/pacientes/buscar", params={"q": '"gonz* OR ('}).status_code == 200
+
+    client.put(
+        f"/pacientes/{gonzalez}",
+        json={"dni": "41000001", "nombre": "Pedro", "apellido": "Alvarez", "mail": "pedro@test.com"},
+    )
+    client.delete(f"/pacientes/{gonzalo}")
+    assert client.get("/pacientes/buscar", params={"q": "gonz"}).json() == []
+    assert [p["id"] for p in client.get("/pacientes/buscar", params={"q": "alvar"}).json()] == [gonzalez]
+
+    # Sin FTS5 (detectado por init_db) la busqueda cae a LIKE por prefijo.
+    from app.db import get_connection
+    from app.repositories import fts
+
+    fts.set_available(get_connection(), "pacientes_fts", False)
+    try:
+        assert [p["id"] for p in client.get("/pacientes/buscar", params={"q": "alvar"}).json()] == [gonzalez]
+        hits = client.get("/pacientes/buscar", params={"q": "alvares", "fuzzy": True}).json()
+        assert [p["id"] for p in hits] == [gonzalez]
+    finally:
+        fts.set_available(get_connection(), "pacientes_fts", True)
+
+
+def test_fuzzy_search_patients_tolerates_typos(client):
+    def crear(dni, nombre, apellido):
+        res = client.post(
+            "/pacientes", json={"dni": dni, "nombre": nombre, "apellido": apellido, "mail": f"{dni}@test.com"}
+        )
+        assert res.status_code == 200
+        return res.json()["id"]
+
+    gimenez = crear("42000001", "Monica", "Gimenez")
+    jimenez = crear("42000002", "Raul", "Jimenez")
+
+    assert client.get("/pacientes/buscar", params={"q": "gimenes"}).json() == []
+    hits = client.get("/pacientes/buscar", params={"q": "gimenes", "fuzzy": True}).json()
+    assert gimenez in [p["id"] for p in hits] and jimenez not in [p["id"] for p in hits]
+    assert all(0.3 <= p["similitud"] < 1 for p in hits)
+
+    hits = client.get("/pacientes/buscar", params={"q": "gimenes", "fuzzy": True, "umbral": 0.2}).json()
+    ids = [p["id"] for p in hits]
+    assert ids.index(gimenez) < ids.index(jimenez)
+    ids = [p["id"] for p in client.get("/pacientes/buscar", params={"q": "monica gimenes", "fuzzy": True}).json()]
+    assert ids == [gimenez]
+
+    client.put(
+        f"/pacientes/{jimenez}",
+        json={"dni": "42000002", "nombre": "Raul", "apellido": "Gimenex", "mail": "42000002@test.com"},
+    )
+    ids = [p["id"] for p in client.get("/pacientes/buscar", params={"q": "gimenes", "fuzzy": True}).json()]
+    assert gimenez in ids and jimenez in ids
+
+
+def test_patient_appointments_upcoming_and_past_use_patient_indexes(client):
+    from datetime import date, timedelta
+
+    from app.db import get_connection
+    from app.repositories import appointments
+
+    patient = client.post(
+        "/pacientes", json={"dni": "43000001", "nombre": "Elena", "apellido": "Quiroga", "mail": "elena@test.com"}
+    ).json()["id"]
+    fecha = (date.today() + timedelta(days=20)).isoformat()
+    client.post(
+        "/disponibilidad",
+        json={"medico_id": 1, "fecha": fecha, "hora_inicio": "09:00", "hora_fin": "10:00", "duracion_turno": 20},
+    )
+    slot = next(s for s in client.get("/disponibilidad", params={"medico_id": 1}).json() if s["fecha"] == fecha)
+    for hora in ("09:40", "09:00", "09:20"):
+        turno = {"paciente_id": patient, "medico_id": 1, "disponibilidad_id": slot["id"], "fecha": f"{fecha}T{hora}:00"}
+        assert client.post("/turnos", json=turno).status_code == 200
+    conn = get_connection()
+    for dias in (3, 30):
+        conn.execute(
+            "INSERT INTO turnos (paciente_id, medico_id, fecha, estado, duracion) VALUES (?, 1, ?, 'completado', 20)",
+            (patient, f"{date.today() - timedelta(days=dias)} 10:00:00"),
+        )
+    conn.commit()
+
+    res = client.get(f"/pacientes/{patient}/turnos")
+    assert res.status_code == 200
+    assert [t["fecha"][11:16] for t in res.json()] == ["09:00", "09:20", "09:40"]
+    assert res.json()[0]["especialidad"] and res.json()[0]["medico_apellido"]
+    page = client.get(f"/pacientes/{patient}/turnos", params={"limit": 2, "offset": 1}).json()
+    assert [t["fecha"][11:16] for t in page] == ["09:20", "09:40"]
+    past = client.get(f"/pacientes/{patient}/turnos", params={"cuando": "pasados"}).json()
+    assert [t["fecha"][:10] for t in past] == [
+        (date.today() - timedelta(days=3)).isoformat(),
+        (date.today() - timedelta(days=30)).isoformat(),
+    ]
+    assert client.get("/pacientes/9999/turnos").status_code == 404
+    assert client.get(f"/pacientes/{patient}/turnos", params={"cuando": "todos"}).status_code == 422
+
+    queries = {
+        appointments.PATIENT_UPCOMING_QUERY: "idx_turnos_paciente_fecha",
+        appointments.PATIENT_PAST_QUERY: "idx_turnos_paciente_fecha",
+        "SELECT r.* FROM recetas r JOIN medicos m ON r.medico_id = m.id WHERE r.paciente_id = ?1 ORDER BY r.id DESC": (
+            "idx_recetas_paciente"
+        ),
+        "DELETE FROM lista_espera WHERE paciente_id = ?1": "idx_lista_espera_paciente",
+    }
+    for sql, index in queries.items():
+        params = (patient, "2030-01-01 00:00:00", 20, 0, True)[: sql.count("?")]
+        steps = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        assert any(index in step for step in steps), steps
+        assert not any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in steps), steps
+
+
+def test_patient_summary_reads_a_single_snapshot(client):
+    import sqlite3
+
+    from app.db import get_connection, read_snapshot
+
+    patient = client.post(
+        "/pacientes", json={"dni": "44000001", "nombre": "Hugo", "apellido": "Salas", "mail": "hugo@test.com"}
+    ).json()["id"]
+    for i in range(3):
+        receta = {"medico_id": 1, "paciente_id": patient, "descripcion": f"Receta {i}"}
+        assert client.post("/recetas", json=receta).status_code == 200
+        assert client.post("/historial", json={"paciente_id": patient, "descripcion": f"Nota {i}"}).status_code == 200
+
+    res = client.get(f"/pacientes/{patient}/resumen", params={"limit": 2})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["paciente"]["dni"] == "44000001"
+    assert body["proximos_turnos"] == []
+    assert [r["descripcion"] for r in body["recetas"]] == ["Receta 2", "Receta 1"]
+    assert body["recetas"][0]["medico_apellido"]
+    assert len(body["historial"]) == 2
+    assert client.get("/pacientes/9999/resumen").status_code == 404
+
+    # Los turnos cancelados no figuran como proximos en el resumen (si en /turnos).
+    from datetime import date, timedelta
+
+    fecha = (date.today() + timedelta(days=9)).isoformat()
+    bloque = {"medico_id": 1, "fecha": fecha, "hora_inicio": "10:00", "hora_fin": "11:00", "duracion_turno": 30}
+    slot = client.post("/disponibilidad", json=bloque).json()["id"]
+    turnos = [
+        client.post(
+            "/turnos",
+            json={"paciente_id": patient, "medico_id": 1, "disponibilidad_id": slot, "fecha": f"{fecha}T{hora}:00"},
+        ).json()["id"]
+        for hora in ("10:00", "10:30")
+    ]
+    client.put(f"/turnos/{turnos[0]}/estado", json={"estado": "cancelado"})
+    proximos = client.get(f"/pacientes/{patient}/resumen").json()["proximos_turnos"]
+    assert [t["id"] for t in proximos] == [turnos[1]]
+    assert len(client.get(f"/pacientes/{patient}/turnos").json()) == 2
+
+    conn = get_connection()
+    other = sqlite3.connect(conn.execute("PRAGMA database_list").fetchone()[2], timeout=0)
+    count = "SELECT COUNT(*) FROM recetas WHERE paciente_id = ?"
+    with read_snapshot(conn):
+        before = conn.execute(count, (patient,)).fetchone()[0]
+        assert before > 0
+        # En modo WAL la otra conexion confirma, pero la foto abierta no ve el cambio.
+        other.execute("DELETE FROM recetas WHERE paciente_id = ?", (patient,))
+        other.commit()
+        assert conn.execute(count, (patient,)).fetchone()[0] == before
+    assert not conn.in_transaction
+    assert conn.execute(count, (patient,)).fetchone()[0] == 0
+    other.close()
+
+
+def test_search_ranks_every_match_unless_the_query_is_broad(client, monkeypatch):
+    from app.repositories import patients
+
+    def crear(dni, nombre, apellido):
+        datos = {"dni": dni, "nombre": nombre, "apellido": apellido, "mail": f"{dni}@test.com"}
+        return client.post("/pacientes", json=datos).json()["id"]
+
+    # El mejor resultado (apellido) es el paciente mas viejo.
+    oldest = crear("43000001", "Ana", "Quiroga")
+    crear("43000002", "Quirino", "Lopez")
+    crear("43000003", "Quiterio", "Diaz")
+
+    monkeypatch.setattr(patients, "RANK_CANDIDATES", 3)
+    assert client.get("/pacientes/buscar", params={"q": "qui"}).json()[0]["id"] == oldest
+    fuzzy = client.get("/pacientes/buscar", params={"q": "quiroga", "fuzzy": True}).json()
+    assert fuzzy[0]["id"] == oldest
+    # Con mas coincidencias que el tope solo se rankean las mas recientes.
+    monkeypatch.setattr(patients, "RANK_CANDIDATES", 2)
+    assert oldest not in [p["id"] for p in client.get("/pacientes/buscar", params={"q": "qui"}).json()]
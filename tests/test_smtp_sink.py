@@ -0,0 +1,40 @@
+import smtplib
+
+import pytest
+
+from app.services.email_client import EmailClient
+from app.services.prescription_notifier import PrescriptionNotifier
+from app.services.smtp_sink import SmtpSink
+
+
+@pytest.fixture
+def sink():
+    with SmtpSink() as running:
+        yield running
+
+
+def _client(sink: SmtpSink) -> EmailClient:
+    return EmailClient(smtp_server=sink.host, smtp_port=sink.port, dry_run=False, use_ssl=False)
+
+
+def test_sink_records_prescription_email(sink):
+    PrescriptionNotifier(_client(sink)).notify_prescription(
+        "Ana Garcia", "ana@mediflow.test", "Mariana Suarez", "Amoxicilina 500mg"
+    )
+    assert sink.connections == 1
+    assert len(sink.messages) == 1
+    message = sink.messages[0]
+    assert message.recipients == ["ana@mediflow.test"]
+    parsed = message.parsed()
+    assert parsed["Subject"] == "Nueva receta medica"
+    assert "Amoxicilina 500mg" in parsed.get_content()
+
+
+def test_sink_injects_failures(sink):
+    sink.fail_every = 2
+    client = _client(sink)
+    client.send_email("a@mediflow.test", "uno", "cuerpo")
+    with pytest.raises(smtplib.SMTPDataError):
+        client.send_email("b@mediflow.test", "dos", "cuerpo")
+    assert sink.failures == 1
+    assert [m.recipients for m in sink.messages] == [["a@mediflow.test"]]
@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+
+from app.db import get_connection
+from app.repositories import waitlist
+
+
+def _patient(client, dni: str) -> int:
+    res = client.post(
+        "/pacientes",
+        json={"dni": dni, "nombre": "Espera", "apellido": "Prueba", "mail": f"{dni}@test.com"},
+    )
+    assert res.status_code == 200
+    return res.json()["id"]
+
+
+def _wait(client, **payload) -> int:
+    res = client.post("/lista-espera", json=payload)
+    assert res.status_code == 200
+    return res.json()["id"]
+
+
+def test_cancelled_slot_goes_to_best_waiting_patient(client):
+    fecha = date.today() + timedelta(days=20)
+    window = {"fecha_desde": (fecha - timedelta(days=3)).isoformat(), "fecha_hasta": (fecha + timedelta(days=3)).isoformat()}
+    slot = client.post(
+        "/disponibilidad",
+        json={"medico_id": 3, "fecha": fecha.isoformat(), "hora_inicio": "09:00", "hora_fin": "10:00", "duracion_turno": 30},
+    ).json()["id"]
+    owner = _patient(client, "50000001")
+    turno = client.post(
+        "/turnos",
+        json={"paciente_id": owner, "medico_id": 3, "disponibilidad_id": slot, "fecha": f"{fecha}T09:30:00"},
+    ).json()
+
+    by_specialty = _wait(client, paciente_id=_patient(client, "50000002"), especialidad_id=3, prioridad=1, **window)
+    by_doctor = _wait(client, paciente_id=_patient(client, "50000003"), medico_id=3, prioridad=5, **window)
+    _wait(
+        client,
+        paciente_id=_patient(client, "50000004"),
+        medico_id=3,
+        prioridad=9,
+        fecha_desde=(fecha + timedelta(days=1)).isoformat(),
+        fecha_hasta=(fecha + timedelta(days=5)).isoformat(),
+    )
+    _wait(client, paciente_id=_patient(client, "50000005"), especialidad_id=1, prioridad=10, **window)
+
+    assert client.put(f"/turnos/{turno['id']}/estado", json={"estado": "cancelado"}).status_code == 200
+    entry = next(e for e in client.get("/lista-espera").json() if e["id"] == by_doctor)
+    assert entry["estado"] == "asignado"
+    reassigned = next(t for t in client.get("/turnos", params={"medico_id": 3}).json() if t["id"] == entry["turno_id"])
+    assert reassigned["paciente_id"] == entry["paciente_id"]
+    assert reassigned["fecha"].endswith("09:30:00") and reassigned["estado"] == "programado"
+
+    # Al cancelar el turno reasignado, el siguiente en la cola es el de la especialidad.
+    assert client.put(f"/turnos/{entry['turno_id']}/estado", json={"estado": "cancelado"}).status_code == 200
+    waiting = {e["id"]: e for e in client.get("/lista-espera").json()}
+    assert waiting[by_specialty]["estado"] == "asignado"
+    assert client.delete(f"/lista-espera/{by_specialty}").status_code == 404
+
+
+def test_waitlist_validation_and_indexed_lookup(client):
+    patient = _patient(client, "50000010")
+    res = client.post(
+        "/lista-espera", json={"paciente_id": patient, "fecha_desde": "2030-01-01", "fecha_hasta": "2030-01-05"}
+    )
+    assert res.status_code == 422
+    entry = _wait(client, paciente_id=patient, medico_id=2, fecha_desde="2030-01-01", fecha_hasta="2030-01-05")
+    assert client.delete(f"/lista-espera/{entry}").status_code == 200
+    assert client.get("/lista-espera", params={"estado": "esperando"}).json() == []
+
+    conn = get_connection()
+    for filtro, index in (
+        ("medico_id = ?1", "idx_lista_espera_medico"),
+        ("medico_id IS NULL AND especialidad_id = ?1", "idx_lista_espera_especialidad"),
+    ):
+        sql = waitlist._CANDIDATE_QUERY.format(filtro=filtro, excluidos="")
+        plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, (1, "2030-01-01", 0)))
+        assert index in plan and "TEMP B-TREE" not in plan
+
+
+def test_expired_entries_leave_the_queue(client):
+    patient = _patient(client, "50000020")
+    today = date.today()
+    stale = _wait(
+        client,
+        paciente_id=patient,
+        medico_id=2,
+        prioridad=50,
+        fecha_desde=(today - timedelta(days=10)).isoformat(),
+        fecha_hasta=(today - timedelta(days=1)).isoformat(),
+    )
+    live = _wait(client, paciente_id=patient, medico_id=2, fecha_desde=today.isoformat(), fecha_hasta=today.isoformat())
+
+    conn = get_connection()
+    assert waitlist.expire_entries(conn, today) == 1
+    states = {e["id"]: e["estado"] for e in client.get("/lista-espera", params={"paciente_id": patient}).json()}
+    assert states == {stale: "vencido", live: "esperando"}
+    plan = " ".join(
+        row[3]
+        for row in conn.execute(
+            "EXPLAIN QUERY PLAN UPDATE lista_espera SET estado = 'vencido' WHERE estado = 'esperando' AND fecha_hasta < ?",
+            (today.isoformat(),),
+        )
+    )
+    assert "idx_lista_espera_vencimiento" in plan